@@ -0,0 +1,37 @@
+# Compare DATABASE_ASYNC=true and DATABASE_ASYNC=false under concurrent reads.
+# Start the API in the mode to measure, then run:
+#   python benchmarks/db_mode_benchmark.py --url http://localhost:8000/api/wards --token <jwt> --concurrency 200 --requests 5000
+# The API has to run with the rate limiter out of the way (see load.py), non-2xx responses are counted apart.
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from load import exit_if_rate_limited, fetch, percentile, split, status_counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", required=True)
+    parser.add_argument("--token", default="")
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda _: fetch(args.url, args.token), range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies, failures = split(results)
+
+    print(f"requests:   {len(results)}")
+    print(f"non-2xx:    {len(failures)}" + (f" ({status_counts(failures)})" if failures else ""))
+    print(f"throughput: {len(latencies) / elapsed:.1f} req/s (2xx)")
+    if latencies:
+        print(f"p50:        {statistics.median(latencies) * 1000:.1f} ms")
+        print(f"p99:        {percentile(latencies, 0.99) * 1000:.1f} ms")
+    exit_if_rate_limited([status for status, _ in results])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# HTTP helpers shared by the benchmarks that run against a live API (db_mode_benchmark, login_storm_benchmark).
+# The rate limiter answers most of a benchmark's requests with 429, start the API with it out of the way:
+#   RATE_LIMIT_CONFIG= RATE_LIMIT_REQUESTS=1000000 uvicorn main:app
+import json
+import sys
+import time
+import urllib.error
+import urllib.request
+
+RATE_LIMIT_OFF = "RATE_LIMIT_CONFIG= RATE_LIMIT_REQUESTS=1000000"
+
+
+# (status, seconds), a JSON body makes it a POST; error statuses are returned, not raised
+def fetch(url: str, token: str = "", body: dict = None) -> tuple:
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    data = None
+    if body is not None:
+        headers["Content-Type"] = "application/json"
+        data = json.dumps(body).encode()
+    request = urllib.request.Request(url, data=data, headers=headers)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        status = e.code
+    return status, time.perf_counter() - start
+
+
+# Latencies of the 2xx responses, sorted, and the statuses of the others
+def split(results: list) -> tuple:
+    latencies = sorted(latency for status, latency in results if 200 <= status < 300)
+    failures = [status for status, _ in results if not 200 <= status < 300]
+    return latencies, failures
+
+
+def percentile(latencies: list, fraction: float) -> float:
+    return latencies[max(int(len(latencies) * fraction) - 1, 0)]
+
+
+def status_counts(statuses: list) -> str:
+    return ", ".join(f"{status}: {statuses.count(status)}" for status in sorted(set(statuses)))
+
+
+# Rejected requests never reach the code being measured, so the run is refused instead of reported
+def exit_if_rate_limited(statuses: list, what: str = "requests"):
+    if statuses.count(429) > len(statuses) / 2:
+        print(f"most {what} were rate limited (429), restart the API with {RATE_LIMIT_OFF}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,76 @@
+# Measure how a burst of logins affects the latency of another route.
+# Samples --url alone, then again while --login-concurrency clients keep logging in, and prints both.
+# Start the API, then run:
+#   python benchmarks/login_storm_benchmark.py --url http://localhost:8000/api/regions --token <jwt> \
+#       --login-url http://localhost:8000/api/login --email <email> --password <password>
+# Compare PASSWORD_WORKERS=0 (hashing in the threadpool) with the default process pool.
+# POST /api/login is limited to 10/minute by rate_limits.json, start the API with the rate limiter out of the way (see load.py).
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from load import exit_if_rate_limited, fetch, percentile, split, status_counts
+
+
+def sample(args) -> list:
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        return list(pool.map(lambda _: fetch(args.url, args.token), range(args.requests)))
+
+
+def storm(args, stop: threading.Event, statuses: list):
+    def run():
+        while not stop.is_set():
+            statuses.append(fetch(args.login_url, body={"email": args.email, "password": args.password})[0])
+    threads = [threading.Thread(target=run) for _ in range(args.login_concurrency)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+# Latencies of the 2xx responses, the others are only counted
+def report(name: str, results: list):
+    latencies, failures = split(results)
+    print(f"{name}")
+    if failures:
+        print(f"  non-2xx: {len(failures)} ({status_counts(failures)})")
+    if latencies:
+        print(f"  p50:  {statistics.median(latencies) * 1000:.1f} ms")
+        print(f"  p99:  {percentile(latencies, 0.99) * 1000:.1f} ms")
+        print(f"  max:  {latencies[-1] * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", required=True)
+    parser.add_argument("--token", default="")
+    parser.add_argument("--login-url", required=True)
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--login-concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    report("baseline", sample(args))
+
+    stop, statuses = threading.Event(), []
+    threads = storm(args, stop, statuses)
+    time.sleep(1)
+    started = time.perf_counter()
+    during = sample(args)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    report("during login storm", during)
+    print(f"logins:     {len(statuses)} ({status_counts(statuses)})")
+    print(f"login rate: {len(statuses) / elapsed:.1f} /s")
+
+    # Rejected logins never reach password hashing, the numbers above would not measure it
+    exit_if_rate_limited(statuses, "logins")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# Per-row cost of building the response envelope for a list of wards, old path against the single pass one.
+# Needs the project's .env (models import the database settings) but no database connection. Run from the repository root:
+#   python benchmarks/serialization_benchmark.py --rows 100 --repeat 200
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from domain.models import role_model  # User.role is resolved by name when mappers configure
+from domain.models.ward_model import Ward
+from domain.schema.ward_schema import WardRead
+from utils.http_response import json_rows, success_response
+
+
+def make_wards(count: int) -> list:
+    return [
+        Ward(
+            id=i, name=f"Ward {i:03d}", slug=f"ward-{i:03d}", lon=-11.7 + i * 0.001, lat=7.9 + i * 0.001,
+            region_id=1, district_id=1, constituency_id=1, active=True, deleted=False,
+            created_at=datetime(2024, 1, 1, 12, 0, 0), created_by="System",
+        )
+        for i in range(count)
+    ]
+
+
+# from_orm and jsonable_encoder per row, then stdlib json in JSONResponse
+def before(wards: list) -> bytes:
+    data = [jsonable_encoder(WardRead.from_orm(ward)) for ward in wards]
+    return JSONResponse(content={"status": "success", "status_code": 200, "message": "success", "data": data}).body
+
+
+def after(wards: list) -> bytes:
+    return success_response(data=json_rows(WardRead, wards)).body
+
+
+def measure(function, wards: list, repeat: int) -> float:
+    function(wards)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function(wards)
+    return (time.perf_counter() - started) / repeat / len(wards)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    wards = make_wards(args.rows)
+    old, new = measure(before, wards, args.repeat), measure(after, wards, args.repeat)
+    print(f"rows:    {args.rows}")
+    print(f"before:  {old * 1e6:.2f} us/row")
+    print(f"after:   {new * 1e6:.2f} us/row")
+    print(f"speedup: {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,118 +1,124 @@
 from datetime import datetime
 from typing import List
-from fastapi import APIRouter, Depends, UploadFile, File
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query, UploadFile, File
+from sqlalchemy.ext.asyncio import AsyncSession
 from utils.consts import ADMIN
-from utils.database import get_db
+from utils.database import get_async_db
 from domain.models.constituency_model import Constituency 
 from domain.schema.constituency_schema import ConstituencyCreate, ConstituencyRead, ConstituencySoftDelete, ConstituencyUpdate
 from utils.functions import has_role
-from utils.http_response import success_response, error_response
-from fastapi.encoders import jsonable_encoder
-from io import StringIO
+from domain.models.user_model import User
+from utils.security import get_user_from_token
+from utils.cache import CONSTITUENCY_TABLES
+from utils.conditional import conditional_get
+from utils.http_response import success_response, error_response, json_row, json_rows
 from fastapi.responses import StreamingResponse
+from utils.csv_export import stream_csv
+from utils.csv_ingest import CsvFormatError, import_csv_async, parse_name
+from utils.jobs import serialize_job, submit_import_job
 from sqlalchemy.future import select
-import pandas as pd
-import csv
 
 router =  APIRouter(tags=["Admin Constituencies"], dependencies=[Depends(has_role(ADMIN))] )
 
+# Conditional GET (ETag / Last-Modified) for the reads below
+cacheable = Depends(conditional_get(CONSTITUENCY_TABLES))
+
 # FETCH ALL
-@router.get("/admin/constituencies", response_model=List[ConstituencyRead])
-def get_constituencies(db: Session = Depends(get_db)):
+@router.get("/admin/constituencies", response_model=List[ConstituencyRead], dependencies=[cacheable])
+async def get_constituencies(db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Constituency).filter(Constituency.active == True, Constituency.deleted == False)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         constituencies = result.scalars().all()
 
         # Serialize object
-        constituency_data = [jsonable_encoder(ConstituencyRead.from_orm(constituency)) for constituency in constituencies]
+        constituency_data = json_rows(ConstituencyRead, constituencies)
         return success_response(data=constituency_data)
     except Exception as e:
         print("Error fetching constituencies:", e)
         return error_response(status_code=500, error_message=str(e))
 
 # FIND BY ID
-@router.get("/admin/constituencies/{id}", response_model=ConstituencyRead)
-def get_constituency_by_id(id: int, db: Session = Depends(get_db)):
+@router.get("/admin/constituencies/{id}", response_model=ConstituencyRead, dependencies=[cacheable])
+async def get_constituency_by_id(id: int, db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Constituency).filter(Constituency.id == id, Constituency.active == True, Constituency.deleted == False)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         constituency = result.scalar_one_or_none()
 
         if not constituency:
             return error_response(status_code=404, error_message="constituency not found")
         
-        return success_response(data=jsonable_encoder(ConstituencyRead.from_orm(constituency)))
+        return success_response(data=json_row(ConstituencyRead, constituency))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 # FIND BY REGION ID
-@router.get("/admin/constituencies/region/{region_id}", response_model=List[ConstituencyRead])
-def get_constituency_by_region_id(region_id: int, db: Session = Depends(get_db)):
+@router.get("/admin/constituencies/region/{region_id}", response_model=List[ConstituencyRead], dependencies=[cacheable])
+async def get_constituency_by_region_id(region_id: int, db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Constituency).filter(Constituency.region_id == region_id, Constituency.active == True, Constituency.deleted == False)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         constituencies = result.scalars().all()
 
         if not constituencies:
             return error_response(status_code=404, error_message="constituency not found")
         
-        return success_response(data=jsonable_encoder([ConstituencyRead.from_orm(constituency) for constituency in constituencies]))
+        return success_response(data=json_rows(ConstituencyRead, constituencies))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 # FIND BY DISTRICT ID
-@router.get("/admin/constituencies/district/{district_id}", response_model=List[ConstituencyRead])
-def get_constituency_by_district_id(district_id: int, db: Session = Depends(get_db)):
+@router.get("/admin/constituencies/district/{district_id}", response_model=List[ConstituencyRead], dependencies=[cacheable])
+async def get_constituency_by_district_id(district_id: int, db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Constituency).filter(Constituency.district_id == district_id, Constituency.active == True, Constituency.deleted == False)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         constituencies = result.scalars().all()
 
         if not constituencies:
             return error_response(status_code=404, error_message="constituency not found")
         
-        return success_response(data=jsonable_encoder([ConstituencyRead.from_orm(constituency) for constituency in constituencies]))
+        return success_response(data=json_rows(ConstituencyRead, constituencies))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 # FIND BY CONSTITUENCY ID
-@router.get("/admin/constituencies/constituency/{constituencyn_id}", response_model=List[ConstituencyRead])
-def get_constituency_by_constituency_id(constituency_id: int, db: Session = Depends(get_db)):
+@router.get("/admin/constituencies/constituency/{constituencyn_id}", response_model=List[ConstituencyRead], dependencies=[cacheable])
+async def get_constituency_by_constituency_id(constituency_id: int, db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Constituency).filter(Constituency.constituency_id == constituency_id, Constituency.active == True, Constituency.deleted == False)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         constituencies = result.scalars().all()
 
         if not constituencies:
             return error_response(status_code=404, error_message="constituency not found")
         
-        return success_response(data=jsonable_encoder([ConstituencyRead.from_orm(constituency) for constituency in constituencies]))
+        return success_response(data=json_rows(ConstituencyRead, constituencies))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 # FIND BY NAME
-@router.get("/admin/constituencies/name/{name}", response_model=ConstituencyRead)
-def get_constituency_by_name(name: str, db: Session = Depends(get_db)):
+@router.get("/admin/constituencies/name/{name}", response_model=ConstituencyRead, dependencies=[cacheable])
+async def get_constituency_by_name(name: str, db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Constituency).filter(Constituency.name == name, Constituency.active == True, Constituency.deleted == False)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         constituency = result.scalar_one_or_none()
 
         if not constituency:
             return error_response(status_code=404, error_message="constituency not found")
         
-        return success_response(data=jsonable_encoder(ConstituencyRead.from_orm(constituency)))
+        return success_response(data=json_row(ConstituencyRead, constituency))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 # CREATE
 @router.post("/admin/constituencies", response_model=ConstituencyCreate)
-def create_constituency(constituency: ConstituencyCreate, db: Session = Depends(get_db)):
+async def create_constituency(constituency: ConstituencyCreate, db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Constituency).filter(Constituency.name == constituency.name)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         existing_constituency = result.scalar_one_or_none()
 
         if existing_constituency:
@@ -120,19 +126,19 @@ def create_constituency(constituency: ConstituencyCreate, db: Session = Depends(
         
         new_data = Constituency(name=constituency.name, lon=constituency.lon, lat=constituency.lat, region_id=constituency.region_id, district_id=constituency.district_id)
         db.add(new_data)
-        db.commit()
-        db.refresh(new_data)
+        await db.commit()
+        await db.refresh(new_data)
 
-        return success_response(data=jsonable_encoder(ConstituencyRead.from_orm(new_data)))
+        return success_response(data=json_row(ConstituencyRead, new_data))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 # UPDATE CONSTITUENCY
 @router.put("/admin/constituencies/{id}", response_model=ConstituencyRead)
-def update_constituency(id: int, constituency_data: ConstituencyUpdate, db: Session = Depends(get_db)):
+async def update_constituency(id: int, constituency_data: ConstituencyUpdate, db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Constituency).filter(Constituency.id == id)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         constituency = result.scalar_one_or_none()
 
         if not constituency:
@@ -145,19 +151,19 @@ def update_constituency(id: int, constituency_data: ConstituencyUpdate, db: Sess
         constituency.updated_at = datetime.utcnow()
         constituency.updated_by = "System"
 
-        db.commit()
-        db.refresh(constituency)
+        await db.commit()
+        await db.refresh(constituency)
 
-        return success_response(data=jsonable_encoder(ConstituencyRead.from_orm(constituency)))
+        return success_response(data=json_row(ConstituencyRead, constituency))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 # SOFT DELETE CONSTITUENCY
 @router.delete("/admin/constituencies/{id}")
-def soft_delete_constituency(id: int, delete_data: ConstituencySoftDelete, db: Session = Depends(get_db)):
+async def soft_delete_constituency(id: int, delete_data: ConstituencySoftDelete, db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Constituency).filter(Constituency.id == id, Constituency.deleted == False)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         constituency = result.scalar_one_or_none()
 
         if not constituency:
@@ -168,7 +174,7 @@ def soft_delete_constituency(id: int, delete_data: ConstituencySoftDelete, db: S
         constituency.deleted_by = "System"
         constituency.deleted_reason = delete_data.deleted_reason
 
-        db.commit()
+        await db.commit()
 
         return success_response(message="constituency successfully deleted")
     except Exception as e:
@@ -176,75 +182,54 @@ def soft_delete_constituency(id: int, delete_data: ConstituencySoftDelete, db: S
     
 # UPLOAD CONSTITUENCIES
 @router.post("/admin/constituencies/upload")
-def upload_constituencies_csv(
-    file: UploadFile = File(...), db: Session = Depends(get_db)
+async def upload_constituencies_csv(
+    file: UploadFile = File(...), 
+    background: bool = Query(False),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_user_from_token)
 ):
     try:
-        df = pd.read_csv(file.file)
-
-        if "name" not in df.columns:
-            return error_response(status_code=400, error_message="CSV must contain a 'name' column.")
-
-        processed_constituencies = []
-
-        for _, row in df.iterrows():
-            name = row["name"].strip()
-
-            stmt = select(Constituency).filter(Constituency.name == name)
-            result = db.execute(stmt)
-            existing_constituency = result.scalars().first()
-
-            if existing_constituency:
-                if existing_constituency.active is False and existing_constituency.deleted is True:
-                    continue
-                existing_constituency.updated_at = datetime.utcnow()
-                existing_constituency.updated_by = "System"
-            else:
-                new_constituency = Constituency(
-                    name=name,
-                    created_at=datetime.utcnow(),
-                    created_by="System",
-                    updated_at=datetime.utcnow(),
-                    updated_by="System",
-                    active=True,
-                    deleted=False,
-                )
-                db.add(new_constituency)
-            
-            processed_constituencies.append(name)
-
-        db.commit()
-        return success_response(
-            message=f"CSV processed successfully. Constituency updated/added: {len(processed_constituencies)}",
-            data=processed_constituencies,
+        options = dict(
+            columns={"name": parse_name},
+            required={"name"},
+            update_columns=(),
+            audit_user="System",
         )
 
-    except pd.errors.EmptyDataError:
-        return error_response(status_code=400, error_message="CSV file is empty.")
+        # Large files can be queued instead, progress is polled at /admin/jobs/{id}
+        if background:
+            job = await submit_import_job(db, file, Constituency, created_by=current_user.email, **options)
+            return success_response(status_code=202, message="CSV queued for processing", data=serialize_job(job))
+
+        # Parsed and upserted batch by batch, each batch commits on its own so memory stays flat
+        report = await import_csv_async(db, file.file, Constituency, **options)
+        return success_response(
+            message=f"CSV processed successfully. Constituency updated/added: {report.processed}",
+            data=report.to_dict(),
+        )
+    except CsvFormatError as e:
+        return error_response(status_code=400, error_message=str(e))
     except Exception as e:
         return error_response(status_code=500, error_message=f"Error processing CSV: {str(e)}")
 
 # EXPORT CONSTITUENCIES
 @router.post("/admin/constituencies/export-csv", response_class=StreamingResponse)
-def export_constituencies_csv(db: Session = Depends(get_db)):
+async def export_constituencies_csv(db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Constituency).filter(Constituency.active == True, Constituency.deleted == False)
-        result = db.execute(stmt)
-        constituencies = result.scalars().all()
+        result = await db.execute(stmt.limit(1))
 
-        if not constituencies:
+        if result.first() is None:
             return error_response(status_code=404, error_message="No constituencies found to export.")
 
         # Define CSV headers
         csv_headers = ["No", "Name", "Slug", "Longitude", "Latitude", "RegionId", "DistrictId"]
 
-        csv_data = StringIO()
-        csv_writer = csv.writer(csv_data)
-
-        csv_writer.writerow(csv_headers)
-
-        for idx, constituency in enumerate(constituencies, start=1):  
-            csv_writer.writerow([
+        # Rows are fetched in batches and written out while the response is being sent
+        return stream_csv(
+            stmt.order_by(Constituency.id),
+            csv_headers,
+            lambda idx, constituency: [
                 idx,
                 constituency.name,
                 constituency.slug,
@@ -252,20 +237,9 @@ def export_constituencies_csv(db: Session = Depends(get_db)):
                 constituency.lat,
                 constituency.region_id,
                 constituency.district_id,
-            ])
-
-        csv_data.seek(0)
-
-        return StreamingResponse(
-            iter([csv_data.getvalue()]),
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": "attachment; filename=constituencies.csv",
-                "Content-Length": str(len(csv_data.getvalue())),
-            }
+            ],
+            filename="constituencies.csv",
         )
 
     except Exception as e:
         return error_response(status_code=500, error_message=f"Error generating CSV: {str(e)}")
-
-
@@ -1,32 +1,38 @@
 from datetime import datetime
 from typing import List
-from fastapi import APIRouter, Depends, UploadFile, File
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query, UploadFile, File
+from sqlalchemy.ext.asyncio import AsyncSession
 from utils.consts import ADMIN
-from utils.database import get_db
+from utils.database import get_async_db
 from domain.models.district_model import District  
 from domain.schema.district_schema import DistrictCreate, DistrictRead, DistrictSoftDelete, DistrictUpdate
 from utils.functions import has_role
-from utils.http_response import success_response, error_response
-from fastapi.encoders import jsonable_encoder
-from io import StringIO
+from domain.models.user_model import User
+from utils.security import get_user_from_token
+from utils.cache import DISTRICT_TABLES
+from utils.conditional import conditional_get
+from utils.http_response import success_response, error_response, json_row, json_rows
 from fastapi.responses import StreamingResponse
+from utils.csv_export import stream_csv
+from utils.csv_ingest import CsvFormatError, import_csv_async, parse_name
+from utils.jobs import serialize_job, submit_import_job
 from sqlalchemy.future import select
-import pandas as pd
-import csv
 
 router = APIRouter(tags=["Admin Districts"], dependencies=[Depends(has_role(ADMIN))] )
 
+# Conditional GET (ETag / Last-Modified) for the reads below
+cacheable = Depends(conditional_get(DISTRICT_TABLES))
+
 # FETCH ALL
-@router.get("/admin/districts", response_model=List[DistrictRead])
-def get_districts(db: Session = Depends(get_db)):
+@router.get("/admin/districts", response_model=List[DistrictRead], dependencies=[cacheable])
+async def get_districts(db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(District).filter(District.active == True, District.deleted == False)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         districts = result.scalars().all()
 
         # Serialize each district object
-        district_data = [jsonable_encoder(DistrictRead.from_orm(district)) for district in districts]
+        district_data = json_rows(DistrictRead, districts)
 
         return success_response(data=district_data)
     except Exception as e:
@@ -34,58 +40,58 @@ def get_districts(db: Session = Depends(get_db)):
 
 
 # FIND BY ID
-@router.get("/admin/districts/{id}", response_model=DistrictRead)
-def get_district_by_id(id: int, db: Session = Depends(get_db)):
+@router.get("/admin/districts/{id}", response_model=DistrictRead, dependencies=[cacheable])
+async def get_district_by_id(id: int, db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(District).filter(District.id == id, District.active == True, District.deleted == False)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         district = result.scalars().first()
         if not district:
             return error_response(status_code=404, error_message="District not found")
         
-        return success_response(data=jsonable_encoder(DistrictRead.from_orm(district)))
+        return success_response(data=json_row(DistrictRead, district))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 
 # FIND BY REGION ID
-@router.get("/admin/districts/region/{region_id}", response_model=List[DistrictRead])
-def get_districts_by_region(region_id: int, db: Session = Depends(get_db)):
+@router.get("/admin/districts/region/{region_id}", response_model=List[DistrictRead], dependencies=[cacheable])
+async def get_districts_by_region(region_id: int, db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(District).filter(District.region_id == region_id, District.active == True, District.deleted == False)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         districts = result.scalars().all()
 
         if not districts:
             return error_response(status_code=404, error_message="No districts found for this region")
 
-        district_data = [jsonable_encoder(DistrictRead.from_orm(district)) for district in districts]
+        district_data = json_rows(DistrictRead, districts)
         return success_response(data=district_data)
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 
 # FIND BY NAME
-@router.get("/admin/districts/name/{name}", response_model=DistrictRead)
-def get_district_by_name(name: str, db: Session = Depends(get_db)):
+@router.get("/admin/districts/name/{name}", response_model=DistrictRead, dependencies=[cacheable])
+async def get_district_by_name(name: str, db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(District).filter(District.name == name, District.active == True, District.deleted == False)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         district = result.scalars().first()
         if not district:
             return error_response(status_code=404, error_message="District not found")
         
-        return success_response(data=jsonable_encoder(DistrictRead.from_orm(district)))
+        return success_response(data=json_row(DistrictRead, district))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 
 # CREATE
 @router.post("/admin/districts", response_model=DistrictCreate)
-def create_district(district: DistrictCreate, db: Session = Depends(get_db)):
+async def create_district(district: DistrictCreate, db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(District).filter(District.name == district.name)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         existing_district = result.scalars().first()
 
         if existing_district:
@@ -95,19 +101,19 @@ def create_district(district: DistrictCreate, db: Session = Depends(get_db)):
             name=district.name, lon=district.lon, lat=district.lat, region_id=district.region_id
         )
         db.add(new_district)
-        db.commit()
-        db.refresh(new_district)
-        return success_response(data=jsonable_encoder(DistrictRead.from_orm(new_district)))
+        await db.commit()
+        await db.refresh(new_district)
+        return success_response(data=json_row(DistrictRead, new_district))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 
 # UPDATE DISTRICT
 @router.put("/admin/districts/{id}", response_model=DistrictRead)
-def update_district(id: int, district_data: DistrictUpdate, db: Session = Depends(get_db)):
+async def update_district(id: int, district_data: DistrictUpdate, db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(District).filter(District.id == id)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         district = result.scalars().first()
 
         if not district:
@@ -120,117 +126,79 @@ def update_district(id: int, district_data: DistrictUpdate, db: Session = Depend
         district.updated_at = datetime.utcnow()
         district.updated_by = "System"
 
-        db.commit()
-        db.refresh(district)
+        await db.commit()
+        await db.refresh(district)
 
-        return success_response(data=jsonable_encoder(DistrictRead.from_orm(district)))
+        return success_response(data=json_row(DistrictRead, district))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 
 # UPLOAD DISTRICTS
 @router.post("/admin/districts/upload")
-def upload_districts_csv(file: UploadFile = File(...), db: Session = Depends(get_db)):
+async def upload_districts_csv(file: UploadFile = File(...), background: bool = Query(False), db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_user_from_token)):
     try:
-        df = pd.read_csv(file.file)
-
-        if "name" not in df.columns or "region_id" not in df.columns:
-            return error_response(status_code=400, error_message="CSV must contain 'name' and 'region_id' columns.")
-
-        processed_districts = []
-
-        for _, row in df.iterrows():
-            name = row["name"].strip()
-            region_id = row["region_id"]
-
-            stmt = select(District).filter(District.name == name)
-            result = db.execute(stmt)
-            existing_district = result.scalars().first()
-
-            if existing_district:
-                if existing_district.active is False and existing_district.deleted is True:
-                    continue
-                existing_district.updated_at = datetime.utcnow()
-                existing_district.updated_by = "System"
-            else:
-                new_district = District(
-                    name=name,
-                    region_id=region_id,
-                    created_at=datetime.utcnow(),
-                    created_by="System",
-                    updated_at=datetime.utcnow(),
-                    updated_by="System",
-                    active=True,
-                    deleted=False,
-                )
-                db.add(new_district)
-
-            processed_districts.append(name)
-
-        db.commit()
-        return success_response(
-            message=f"CSV processed successfully. Districts updated/added: {len(processed_districts)}",
-            data=processed_districts,
+        options = dict(
+            columns={"name": parse_name, "region_id": int},
+            required={"name", "region_id"},
+            update_columns=(),
+            audit_user="System",
         )
 
-    except pd.errors.EmptyDataError:
-        return error_response(status_code=400, error_message="CSV file is empty.")
+        # Large files can be queued instead, progress is polled at /admin/jobs/{id}
+        if background:
+            job = await submit_import_job(db, file, District, created_by=current_user.email, **options)
+            return success_response(status_code=202, message="CSV queued for processing", data=serialize_job(job))
+
+        # Parsed and upserted batch by batch, each batch commits on its own so memory stays flat
+        report = await import_csv_async(db, file.file, District, **options)
+        return success_response(
+            message=f"CSV processed successfully. Districts updated/added: {report.processed}",
+            data=report.to_dict(),
+        )
+    except CsvFormatError as e:
+        return error_response(status_code=400, error_message=str(e))
     except Exception as e:
         return error_response(status_code=500, error_message=f"Error processing CSV: {str(e)}")
 
 
 # EXPORT DISTRICTS
 @router.post("/admin/districts/export-csv", response_class=StreamingResponse)
-def export_districts_csv(db: Session = Depends(get_db)):
+async def export_districts_csv(db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(District).filter(District.active == True, District.deleted == False)
-        result = db.execute(stmt)
-        districts = result.scalars().all()
+        result = await db.execute(stmt.limit(1))
 
-        if not districts:
+        if result.first() is None:
             return error_response(status_code=404, error_message="No districts found to export.")
 
         # Define CSV headers
         csv_headers = ["No", "Name", "SLUG", "Longitude", "Latitude", "RegionId"]
 
-        csv_data = StringIO()
-        csv_writer = csv.writer(csv_data)
-
-        # Write the headers to the CSV
-        csv_writer.writerow(csv_headers)
-
-        for idx, district in enumerate(districts, start=1):
-            csv_writer.writerow([
-                idx, 
+        # Rows are fetched in batches and written out while the response is being sent
+        return stream_csv(
+            stmt.order_by(District.id),
+            csv_headers,
+            lambda idx, district: [
+                idx,
                 district.name,
                 district.slug,
                 district.lon,
                 district.lat,
                 district.region_id,
-            ])
-
-        csv_data.seek(0)
-
-        # Return the CSV data as a streaming response
-        return StreamingResponse(
-            iter([csv_data.getvalue()]),
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": "attachment; filename=districts.csv",
-                "Content-Length": str(len(csv_data.getvalue())),
-            }
+            ],
+            filename="districts.csv",
         )
 
     except Exception as e:
         return error_response(status_code=500, error_message=f"Error generating CSV: {str(e)}")
 
-
 # SOFT DELETE DISTRICT
 @router.delete("/admin/districts/{id}")
-def soft_delete_district(id: int, delete_data: DistrictSoftDelete, db: Session = Depends(get_db)):
+async def soft_delete_district(id: int, delete_data: DistrictSoftDelete, db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(District).filter(District.id == id, District.deleted == False)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         district = result.scalars().first()
 
         if not district:
@@ -241,7 +209,7 @@ def soft_delete_district(id: int, delete_data: DistrictSoftDelete, db: Session =
         district.deleted_by = "System"
         district.deleted_reason = delete_data.deleted_reason
 
-        db.commit()
+        await db.commit()
         return success_response(message="District successfully deleted")
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
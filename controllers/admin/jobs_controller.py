@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from domain.models.user_model import User
+from utils.consts import ADMIN
+from utils.database import get_async_db
+from domain.models.import_job_model import ImportJob
+from domain.schema.import_job_schema import ImportJobRead
+from utils.functions import has_role
+from utils.http_response import success_response, error_response
+from utils.jobs import serialize_job
+from utils.security import get_user_from_token
+
+router = APIRouter(tags=["Admin Jobs"], dependencies=[Depends(has_role(ADMIN))])
+
+# FIND BY ID
+@router.get("/admin/jobs/{id}", response_model=ImportJobRead)
+async def get_job_by_id(id: str, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_user_from_token)):
+    try:
+        job = await db.get(ImportJob, id)
+        # Admins only see the jobs they queued, the report carries the rows of the upload
+        if not job or job.created_by != current_user.email:
+            return error_response(status_code=404, error_message="job not found")
+
+        return success_response(data=serialize_job(job))
+    except Exception as e:
+        return error_response(status_code=500, error_message=str(e))
@@ -1,70 +1,76 @@
 from datetime import datetime
 from typing import List
-from fastapi import APIRouter, Depends, UploadFile, File
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query, UploadFile, File
+from sqlalchemy.ext.asyncio import AsyncSession
 from utils.consts import ADMIN
-from utils.database import get_db
+from utils.database import get_async_db
 from domain.models.region_model import Region  
 from domain.schema.region_schema import RegionCreate, RegionRead, RegionSoftDelete, RegionUpdate
 from utils.functions import has_role
-from utils.http_response import success_response, error_response
-from fastapi.encoders import jsonable_encoder
-from io import StringIO
+from domain.models.user_model import User
+from utils.security import get_user_from_token
+from utils.cache import REGION_TABLES
+from utils.conditional import conditional_get
+from utils.http_response import success_response, error_response, json_row, json_rows
 from fastapi.responses import StreamingResponse
+from utils.csv_export import stream_csv
+from utils.csv_ingest import CsvFormatError, import_csv_async, parse_name
+from utils.jobs import serialize_job, submit_import_job
 from sqlalchemy.future import select
-import pandas as pd
-import csv
 
 
 router = APIRouter(tags=["Admin Regions"], dependencies=[Depends(has_role(ADMIN))] )
 
+# Conditional GET (ETag / Last-Modified) for the reads below
+cacheable = Depends(conditional_get(REGION_TABLES))
+
 # FETCH ALL
-@router.get("/admin/regions", response_model=List[RegionRead])
-def get_regions(db: Session = Depends(get_db)):
+@router.get("/admin/regions", response_model=List[RegionRead], dependencies=[cacheable])
+async def get_regions(db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Region).filter(Region.active == True, Region.deleted == False)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         regions = result.scalars().all()
         
         # Serialize object
-        region_data = [jsonable_encoder(RegionRead.from_orm(region)) for region in regions]
+        region_data = json_rows(RegionRead, regions)
         return success_response(data=region_data)
     except Exception as e:
         print("Error fetching regions:", e)
         return error_response(status_code=500, error_message=str(e))
 
 # FIND BY ID
-@router.get("/admin/regions/{id}", response_model=RegionRead)
-def get_region_by_id(id: int, db: Session = Depends(get_db)):
+@router.get("/admin/regions/{id}", response_model=RegionRead, dependencies=[cacheable])
+async def get_region_by_id(id: int, db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Region).filter(Region.id == id, Region.active == True, Region.deleted == False)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         region = result.scalars().first()
         if not region:
             return error_response(status_code=404, error_message="Region not found")
-        return success_response(data=jsonable_encoder(RegionRead.from_orm(region)))
+        return success_response(data=json_row(RegionRead, region))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 # FIND BY NAME
-@router.get("/admin/regions/name/{name}", response_model=RegionRead)
-def get_region_by_name(name: str, db: Session = Depends(get_db)):
+@router.get("/admin/regions/name/{name}", response_model=RegionRead, dependencies=[cacheable])
+async def get_region_by_name(name: str, db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Region).filter(Region.name == name, Region.active == True, Region.deleted == False)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         region = result.scalars().first()
         if not region:
             return error_response(status_code=404, error_message="Region not found")
-        return success_response(data=jsonable_encoder(RegionRead.from_orm(region)))
+        return success_response(data=json_row(RegionRead, region))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 # CREATE
 @router.post("/admin/regions", response_model=RegionCreate)
-def create_region(region: RegionCreate, db: Session = Depends(get_db)):
+async def create_region(region: RegionCreate, db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Region).filter(Region.name == region.name)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         existing_region = result.scalars().first()
         
         if existing_region:
@@ -72,120 +78,83 @@ def create_region(region: RegionCreate, db: Session = Depends(get_db)):
 
         new_region = Region(name=region.name, lon=region.lon, lat=region.lat)
         db.add(new_region)
-        db.commit()
-        db.refresh(new_region)
+        await db.commit()
+        await db.refresh(new_region)
         
-        return success_response(data=jsonable_encoder(RegionRead.from_orm(new_region)))
+        return success_response(data=json_row(RegionRead, new_region))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 # UPLOAD REGION
 @router.post("/admin/regions/upload")
-def upload_regions_csv(
-    file: UploadFile = File(...), db: Session = Depends(get_db)
+async def upload_regions_csv(
+    file: UploadFile = File(...), 
+    background: bool = Query(False),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_user_from_token)
 ):
     try:
-        df = pd.read_csv(file.file)
-
-        if "name" not in df.columns:
-            return error_response(status_code=400, error_message="CSV must contain a 'name' column.")
-
-        processed_regions = []
-
-        for _, row in df.iterrows():
-            name = row["name"].strip()
-
-            stmt = select(Region).filter(Region.name == name)
-            result = db.execute(stmt)
-            existing_region = result.scalars().first()
-
-            if existing_region:
-                if existing_region.active is False and existing_region.deleted is True:
-                    continue
-                existing_region.updated_at = datetime.utcnow()
-                existing_region.updated_by = "System"
-            else:
-                new_region = Region(
-                    name=name,
-                    created_at=datetime.utcnow(),
-                    created_by="System",
-                    updated_at=datetime.utcnow(),
-                    updated_by="System",
-                    active=True,
-                    deleted=False,
-                )
-                db.add(new_region)
-            
-            processed_regions.append(name)
-
-        db.commit()
-        return success_response(
-            message=f"CSV processed successfully. Regions updated/added: {len(processed_regions)}",
-            data=processed_regions,
+        options = dict(
+            columns={"name": parse_name},
+            required={"name"},
+            update_columns=(),
+            audit_user="System",
         )
 
-    except pd.errors.EmptyDataError:
-        return error_response(status_code=400, error_message="CSV file is empty.")
+        # Large files can be queued instead, progress is polled at /admin/jobs/{id}
+        if background:
+            job = await submit_import_job(db, file, Region, created_by=current_user.email, **options)
+            return success_response(status_code=202, message="CSV queued for processing", data=serialize_job(job))
+
+        # Parsed and upserted batch by batch, each batch commits on its own so memory stays flat
+        report = await import_csv_async(db, file.file, Region, **options)
+        return success_response(
+            message=f"CSV processed successfully. Regions updated/added: {report.processed}",
+            data=report.to_dict(),
+        )
+    except CsvFormatError as e:
+        return error_response(status_code=400, error_message=str(e))
     except Exception as e:
         return error_response(status_code=500, error_message=f"Error processing CSV: {str(e)}")
 
 
 
 @router.post("/admin/regions/export-csv", response_class=StreamingResponse)
-def export_regions_csv(db: Session = Depends(get_db)):
+async def export_regions_csv(db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Region).filter(Region.active == True, Region.deleted == False)
-        result = db.execute(stmt)
-        regions = result.scalars().all()
+        result = await db.execute(stmt.limit(1))
 
-        if not regions:
+        if result.first() is None:
             return error_response(status_code=404, error_message="No regions found to export.")
 
         # Define CSV headers
         csv_headers = ["No", "Name", "Slug", "Longitude", "Latitude"]
 
-        # Create a StringIO object to hold the CSV data
-        csv_data = StringIO()
-        csv_writer = csv.writer(csv_data)
-
-        # Write the headers to the CSV
-        csv_writer.writerow(csv_headers)
-
-        # Add the row number (No) and data for each region
-        for idx, region in enumerate(regions, start=1):  # start=1 to begin the "No" column at 1
-            csv_writer.writerow([
+        # Rows are fetched in batches and written out while the response is being sent
+        return stream_csv(
+            stmt.order_by(Region.id),
+            csv_headers,
+            lambda idx, region: [
                 idx,  # Row number (No)
                 region.name,
                 region.slug,
                 region.lon,
                 region.lat,
-            ])
-
-        # Rewind the StringIO object to the beginning for streaming
-        csv_data.seek(0)
-
-        # Return the CSV data as a streaming response
-        return StreamingResponse(
-            iter([csv_data.getvalue()]),
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": "attachment; filename=regions.csv",
-                "Content-Length": str(len(csv_data.getvalue())),
-            }
+            ],
+            filename="regions.csv",
         )
 
     except Exception as e:
         # Handle errors and return an appropriate response
         return error_response(status_code=500, error_message=f"Error generating CSV: {str(e)}")
 
-
-
 # UPDATE REGION
 @router.put("/admin/regions/{id}", response_model=RegionRead)
-def update_region(id: int, region_data: RegionUpdate, db: Session = Depends(get_db)):
+async def update_region(id: int, region_data: RegionUpdate, db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Region).filter(Region.id == id)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         region = result.scalars().first()
         
         if not region:
@@ -197,19 +166,19 @@ def update_region(id: int, region_data: RegionUpdate, db: Session = Depends(get_
             region.updated_at = datetime.utcnow()
             region.updated_by = "System"
 
-        db.commit()
-        db.refresh(region)
+        await db.commit()
+        await db.refresh(region)
         
-        return success_response(data=jsonable_encoder(RegionRead.from_orm(region)))
+        return success_response(data=json_row(RegionRead, region))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 # SOFT DELETE REGION
 @router.delete("/admin/regions/{id}")
-def soft_delete_region(id: int, delete_data: RegionSoftDelete, db: Session = Depends(get_db)):
+async def soft_delete_region(id: int, delete_data: RegionSoftDelete, db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Region).filter(Region.id == id, Region.deleted == False)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         region = result.scalars().first()
 
         if not region:
@@ -220,7 +189,7 @@ def soft_delete_region(id: int, delete_data: RegionSoftDelete, db: Session = Dep
         region.deleted_by = "System"
         region.deleted_reason = delete_data.deleted_reason
 
-        db.commit()
+        await db.commit()
         return success_response(message="Region successfully deleted")
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
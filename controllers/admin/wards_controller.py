@@ -1,123 +1,129 @@
 from datetime import datetime
 from typing import List
-from fastapi import APIRouter, Depends, UploadFile, File
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Query, UploadFile, File
+from sqlalchemy.ext.asyncio import AsyncSession
 from utils.consts import ADMIN
-from utils.database import get_db
+from utils.database import get_async_db
 from domain.models.ward_model import Ward
 from domain.schema.ward_schema import WardCreate, WardRead, WardSoftDelete, WardUpdate
 from utils.functions import has_role
-from utils.http_response import success_response, error_response
-from fastapi.encoders import jsonable_encoder
-from io import StringIO
+from domain.models.user_model import User
+from utils.security import get_user_from_token
+from utils.cache import WARD_TABLES
+from utils.conditional import conditional_get
+from utils.http_response import success_response, error_response, json_row, json_rows
 from fastapi.responses import StreamingResponse
+from utils.csv_export import stream_csv
+from utils.csv_ingest import CsvFormatError, import_csv_async, parse_name
+from utils.jobs import serialize_job, submit_import_job
 from sqlalchemy.future import select
-import pandas as pd
-import csv
 
 router = APIRouter(tags=["Admin Wards"], dependencies=[Depends(has_role(ADMIN))])
 
+# Conditional GET (ETag / Last-Modified) for the reads below
+cacheable = Depends(conditional_get(WARD_TABLES))
+
 # FETCH ALL
-@router.get("/admin/wards", response_model=List[WardRead])
-def get_wards(db: Session = Depends(get_db)):
+@router.get("/admin/wards", response_model=List[WardRead], dependencies=[cacheable])
+async def get_wards(db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Ward).filter(Ward.active == True, Ward.deleted == False)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         wards = result.scalars().all()
 
         # Serialize object
-        ward_data = [jsonable_encoder(WardRead.from_orm(ward)) for ward in wards]
+        ward_data = json_rows(WardRead, wards)
         return success_response(data=ward_data)
     except Exception as e:
         print("Error fetching wards:", e)
         return error_response(status_code=500, error_message=str(e))
 
 # FIND BY ID
-@router.get("/admin/wards/{id}", response_model=WardRead)
-def get_ward_by_id(id: int, db: Session = Depends(get_db)):
+@router.get("/admin/wards/{id}", response_model=WardRead, dependencies=[cacheable])
+async def get_ward_by_id(id: int, db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Ward).filter(Ward.id == id, Ward.active == True, Ward.deleted == False)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         ward = result.scalar_one_or_none()
 
         if not ward:
             return error_response(status_code=404, error_message="ward not found")
         
-        return success_response(data=jsonable_encoder(WardRead.from_orm(ward)))
+        return success_response(data=json_row(WardRead, ward))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 
 # FIND BY REGION ID
-@router.get("/admin/wards/region/{region_id}", response_model=List[WardRead])
-def get_ward_by_region_id(region_id: int, db: Session = Depends(get_db)):
+@router.get("/admin/wards/region/{region_id}", response_model=List[WardRead], dependencies=[cacheable])
+async def get_ward_by_region_id(region_id: int, db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Ward).filter(Ward.region_id == region_id, Ward.active == True, Ward.deleted == False)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         wards = result.scalars().all()
 
         if not wards:
             return error_response(status_code=404, error_message="ward not found")
         
-        return success_response(data=jsonable_encoder([WardRead.from_orm(ward) for ward in wards]))
+        return success_response(data=json_rows(WardRead, wards))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 
 # FIND BY DISTRICT ID
-@router.get("/admin/wards/district/{district_id}", response_model=List[WardRead])
-def get_ward_by_district_id(district_id: int, db: Session = Depends(get_db)):
+@router.get("/admin/wards/district/{district_id}", response_model=List[WardRead], dependencies=[cacheable])
+async def get_ward_by_district_id(district_id: int, db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Ward).filter(Ward.district_id == district_id, Ward.active == True, Ward.deleted == False)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         wards = result.scalars().all()
 
         if not wards:
             return error_response(status_code=404, error_message="ward not found")
         
-        return success_response(data=jsonable_encoder([WardRead.from_orm(ward) for ward in wards]))
+        return success_response(data=json_rows(WardRead, wards))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 
 # FIND BY CONSTITUENCY ID
-@router.get("/admin/wards/constituency/{constituency_id}", response_model=List[WardRead])
-def get_wards_by_constituency_id(constituency_id: int, db: Session = Depends(get_db)):
+@router.get("/admin/wards/constituency/{constituency_id}", response_model=List[WardRead], dependencies=[cacheable])
+async def get_wards_by_constituency_id(constituency_id: int, db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Ward).filter(Ward.constituency_id == constituency_id, Ward.active == True, Ward.deleted == False)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         wards = result.scalars().all()
 
         if not wards:
             return error_response(status_code=404, error_message="constituency not found")
         
-        return success_response(data=jsonable_encoder([WardRead.from_orm(constituency) for constituency in wards]))
+        return success_response(data=json_rows(WardRead, wards))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 
 # FIND BY NAME
-@router.get("/admin/wards/name/{name}", response_model=WardRead)
-def get_ward_by_name(name: str, db: Session = Depends(get_db)):
+@router.get("/admin/wards/name/{name}", response_model=WardRead, dependencies=[cacheable])
+async def get_ward_by_name(name: str, db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Ward).filter(Ward.name == name, Ward.active == True, Ward.deleted == False)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         ward = result.scalar_one_or_none()
 
         if not ward:
             return error_response(status_code=404, error_message="ward not found")
         
-        return success_response(data=jsonable_encoder(WardRead.from_orm(ward)))
+        return success_response(data=json_row(WardRead, ward))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 
 # CREATE
 @router.post("/admin/wards", response_model=WardCreate)
-def create_ward(ward: WardCreate, db: Session = Depends(get_db)):
+async def create_ward(ward: WardCreate, db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Ward).filter(Ward.name == ward.name)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         existing_ward = result.scalar_one_or_none()
 
         if existing_ward:
@@ -125,20 +131,20 @@ def create_ward(ward: WardCreate, db: Session = Depends(get_db)):
         
         new_data = Ward(name=ward.name, lon=ward.lon, lat=ward.lat, region_id=ward.region_id, district_id=ward.district_id, constituency_id=ward.constituency_id)
         db.add(new_data)
-        db.commit()
-        db.refresh(new_data)
+        await db.commit()
+        await db.refresh(new_data)
 
-        return success_response(data=jsonable_encoder(WardRead.from_orm(new_data)))
+        return success_response(data=json_row(WardRead, new_data))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 
 # UPDATE WARD
 @router.put("/admin/wards/{id}", response_model=WardRead)
-def update_ward(id: int, ward_data: WardUpdate, db: Session = Depends(get_db)):
+async def update_ward(id: int, ward_data: WardUpdate, db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Ward).filter(Ward.id == id)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         ward = result.scalar_one_or_none()
 
         if not ward:
@@ -151,20 +157,20 @@ def update_ward(id: int, ward_data: WardUpdate, db: Session = Depends(get_db)):
         ward.updated_at = datetime.utcnow()
         ward.updated_by = "System"
 
-        db.commit()
-        db.refresh(ward)
+        await db.commit()
+        await db.refresh(ward)
 
-        return success_response(data=jsonable_encoder(WardRead.from_orm(ward)))
+        return success_response(data=json_row(WardRead, ward))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 
 # SOFT DELETE WARD
 @router.delete("/admin/wards/{id}")
-def soft_delete_ward(id: int, delete_data: WardSoftDelete, db: Session = Depends(get_db)):
+async def soft_delete_ward(id: int, delete_data: WardSoftDelete, db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Ward).filter(Ward.id == id, Ward.deleted == False)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         ward = result.scalar_one_or_none()
 
         if not ward:
@@ -175,7 +181,7 @@ def soft_delete_ward(id: int, delete_data: WardSoftDelete, db: Session = Depends
         ward.deleted_by = "System"
         ward.deleted_reason = delete_data.deleted_reason
 
-        db.commit()
+        await db.commit()
 
         return success_response(message="ward successfully deleted")
     except Exception as e:
@@ -184,96 +190,65 @@ def soft_delete_ward(id: int, delete_data: WardSoftDelete, db: Session = Depends
 
 # UPLOAD CONSTITUENCIES
 @router.post("/admin/wards/upload")
-def upload_wards_csv(
-    file: UploadFile = File(...), db: Session = Depends(get_db)
+async def upload_wards_csv(
+    file: UploadFile = File(...), 
+    background: bool = Query(False),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_user_from_token)
 ):
     try:
-        df = pd.read_csv(file.file)
-
-        if "name" not in df.columns:
-            return error_response(status_code=400, error_message="csv must contain a 'name' column.")
-
-        processed_wards = []
-
-        for _, row in df.iterrows():
-            name = row["name"].strip()
-
-            stmt = select(Ward).filter(Ward.name == name)
-            result = db.execute(stmt)
-            existing_wards = result.scalars().first()
-
-            if existing_wards:
-                if existing_wards.active is False and existing_wards.deleted is True:
-                    continue
-                existing_wards.updated_at = datetime.utcnow()
-                existing_wards.updated_by = "System"
-            else:
-                new_wards = Ward(
-                    name=name,
-                    created_at=datetime.utcnow(),
-                    created_by="System",
-                    updated_at=datetime.utcnow(),
-                    updated_by="System",
-                    active=True,
-                    deleted=False,
-                )
-                db.add(new_wards)
-            
-            processed_wards.append(name)
-
-        db.commit()
-        return success_response(
-            message=f"csv processed successfully. Ward updated/added: {len(processed_wards)}",
-            data=processed_wards,
+        options = dict(
+            columns={"name": parse_name},
+            required={"name"},
+            update_columns=(),
+            audit_user="System",
         )
 
-    except pd.errors.EmptyDataError:
-        return error_response(status_code=400, error_message="csv file is empty.")
+        # Large files can be queued instead, progress is polled at /admin/jobs/{id}
+        if background:
+            job = await submit_import_job(db, file, Ward, created_by=current_user.email, **options)
+            return success_response(status_code=202, message="CSV queued for processing", data=serialize_job(job))
+
+        # Parsed and upserted batch by batch, each batch commits on its own so memory stays flat
+        report = await import_csv_async(db, file.file, Ward, **options)
+        return success_response(
+            message=f"csv processed successfully. Ward updated/added: {report.processed}",
+            data=report.to_dict(),
+        )
+    except CsvFormatError as e:
+        return error_response(status_code=400, error_message=str(e))
     except Exception as e:
         return error_response(status_code=500, error_message=f"Error processing CSV: {str(e)}")
 
 
 
 @router.post("/admin/wards/export-csv", response_class=StreamingResponse)
-def export_wards_csv(db: Session = Depends(get_db)):
+async def export_wards_csv(db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Ward).filter(Ward.active == True, Ward.deleted == False)
-        result = db.execute(stmt)
-        wards = result.scalars().all()
+        result = await db.execute(stmt.limit(1))
 
-        if not wards:
+        if result.first() is None:
             return error_response(status_code=404, error_message="No ward found to export.")
 
         # Define CSV headers
         csv_headers = ["No", "Name", "Slug", "Longitude", "Latitude", "RegionId", "DistrictId", "ConstituencyId"]
 
-        csv_data = StringIO()
-        csv_writer = csv.writer(csv_data)
-
-        # Write the headers to the CSV
-        csv_writer.writerow(csv_headers)
-
-        for idx, ward in enumerate(wards, start=1):  
-            csv_writer.writerow([
-                idx, 
+        # Rows are fetched in batches and written out while the response is being sent
+        return stream_csv(
+            stmt.order_by(Ward.id),
+            csv_headers,
+            lambda idx, ward: [
+                idx,
                 ward.name,
                 ward.slug,
                 ward.lon,
                 ward.lat,
                 ward.region_id,
                 ward.district_id,
-                ward.constituency_id
-            ])
-
-        csv_data.seek(0)
-
-        return StreamingResponse(
-            iter([csv_data.getvalue()]),
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": "attachment; filename=constituencies.csv",
-                "Content-Length": str(len(csv_data.getvalue())),
-            }
+                ward.constituency_id,
+            ],
+            filename="wards.csv",
         )
 
     except Exception as e:
@@ -1,29 +1,30 @@
 from datetime import datetime
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import update
 from sqlalchemy.future import select 
 from utils.consts import USER
-from utils.database import get_db
+from utils.database import get_async_db
 from domain.models.user_model import User  
 from domain.schema.user_schema import UserCreate, UserLogin, UserRead
-from utils.http_response import success_response, error_response
-from fastapi.encoders import jsonable_encoder
-from utils.security import hash_password, verify_password, create_access_token
+from utils.http_response import success_response, error_response, json_row
+from utils.passwords import PasswordPoolBusy, password_pool
+from utils.security import create_access_token
 
 router = APIRouter(tags=["Auth"])
 
 
 # REGISTER
 @router.post("/register", response_model=UserRead)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     try:
-        result = db.execute(select(User).filter(User.email == user.email))
+        result = await db.execute(select(User).filter(User.email == user.email))
         db_user = result.scalars().first()  
 
         if db_user:
             return error_response(status_code=400, error_message="user already exists")
 
-        hashed_password = hash_password(user.password)
+        hashed_password = await password_pool.hash(user.password)
         new_user = User(
             first_name=user.first_name,
             last_name=user.last_name,
@@ -35,30 +36,50 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
             updated_at=datetime.utcnow(),
         )
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
 
         return success_response(
-            data=jsonable_encoder(UserRead.from_orm(new_user)),
+            data=json_row(UserRead, new_user),
             message="user registered successfully"
         )
+    except PasswordPoolBusy as e:
+        return error_response(status_code=503, error_message=str(e))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
  
     
 # LOGIN
 @router.post("/login")
-def login(user: UserLogin, db: Session = Depends(get_db)):
+async def login(user: UserLogin, db: AsyncSession = Depends(get_async_db)):
     try:
-        result = db.execute(select(User).filter(User.email == user.email))
+        result = await db.execute(select(User).filter(User.email == user.email))
         db_user = result.scalars().first()  
 
-        if not db_user or not verify_password(user.password, db_user.password):
+        if not db_user:
             return error_response(status_code=400, error_message="invalid email or password")
 
-        # Token Info
+        valid, new_hash = await password_pool.verify_and_update(user.password, db_user.password)
+        if not valid:
+            return error_response(status_code=400, error_message="invalid email or password")
+
+        if not db_user.active or db_user.deleted:
+            return error_response(status_code=401, error_message="user is not active")
+
+        # Stored hash uses other rounds than configured, replace it without revoking the user's tokens
+        if new_hash:
+            await db.execute(
+                update(User).where(User.id == db_user.id).values(password=new_hash)
+                .execution_options(synchronize_session=False, password_rehash=True)
+            )
+            await db.commit()
+
+        # Token Info, uid/role_id/epoch let requests authorize without loading the user
         access_token, expiry_time = create_access_token(data={
             "sub": db_user.email,
+            "uid": db_user.id,
+            "role_id": db_user.role_id,
+            "epoch": db_user.token_epoch or 0,
             "first_name": db_user.first_name,
             "last_name": db_user.last_name,
             "organization": db_user.organization
@@ -72,5 +93,7 @@ def login(user: UserLogin, db: Session = Depends(get_db)):
             },
             message="authentication successful"
         )
+    except PasswordPoolBusy as e:
+        return error_response(status_code=503, error_message=str(e))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
@@ -1,24 +1,24 @@
 from datetime import datetime
 from typing import List, Optional
 from fastapi import APIRouter, Depends, Query, UploadFile, File
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from domain.models.user_model import User
 from utils.security import get_user_from_token
 from domain.models.chiefdom_model import Chiefdom
 from domain.models.district_model import District
 from domain.models.region_model import Region
-from domain.schema.chiefdom_schema import ChiefdomCreate, ChiefdomRead, ChiefdomSoftDelete, ChiefdomUpdate
+from domain.schema.chiefdom_schema import ChiefdomCreate, ChiefdomListRead, ChiefdomRead, ChiefdomSoftDelete, ChiefdomUpdate
 from utils.consts import SUPER
-from utils.database import get_db
+from utils.database import get_async_db
 from utils.functions import has_role
-from utils.http_response import success_response, error_response
-from fastapi.encoders import jsonable_encoder
-from io import StringIO
-from utils.pagination_sorting import PaginationParams, paginate_and_sort
+from utils.http_response import success_response, error_response, json_row, json_rows
+from utils.fuzzy import fuzzy_filter
+from utils.pagination_sorting import PaginationError, PaginationParams, paginate_and_sort
 from fastapi.responses import StreamingResponse
+from utils.csv_export import stream_csv
+from utils.csv_ingest import CsvFormatError, import_csv_async, parse_name
+from utils.jobs import serialize_job, submit_import_job
 from sqlalchemy.future import select
-import pandas as pd
-import csv
 
 
 #router =  APIRouter(tags=["Super Chiefdoms"], dependencies=[Depends(has_role(SUPER))] )
@@ -26,15 +26,17 @@ router =  APIRouter(tags=["Super Chiefdoms"])
 
 # FETCH ALL
 @router.get("/super/chiefdoms", response_model=List[ChiefdomRead])
-def get_chiefdoms(
-    db: Session = Depends(get_db),
+async def get_chiefdoms(
+    db: AsyncSession = Depends(get_async_db),
     skip: int = Query(0, ge=0),  
     limit: int = Query(10, ge=1, le=100),  
     sort_field: Optional[str] = Query(None),
     sort_order: Optional[str] = Query("asc"),
+    cursor: Optional[str] = Query(None),
     id: Optional[int] = Query(None),
     name: Optional[str] = Query(None),
     slug: Optional[str] = Query(None),
+    fuzzy: bool = Query(False),
     lon: Optional[float] = Query(None),
     lat: Optional[float] = Query(None),
     region_id: Optional[int] = Query(None),
@@ -57,7 +59,10 @@ def get_chiefdoms(
         if id is not None:
             stmt = stmt.filter(Chiefdom.id == id)
         if name:
-            stmt = stmt.filter(Chiefdom.name.ilike(f"%{name}%"))
+            if fuzzy:
+                stmt = await fuzzy_filter(db, stmt, Chiefdom.name, name)
+            else:
+                stmt = stmt.filter(Chiefdom.name.ilike(f"%{name}%"))
         if slug:
             stmt = stmt.filter(Chiefdom.slug.ilike(f"%{slug}%"))
         if lon is not None and lat is not None:
@@ -80,31 +85,30 @@ def get_chiefdoms(
             stmt = stmt.filter(Chiefdom.updatedBy.ilike(f"%{updated_by}%"))
 
         # Pagination and sorting
-        pagination_params = PaginationParams(skip=skip, limit=limit, sort_field=sort_field, sort_order=sort_order)
+        pagination_params = PaginationParams(skip=skip, limit=limit, sort_field=sort_field, sort_order=sort_order, cursor=cursor, model=Chiefdom, ranked=fuzzy and bool(name))
         paginated_query = paginate_and_sort(stmt, pagination_params)
 
-        result = db.execute(paginated_query)
+        result = await db.execute(paginated_query)
         chiefdoms = result.all()  
+        chiefdoms, next_cursor = pagination_params.paginate(chiefdoms)
 
-        return success_response(data=[{
-            **jsonable_encoder(ChiefdomRead.from_orm(chiefdom[0])),
-            "region_name": chiefdom[1],
-            "district_name": chiefdom[2], 
-        } for chiefdom in chiefdoms])
+        return success_response(data=json_rows(ChiefdomListRead, chiefdoms), next_cursor=next_cursor)
 
+    except PaginationError as e:
+        return error_response(status_code=400, error_message=str(e))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 # CREATE
 @router.post("/super/chiefdoms", response_model=ChiefdomCreate)
-def create_chiefdom(
+async def create_chiefdom(
     chiefdom: ChiefdomCreate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_user_from_token)
     ):
     try:
         stmt = select(Chiefdom).filter(Chiefdom.name == chiefdom.name)
-        result =  db.execute(stmt)
+        result = await db.execute(stmt)
         existing_chiefdom = result.scalar_one_or_none()
 
         if existing_chiefdom:
@@ -120,24 +124,24 @@ def create_chiefdom(
             updated_by=current_user.email
             )
         db.add(new_data)
-        db.commit()
-        db.refresh(new_data)
+        await db.commit()
+        await db.refresh(new_data)
 
-        return success_response(data=jsonable_encoder(ChiefdomRead.from_orm(new_data)))
+        return success_response(data=json_row(ChiefdomRead, new_data))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 # UPDATE
 @router.put("/super/chiefdoms/{id}", response_model=ChiefdomRead)
-def update_chiefdom(
+async def update_chiefdom(
     id: int, 
     chiefdom_data: ChiefdomUpdate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_user_from_token)
     ):
     try:
         stmt = select(Chiefdom).filter(Chiefdom.id == id)
-        result =  db.execute(stmt)
+        result = await db.execute(stmt)
         chiefdom = result.scalar_one_or_none()
 
         if not chiefdom:
@@ -150,86 +154,63 @@ def update_chiefdom(
         chiefdom.updated_at = datetime.utcnow()
         chiefdom.updated_by = current_user.email
 
-        db.commit()
-        db.refresh(chiefdom)
+        await db.commit()
+        await db.refresh(chiefdom)
 
-        return success_response(data=jsonable_encoder(ChiefdomRead.from_orm(chiefdom)))
+        return success_response(data=json_row(ChiefdomRead, chiefdom))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 # UPLOAD
 @router.post("/super/chiefdoms/upload")
-def upload_chiefdoms_csv(
+async def upload_chiefdoms_csv(
     file: UploadFile = File(...), 
-    db: Session = Depends(get_db),
+    background: bool = Query(False),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_user_from_token)
     ):
     try:
-        df = pd.read_csv(file.file)
-
-        if "name" not in df.columns:
-            return error_response(status_code=400, error_message="CSV must contain a 'name' column.")
-
-        processed_chiefdoms = []
-
-        for _, row in df.iterrows():
-            name = row["name"].strip()
-
-            stmt = select(Chiefdom).filter(Chiefdom.name == name)
-            result =  db.execute(stmt)
-            existing_chiefdom = result.scalars().first()
+        options = dict(
+            columns={"name": parse_name},
+            required={"name"},
+            update_columns=(),
+            audit_user=current_user.email,
+        )
 
-            if existing_chiefdom:
-                if existing_chiefdom.active is False and existing_chiefdom.deleted is True:
-                    continue
-                existing_chiefdom.updated_at = datetime.utcnow()
-                existing_chiefdom.updated_by = current_user.email
-            else:
-                new_chiefdom = Chiefdom(
-                    name=name,
-                    created_at=datetime.utcnow(),
-                    created_by=current_user.email,
-                    updated_at=datetime.utcnow(),
-                    updated_by=current_user.email,
-                    active=True,
-                    deleted=False,
-                )
-                db.add(new_chiefdom)
-            
-            processed_chiefdoms.append(name)
+        # Large files can be queued instead, progress is polled at /super/jobs/{id}
+        if background:
+            job = await submit_import_job(db, file, Chiefdom, created_by=current_user.email, **options)
+            return success_response(status_code=202, message="CSV queued for processing", data=serialize_job(job))
 
-            db.commit()
+        # Parsed and upserted batch by batch, each batch commits on its own so memory stays flat
+        report = await import_csv_async(db, file.file, Chiefdom, **options)
         return success_response(
-            message=f"CSV processed successfully. Chiefdom updated/added: {len(processed_chiefdoms)}",
-            data=processed_chiefdoms,
+            message=f"CSV processed successfully. Chiefdom updated/added: {report.processed}",
+            data=report.to_dict(),
         )
-
-    except pd.errors.EmptyDataError:
-        return error_response(status_code=400, error_message="CSV file is empty.")
+    except CsvFormatError as e:
+        return error_response(status_code=400, error_message=str(e))
     except Exception as e:
         return error_response(status_code=500, error_message=f"Error processing CSV: {str(e)}")
 
 # EXPORT
 @router.post("/super/chiefdoms/export-csv", response_class=StreamingResponse)
-def export_chiefdoms_csv(db: Session = Depends(get_db)):
+async def export_chiefdoms_csv(db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Chiefdom).filter(Chiefdom.active == True, Chiefdom.deleted == False)
-        result =  db.execute(stmt)
-        chiefdoms = result.scalars().all()
+        result = await db.execute(stmt.limit(1))
 
-        if not chiefdoms:
+        if result.first() is None:
             return error_response(status_code=404, error_message="No chiefdom found to export.")
 
-        #define CSV headers
+        # Define CSV headers
         csv_headers = ["No", "Name", "Slug", "Longitude", "Latitude", "RegionId", "DistrictId"]
 
-        csv_data = StringIO()
-        csv_writer = csv.writer(csv_data)
-
-        csv_writer.writerow(csv_headers)
-
-        for idx, chiefdom in enumerate(chiefdoms, start=1):  
-            csv_writer.writerow([
+        # Rows are fetched in batches and written out while the response is being sent
+        return stream_csv(
+            stmt.order_by(Chiefdom.id),
+            csv_headers,
+            lambda idx, chiefdom: [
                 idx,
                 chiefdom.name,
                 chiefdom.slug,
@@ -237,17 +218,8 @@ def export_chiefdoms_csv(db: Session = Depends(get_db)):
                 chiefdom.lat,
                 chiefdom.region_id,
                 chiefdom.district_id,
-            ])
-
-        csv_data.seek(0)
-
-        return StreamingResponse(
-            iter([csv_data.getvalue()]),
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": "attachment; filename=chiefdoms.csv",
-                "Content-Length": str(len(csv_data.getvalue())),
-            }
+            ],
+            filename="chiefdoms.csv",
         )
 
     except Exception as e:
@@ -255,15 +227,15 @@ def export_chiefdoms_csv(db: Session = Depends(get_db)):
 
 # SOFT DELETE
 @router.delete("/super/chiefdoms/{id}")
-def soft_delete_chiefdom(
+async def soft_delete_chiefdom(
     id: int, 
     delete_data: ChiefdomSoftDelete, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_user_from_token)
     ):
     try:
         stmt = select(Chiefdom).filter(Chiefdom.id == id, Chiefdom.deleted == False)
-        result =  db.execute(stmt)
+        result = await db.execute(stmt)
         chiefdom = result.scalar_one_or_none()
 
         if not chiefdom:
@@ -274,7 +246,7 @@ def soft_delete_chiefdom(
         chiefdom.deleted_by = current_user.email
         chiefdom.deleted_reason = delete_data.deleted_reason
 
-        db.commit()
+        await db.commit()
 
         return success_response(message="chiefdom successfully deleted")
     except Exception as e:
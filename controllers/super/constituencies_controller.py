@@ -1,24 +1,24 @@
 from datetime import datetime
 from typing import List, Optional
 from fastapi import APIRouter, Depends, Query, UploadFile, File
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from domain.models.user_model import User
 from utils.security import get_user_from_token
 from domain.models.district_model import District
 from domain.models.region_model import Region
 from utils.consts import SUPER
-from utils.database import get_db
+from utils.database import get_async_db
 from domain.models.constituency_model import Constituency 
-from domain.schema.constituency_schema import ConstituencyCreate, ConstituencyRead, ConstituencySoftDelete, ConstituencyUpdate
+from domain.schema.constituency_schema import ConstituencyCreate, ConstituencyListRead, ConstituencyRead, ConstituencySoftDelete, ConstituencyUpdate
 from utils.functions import has_role
-from utils.http_response import success_response, error_response
-from fastapi.encoders import jsonable_encoder
-from io import StringIO
-from utils.pagination_sorting import PaginationParams, paginate_and_sort
+from utils.http_response import success_response, error_response, json_row, json_rows
+from utils.fuzzy import fuzzy_filter
+from utils.pagination_sorting import PaginationError, PaginationParams, paginate_and_sort
 from fastapi.responses import StreamingResponse
+from utils.csv_export import stream_csv
+from utils.csv_ingest import CsvFormatError, import_csv_async, parse_name
+from utils.jobs import serialize_job, submit_import_job
 from sqlalchemy.future import select
-import pandas as pd
-import csv
 
 
 #router =  APIRouter(tags=["Super Constituencies"], dependencies=[Depends(has_role(SUPER))] )
@@ -26,15 +26,17 @@ router =  APIRouter(tags=["Super Constituencies"])
 
 # FETCH ALL
 @router.get("/super/constituencies", response_model=List[ConstituencyRead])
-def get_constituencies(
-    db: Session = Depends(get_db),
+async def get_constituencies(
+    db: AsyncSession = Depends(get_async_db),
     skip: int = Query(0, ge=0),  
     limit: int = Query(10, ge=1, le=100),  
     sort_field: Optional[str] = Query(None),
     sort_order: Optional[str] = Query("asc"),
+    cursor: Optional[str] = Query(None),
     id: Optional[int] = Query(None),
     name: Optional[str] = Query(None),
     slug: Optional[str] = Query(None),
+    fuzzy: bool = Query(False),
     lon: Optional[float] = Query(None),
     lat: Optional[float] = Query(None),
     region_id: Optional[int] = Query(None),
@@ -57,7 +59,10 @@ def get_constituencies(
         if id is not None:
             stmt = stmt.filter(Constituency.id == id)
         if name:
-            stmt = stmt.filter(Constituency.name.ilike(f"%{name}%"))
+            if fuzzy:
+                stmt = await fuzzy_filter(db, stmt, Constituency.name, name)
+            else:
+                stmt = stmt.filter(Constituency.name.ilike(f"%{name}%"))
         if slug:
             stmt = stmt.filter(Constituency.slug.ilike(f"%{slug}%"))
         if lon is not None and lat is not None:
@@ -80,31 +85,30 @@ def get_constituencies(
             stmt = stmt.filter(Constituency.updatedBy.ilike(f"%{updated_by}%"))
 
         # Pagination and sorting
-        pagination_params = PaginationParams(skip=skip, limit=limit, sort_field=sort_field, sort_order=sort_order)
+        pagination_params = PaginationParams(skip=skip, limit=limit, sort_field=sort_field, sort_order=sort_order, cursor=cursor, model=Constituency, ranked=fuzzy and bool(name))
         paginated_query = paginate_and_sort(stmt, pagination_params)
 
-        result = db.execute(paginated_query)
+        result = await db.execute(paginated_query)
         constituencies = result.all()  
+        constituencies, next_cursor = pagination_params.paginate(constituencies)
 
-        return success_response(data=[{
-            **jsonable_encoder(ConstituencyRead.from_orm(constituency[0])),
-            "region_name": constituency[1],
-            "district_name": constituency[2], 
-        } for constituency in constituencies])
+        return success_response(data=json_rows(ConstituencyListRead, constituencies), next_cursor=next_cursor)
 
+    except PaginationError as e:
+        return error_response(status_code=400, error_message=str(e))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 # CREATE
 @router.post("/super/constituencies", response_model=ConstituencyCreate)
-def create_constituency(
+async def create_constituency(
     constituency: ConstituencyCreate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_user_from_token)
     ):
     try:
         stmt = select(Constituency).filter(Constituency.name == constituency.name)
-        result =  db.execute(stmt)
+        result = await db.execute(stmt)
         existing_constituency = result.scalar_one_or_none()
 
         if existing_constituency:
@@ -120,24 +124,24 @@ def create_constituency(
             updated_by=current_user.email
         )
         db.add(new_data)
-        db.commit()
-        db.refresh(new_data)
+        await db.commit()
+        await db.refresh(new_data)
 
-        return success_response(data=jsonable_encoder(ConstituencyRead.from_orm(new_data)))
+        return success_response(data=json_row(ConstituencyRead, new_data))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 # UPDATE
 @router.put("/super/constituencies/{id}", response_model=ConstituencyRead)
-def update_constituency(
+async def update_constituency(
     id: int, 
     constituency_data: ConstituencyUpdate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_user_from_token)
     ):
     try:
         stmt = select(Constituency).filter(Constituency.id == id)
-        result =  db.execute(stmt)
+        result = await db.execute(stmt)
         constituency = result.scalar_one_or_none()
 
         if not constituency:
@@ -150,86 +154,63 @@ def update_constituency(
         constituency.updated_at = datetime.utcnow()
         constituency.updated_by = current_user.email
 
-        db.commit()
-        db.refresh(constituency)
+        await db.commit()
+        await db.refresh(constituency)
 
-        return success_response(data=jsonable_encoder(ConstituencyRead.from_orm(constituency)))
+        return success_response(data=json_row(ConstituencyRead, constituency))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 # UPLOAD
 @router.post("/super/constituencies/upload")
-def upload_constituencies_csv(
+async def upload_constituencies_csv(
     file: UploadFile = File(...), 
-    db: Session = Depends(get_db),
+    background: bool = Query(False),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_user_from_token)
     ):
     try:
-        df = pd.read_csv(file.file)
-
-        if "name" not in df.columns:
-            return error_response(status_code=400, error_message="CSV must contain a 'name' column.")
-
-        processed_constituencies = []
-
-        for _, row in df.iterrows():
-            name = row["name"].strip()
-
-            stmt = select(Constituency).filter(Constituency.name == name)
-            result =  db.execute(stmt)
-            existing_constituency = result.scalars().first()
+        options = dict(
+            columns={"name": parse_name},
+            required={"name"},
+            update_columns=(),
+            audit_user=current_user.email,
+        )
 
-            if existing_constituency:
-                if existing_constituency.active is False and existing_constituency.deleted is True:
-                    continue
-                existing_constituency.updated_at = datetime.utcnow()
-                existing_constituency.updated_by = current_user.email
-            else:
-                new_constituency = Constituency(
-                    name=name,
-                    created_at=datetime.utcnow(),
-                    created_by=current_user.email,
-                    updated_at=datetime.utcnow(),
-                    updated_by=current_user.email,
-                    active=True,
-                    deleted=False,
-                )
-                db.add(new_constituency)
-            
-            processed_constituencies.append(name)
+        # Large files can be queued instead, progress is polled at /super/jobs/{id}
+        if background:
+            job = await submit_import_job(db, file, Constituency, created_by=current_user.email, **options)
+            return success_response(status_code=202, message="CSV queued for processing", data=serialize_job(job))
 
-            db.commit()
+        # Parsed and upserted batch by batch, each batch commits on its own so memory stays flat
+        report = await import_csv_async(db, file.file, Constituency, **options)
         return success_response(
-            message=f"CSV processed successfully. Constituency updated/added: {len(processed_constituencies)}",
-            data=processed_constituencies,
+            message=f"CSV processed successfully. Constituency updated/added: {report.processed}",
+            data=report.to_dict(),
         )
-
-    except pd.errors.EmptyDataError:
-        return error_response(status_code=400, error_message="CSV file is empty.")
+    except CsvFormatError as e:
+        return error_response(status_code=400, error_message=str(e))
     except Exception as e:
         return error_response(status_code=500, error_message=f"Error processing CSV: {str(e)}")
 
 # EXPORT
 @router.post("/super/constituencies/export-csv", response_class=StreamingResponse)
-def export_constituencies_csv(db: Session = Depends(get_db)):
+async def export_constituencies_csv(db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Constituency).filter(Constituency.active == True, Constituency.deleted == False)
-        result =  db.execute(stmt)
-        constituencies = result.scalars().all()
+        result = await db.execute(stmt.limit(1))
 
-        if not constituencies:
+        if result.first() is None:
             return error_response(status_code=404, error_message="No constituencies found to export.")
 
-        #define CSV headers
+        # Define CSV headers
         csv_headers = ["No", "Name", "Slug", "Longitude", "Latitude", "RegionId", "DistrictId"]
 
-        csv_data = StringIO()
-        csv_writer = csv.writer(csv_data)
-
-        csv_writer.writerow(csv_headers)
-
-        for idx, constituency in enumerate(constituencies, start=1):  
-            csv_writer.writerow([
+        # Rows are fetched in batches and written out while the response is being sent
+        return stream_csv(
+            stmt.order_by(Constituency.id),
+            csv_headers,
+            lambda idx, constituency: [
                 idx,
                 constituency.name,
                 constituency.slug,
@@ -237,17 +218,8 @@ def export_constituencies_csv(db: Session = Depends(get_db)):
                 constituency.lat,
                 constituency.region_id,
                 constituency.district_id,
-            ])
-
-        csv_data.seek(0)
-
-        return StreamingResponse(
-            iter([csv_data.getvalue()]),
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": "attachment; filename=constituencies.csv",
-                "Content-Length": str(len(csv_data.getvalue())),
-            }
+            ],
+            filename="constituencies.csv",
         )
 
     except Exception as e:
@@ -255,15 +227,15 @@ def export_constituencies_csv(db: Session = Depends(get_db)):
 
 # SOFT DELETE
 @router.delete("/super/constituencies/{id}")
-def soft_delete_constituency(
+async def soft_delete_constituency(
     id: int, 
     delete_data: ConstituencySoftDelete, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_user_from_token)
     ):
     try:
         stmt = select(Constituency).filter(Constituency.id == id, Constituency.deleted == False)
-        result =  db.execute(stmt)
+        result = await db.execute(stmt)
         constituency = result.scalar_one_or_none()
 
         if not constituency:
@@ -274,7 +246,7 @@ def soft_delete_constituency(
         constituency.deleted_by = current_user.email
         constituency.deleted_reason = delete_data.deleted_reason
 
-        db.commit()
+        await db.commit()
 
         return success_response(message="constituency successfully deleted")
     except Exception as e:
@@ -1,23 +1,23 @@
 from datetime import datetime
 from typing import List, Optional
 from fastapi import APIRouter, Depends, Query, UploadFile, File
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from domain.models.user_model import User
 from utils.security import get_user_from_token
 from domain.models.region_model import Region
 from utils.consts import SUPER
-from utils.database import get_db
+from utils.database import get_async_db
 from domain.models.district_model import District  
-from domain.schema.district_schema import DistrictCreate, DistrictRead, DistrictSoftDelete, DistrictUpdate
+from domain.schema.district_schema import DistrictCreate, DistrictListRead, DistrictRead, DistrictSoftDelete, DistrictUpdate
 from utils.functions import has_role
-from utils.http_response import success_response, error_response
-from fastapi.encoders import jsonable_encoder
-from io import StringIO
+from utils.http_response import success_response, error_response, json_row, json_rows
 from fastapi.responses import StreamingResponse
+from utils.csv_export import stream_csv
+from utils.csv_ingest import CsvFormatError, import_csv_async, parse_name
+from utils.jobs import serialize_job, submit_import_job
 from sqlalchemy.future import select
-from utils.pagination_sorting import PaginationParams, paginate_and_sort
-import pandas as pd
-import csv
+from utils.fuzzy import fuzzy_filter
+from utils.pagination_sorting import PaginationError, PaginationParams, paginate_and_sort
 
 
 # router = APIRouter(tags=["Super Districts"], dependencies=[Depends(has_role(SUPER))] )
@@ -25,15 +25,17 @@ router = APIRouter(tags=["Super Districts"])
 
 # FETCH ALL
 @router.get("/super/districts", response_model=List[DistrictRead])
-def get_districts(
-    db: Session = Depends(get_db),
+async def get_districts(
+    db: AsyncSession = Depends(get_async_db),
     skip: int = Query(0, ge=0),  
     limit: int = Query(10, ge=1, le=100),  
     sort_field: Optional[str] = Query(None),
     sort_order: Optional[str] = Query("asc"),
+    cursor: Optional[str] = Query(None),
     id: Optional[int] = Query(None),
     name: Optional[str] = Query(None),
     slug: Optional[str] = Query(None),
+    fuzzy: bool = Query(False),
     lon: Optional[float] = Query(None),
     lat: Optional[float] = Query(None),
     region_id: Optional[int] = Query(None),
@@ -49,7 +51,10 @@ def get_districts(
         if id is not None:
             stmt = stmt.filter(District.id == id)
         if name:
-            stmt = stmt.filter(District.name.ilike(f"%{name}%"))
+            if fuzzy:
+                stmt = await fuzzy_filter(db, stmt, District.name, name)
+            else:
+                stmt = stmt.filter(District.name.ilike(f"%{name}%"))
         if slug:
             stmt = stmt.filter(District.slug.ilike(f"%{slug}%"))
         if lon is not None and lat is not None:
@@ -70,30 +75,30 @@ def get_districts(
             stmt = stmt.filter(District.updatedBy.ilike(f"%{updated_by}%"))
 
         # Pagination and sorting
-        pagination_params = PaginationParams(skip=skip, limit=limit, sort_field=sort_field, sort_order=sort_order)
+        pagination_params = PaginationParams(skip=skip, limit=limit, sort_field=sort_field, sort_order=sort_order, cursor=cursor, model=District, ranked=fuzzy and bool(name))
         paginated_query = paginate_and_sort(stmt, pagination_params)
 
-        result = db.execute(paginated_query)
+        result = await db.execute(paginated_query)
         districts = result.all()  
+        districts, next_cursor = pagination_params.paginate(districts)
 
-        return success_response(data=[{
-            **jsonable_encoder(DistrictRead.from_orm(district[0])),
-            "region_name": district[1]  
-        } for district in districts])
+        return success_response(data=json_rows(DistrictListRead, districts), next_cursor=next_cursor)
 
+    except PaginationError as e:
+        return error_response(status_code=400, error_message=str(e))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 # CREATE
 @router.post("/super/districts", response_model=DistrictCreate)
-def create_district(
+async def create_district(
     district: DistrictCreate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_user_from_token)
     ):
     try:
         stmt = select(District).filter(District.name == district.name)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         existing_district = result.scalars().first()
 
         if existing_district:
@@ -108,92 +113,58 @@ def create_district(
             updated_by=current_user.email
         )
         db.add(new_district)
-        db.commit()
-        db.refresh(new_district)
-        return success_response(data=jsonable_encoder(DistrictRead.from_orm(new_district)))
+        await db.commit()
+        await db.refresh(new_district)
+        return success_response(data=json_row(DistrictRead, new_district))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 # UPLOAD
 @router.post("/super/districts/upload")
-def upload_districts_csv(
+async def upload_districts_csv(
     file: UploadFile = File(...), 
-    db: Session = Depends(get_db),
+    background: bool = Query(False),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_user_from_token)
     ):
     try:
         if not file.filename.endswith(".csv"):
             return error_response(status_code=400, error_message="Only CSV files are allowed.")
 
-        df = pd.read_csv(file.file, encoding="utf-8", delimiter=",", header=0)
-        print("CSV Columns:", df.columns.tolist())
-        df.columns = df.columns.str.strip()
-        required_columns = {"no", "name", "lon", "lat", "region_id"}
-        if not required_columns.issubset(df.columns):
-            return error_response(
-                status_code=400,
-                error_message=f"Invalid CSV content format. Expected: {list(required_columns)}, but got: {df.columns.tolist()}."
-            )
-
-        processed_districts = []
-
-        for _, row in df.iterrows():
-            name = row["name"].strip()
-            lon = row["lon"]
-            lat = row["lat"]
-            region_id = row["region_id"]
-
-            # Check if district already exists
-            stmt = select(District).filter(District.name == name)
-            result = db.execute(stmt)
-            existing_district = result.scalars().first()
-
-            if existing_district:
-                if existing_district.active is False and existing_district.deleted is True:
-                    continue
-                existing_district.lon = lon
-                existing_district.lat = lat
-                existing_district.updated_at = datetime.utcnow()
-                existing_district.updated_by = current_user.email
-            else:
-                new_district = District(
-                    name=name,
-                    lon=lon,
-                    lat=lat,
-                    region_id=region_id,
-                    created_at=datetime.utcnow(),
-                    created_by=current_user.email,
-                    updated_at=datetime.utcnow(),
-                    updated_by=current_user.email,
-                    active=True,
-                    deleted=False,
-                )
-                db.add(new_district)
+        options = dict(
+            columns={"name": parse_name, "lon": float, "lat": float, "region_id": int},
+            required={"no", "name", "lon", "lat", "region_id"},
+            update_columns=("lon", "lat"),
+            audit_user=current_user.email,
+        )
 
-            processed_districts.append({"name": name, "longitude": lon, "latitude": lat, "region_id": region_id})
+        # Large files can be queued instead, progress is polled at /super/jobs/{id}
+        if background:
+            job = await submit_import_job(db, file, District, created_by=current_user.email, **options)
+            return success_response(status_code=202, message="CSV queued for processing", data=serialize_job(job))
 
-        db.commit()
+        # Parsed and upserted batch by batch, each batch commits on its own so memory stays flat
+        report = await import_csv_async(db, file.file, District, **options)
         return success_response(
-            message=f"CSV processed successfully. District(s) updated/added: {len(processed_districts)}",
-            data=processed_districts,
+            message=f"CSV processed successfully. District(s) updated/added: {report.processed}",
+            data=report.to_dict(),
         )
-
-    except pd.errors.EmptyDataError:
-        return error_response(status_code=400, error_message="CSV file is empty.")
+    except CsvFormatError as e:
+        return error_response(status_code=400, error_message=str(e))
     except Exception as e:
         return error_response(status_code=500, error_message=f"Error processing CSV: {str(e)}")
 
 # UPDATE
 @router.put("/super/districts/{id}", response_model=DistrictRead)
-def update_district(
+async def update_district(
     id: int, 
     district_data: DistrictUpdate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_user_from_token)
     ):
     try:
         stmt = select(District).filter(District.id == id)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         district = result.scalars().first()
 
         if not district:
@@ -206,55 +177,38 @@ def update_district(
         district.updated_at = datetime.utcnow()
         district.updated_by = current_user.email
 
-        db.commit()
-        db.refresh(district)
+        await db.commit()
+        await db.refresh(district)
 
-        return success_response(data=jsonable_encoder(DistrictRead.from_orm(district)))
+        return success_response(data=json_row(DistrictRead, district))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 # EXPORT
 @router.post("/super/districts/export-csv", response_class=StreamingResponse)
-def export_districts_csv(db: Session = Depends(get_db)):
+async def export_districts_csv(db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(District).filter(District.active == True, District.deleted == False)
-        result = db.execute(stmt)
-        districts = result.scalars().all()
+        result = await db.execute(stmt.limit(1))
 
-        if not districts:
+        if result.first() is None:
             return error_response(status_code=404, error_message="No districts found to export.")
 
         # Define CSV headers
         csv_headers = ["No", "Name", "Region ID", "Longitude", "Latitude", "RegionId"]
 
-        # Create a StringIO object to hold the CSV data
-        csv_data = StringIO()
-        csv_writer = csv.writer(csv_data)
-
-        # Write the headers to the CSV
-        csv_writer.writerow(csv_headers)
-
-        # Add the row number (No) and data for each district
-        for idx, district in enumerate(districts, start=1):
-            csv_writer.writerow([
+        # Rows are fetched in batches and written out while the response is being sent
+        return stream_csv(
+            stmt.order_by(District.id),
+            csv_headers,
+            lambda idx, district: [
                 idx,  # Row number (No)
                 district.name,
                 district.region_id,
                 district.lon,
                 district.lat,
-            ])
-
-        # Rewind the StringIO object to the beginning for streaming
-        csv_data.seek(0)
-
-        # Return the CSV data as a streaming response
-        return StreamingResponse(
-            iter([csv_data.getvalue()]),
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": "attachment; filename=districts.csv",
-                "Content-Length": str(len(csv_data.getvalue())),
-            }
+            ],
+            filename="districts.csv",
         )
 
     except Exception as e:
@@ -262,15 +216,15 @@ def export_districts_csv(db: Session = Depends(get_db)):
 
 # SOFT DELETE
 @router.delete("/super/districts/{id}")
-def soft_delete_district(
+async def soft_delete_district(
     id: int, 
     delete_data: DistrictSoftDelete, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_user_from_token)
     ):
     try:
         stmt = select(District).filter(District.id == id, District.deleted == False)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         district = result.scalars().first()
 
         if not district:
@@ -281,7 +235,7 @@ def soft_delete_district(
         district.deleted_by = current_user.email
         district.deleted_reason = delete_data.deleted_reason
 
-        db.commit()
+        await db.commit()
         return success_response(message="District successfully deleted")
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from utils.consts import SUPER
+from utils.database import get_async_db
+from domain.models.import_job_model import ImportJob
+from domain.schema.import_job_schema import ImportJobRead
+from utils.functions import has_role
+from utils.http_response import success_response, error_response
+from utils.jobs import serialize_job
+
+router = APIRouter(tags=["Super Jobs"], dependencies=[Depends(has_role(SUPER))])
+
+# FIND BY ID
+@router.get("/super/jobs/{id}", response_model=ImportJobRead)
+async def get_job_by_id(id: str, db: AsyncSession = Depends(get_async_db)):
+    try:
+        job = await db.get(ImportJob, id)
+        if not job:
+            return error_response(status_code=404, error_message="job not found")
+
+        return success_response(data=serialize_job(job))
+    except Exception as e:
+        return error_response(status_code=500, error_message=str(e))
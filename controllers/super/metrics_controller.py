@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends
+from utils.cache import location_cache
+from utils.conditional import table_validators
+from utils.consts import SUPER
+from utils.db_metrics import get_pool_stats
+from utils.location_store import location_store
+from utils.passwords import password_pool
+from utils.rate_limit import rate_limiter
+from utils.rate_limit_policy import rate_limit_policies
+from utils.principal import principal_cache
+from utils.snapshot import snapshot_store
+from utils.functions import has_role
+from utils.http_response import success_response, error_response
+
+router = APIRouter(tags=["Super Metrics"], dependencies=[Depends(has_role(SUPER))])
+
+# DATABASE POOL
+@router.get("/super/metrics/database")
+async def get_database_metrics():
+    try:
+        return success_response(data=get_pool_stats())
+    except Exception as e:
+        return error_response(status_code=500, error_message=str(e))
+
+# LOCATION CACHE
+@router.get("/super/metrics/cache")
+async def get_cache_metrics():
+    try:
+        return success_response(data={**location_cache.stats(), "store": location_store.stats(), "principals": principal_cache.stats(), "snapshot": snapshot_store.stats(), "validators": table_validators.stats()})
+    except Exception as e:
+        return error_response(status_code=500, error_message=str(e))
+
+# PASSWORD HASHING POOL
+@router.get("/super/metrics/passwords")
+async def get_password_metrics():
+    try:
+        return success_response(data=password_pool.stats())
+    except Exception as e:
+        return error_response(status_code=500, error_message=str(e))
+
+# RATE LIMITER
+@router.get("/super/metrics/rate-limit")
+async def get_rate_limit_metrics():
+    try:
+        return success_response(data={**rate_limiter.stats(), "policies": rate_limit_policies.stats()})
+    except Exception as e:
+        return error_response(status_code=500, error_message=str(e))
@@ -1,22 +1,22 @@
 from datetime import datetime
 from typing import List, Optional
 from fastapi import APIRouter, Depends, UploadFile, File, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from domain.models.user_model import User
 from utils.security import get_user_from_token
 from utils.consts import SUPER
-from utils.database import get_db
+from utils.database import get_async_db
 from domain.models.region_model import Region  
 from domain.schema.region_schema import RegionCreate, RegionRead, RegionSoftDelete, RegionUpdate
 from utils.functions import has_role
-from utils.http_response import success_response, error_response
-from fastapi.encoders import jsonable_encoder
-from io import StringIO
+from utils.http_response import success_response, error_response, json_row, json_rows
 from fastapi.responses import StreamingResponse
+from utils.csv_export import stream_csv
+from utils.csv_ingest import CsvFormatError, import_csv_async, parse_name
+from utils.jobs import serialize_job, submit_import_job
 from sqlalchemy.future import select
-from utils.pagination_sorting import PaginationParams, paginate_and_sort
-import pandas as pd
-import csv
+from utils.fuzzy import fuzzy_filter
+from utils.pagination_sorting import PaginationError, PaginationParams, paginate_and_sort
 
 
 # router = APIRouter(tags=["Super Regions"], dependencies=[Depends(has_role(SUPER))] )
@@ -24,15 +24,17 @@ router = APIRouter(tags=["Super Regions"])
 
 # FETCH ALL
 @router.get("/super/regions", response_model=List[RegionRead])
-def get_regions(
-    db: Session = Depends(get_db),
+async def get_regions(
+    db: AsyncSession = Depends(get_async_db),
     skip: int = Query(0, ge=0),  
     limit: int = Query(10, ge=1, le=100),  
     sort_field: Optional[str] = Query(None),
     sort_order: Optional[str] = Query("asc"),
+    cursor: Optional[str] = Query(None),
     id: Optional[int] = Query(None),
     name: Optional[str] = Query(None),
     slug: Optional[str] = Query(None),
+    fuzzy: bool = Query(False),
     lon: Optional[float] = Query(None),
     lat: Optional[float] = Query(None),
     created_at: Optional[str] = Query(None),
@@ -47,7 +49,10 @@ def get_regions(
         if id is not None:
             stmt = stmt.filter(Region.id == id)
         if name:
-            stmt = stmt.filter(Region.name.ilike(f"%{name}%"))
+            if fuzzy:
+                stmt = await fuzzy_filter(db, stmt, Region.name, name)
+            else:
+                stmt = stmt.filter(Region.name.ilike(f"%{name}%"))
         if slug:
             stmt = stmt.filter(Region.slug.ilike(f"%{slug}%"))
         if lon is not None and lat is not None:
@@ -66,28 +71,31 @@ def get_regions(
             stmt = stmt.filter(Region.updatedBy.ilike(f"%{updated_by}%"))
 
         # Pagination and sorting
-        pagination_params = PaginationParams(skip=skip, limit=limit, sort_field=sort_field, sort_order=sort_order)
+        pagination_params = PaginationParams(skip=skip, limit=limit, sort_field=sort_field, sort_order=sort_order, cursor=cursor, model=Region, ranked=fuzzy and bool(name))
         paginated_query = paginate_and_sort(stmt, pagination_params)
 
-        result = db.execute(paginated_query)
+        result = await db.execute(paginated_query)
         regions = result.scalars().all()
+        regions, next_cursor = pagination_params.paginate(regions)
 
         # Serialized Response
-        return success_response(data=[jsonable_encoder(RegionRead.from_orm(region)) for region in regions])
+        return success_response(data=json_rows(RegionRead, regions), next_cursor=next_cursor)
 
+    except PaginationError as e:
+        return error_response(status_code=400, error_message=str(e))
     except Exception as e:
         print("Error fetching regions:", e)
         return error_response(status_code=500, error_message=str(e))
     
 # CREATE
 @router.post("/super/regions", response_model=RegionCreate)
-def create_region(
+async def create_region(
     region: RegionCreate, 
-    db: Session = Depends(get_db), 
+    db: AsyncSession = Depends(get_async_db), 
     current_user: User = Depends(get_user_from_token)):
     try:
         stmt = select(Region).filter(Region.name == region.name)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         existing_region = result.scalars().first()
         
         if existing_region:
@@ -101,18 +109,19 @@ def create_region(
             updated_by=current_user.email
         )
         db.add(new_region)
-        db.commit()
-        db.refresh(new_region)
+        await db.commit()
+        await db.refresh(new_region)
         
-        return success_response(data=jsonable_encoder(RegionRead.from_orm(new_region)))
+        return success_response(data=json_row(RegionRead, new_region))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 # UPLOAD
 @router.post("/super/regions/upload")
-def upload_regions_csv(
+async def upload_regions_csv(
     file: UploadFile = File(...), 
-    db: Session = Depends(get_db),
+    background: bool = Query(False),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_user_from_token)
     ):
     try:
@@ -122,96 +131,54 @@ def upload_regions_csv(
         if file.filename != "regions.csv":
             return error_response(status_code=400, error_message="File must be named 'regions.csv'.")
 
-        df = pd.read_csv(file.file, encoding="utf-8", delimiter=",", header=0)
-        print("CSV Columns:", df.columns.tolist())
-        df.columns = df.columns.str.strip()
-        required_columns = {"no", "name", "lon", "lat"}
-        if not required_columns.issubset(df.columns):
-            return error_response(
-                status_code=400,
-                error_message=f"Invalid CSV content format. Expected: {list(required_columns)}, but got: {df.columns.tolist()}."
-            )
-
-        processed_regions = []
-
-        for _, row in df.iterrows():
-            name = row["name"].strip()
-            lon = row["lon"]
-            lat = row["lat"]
+        options = dict(
+            columns={"name": parse_name, "lon": float, "lat": float},
+            required={"no", "name", "lon", "lat"},
+            update_columns=("lon", "lat"),
+            audit_user=current_user.email,
+        )
 
-            # Check if region already exists
-            stmt = select(Region).filter(Region.name == name)
-            result = db.execute(stmt)
-            existing_region = result.scalars().first()
+        # Large files can be queued instead, progress is polled at /super/jobs/{id}
+        if background:
+            job = await submit_import_job(db, file, Region, created_by=current_user.email, **options)
+            return success_response(status_code=202, message="CSV queued for processing", data=serialize_job(job))
 
-            if existing_region:
-                if existing_region.active is False and existing_region.deleted is True:
-                    continue
-                existing_region.lon = lon
-                existing_region.lat = lat
-                existing_region.updated_at = datetime.utcnow()
-                existing_region.updated_by = current_user.email
-            else:
-                new_region = Region(
-                    name=name,
-                    lon=lon,
-                    lat=lat,
-                    created_at=datetime.utcnow(),
-                    created_by=current_user.email,
-                    updated_at=datetime.utcnow(),
-                    updated_by=current_user.email,
-                    active=True,
-                    deleted=False,
-                )
-                db.add(new_region)
-
-            processed_regions.append({"name": name, "longitude": lon, "latitude": lat})
-        db.commit()
+        # Parsed and upserted batch by batch, each batch commits on its own so memory stays flat
+        report = await import_csv_async(db, file.file, Region, **options)
         return success_response(
-            message=f"CSV processed successfully. Region(s) updated/added: {len(processed_regions)}",
-            data=processed_regions,
+            message=f"CSV processed successfully. Region(s) updated/added: {report.processed}",
+            data=report.to_dict(),
         )
-    except pd.errors.EmptyDataError:
-        return error_response(status_code=400, error_message="CSV file is empty.")
+    except CsvFormatError as e:
+        return error_response(status_code=400, error_message=str(e))
     except Exception as e:
         return error_response(status_code=500, error_message=f"Error processing CSV: {str(e)}")
 
 # EXPORT
 @router.post("/super/regions/export-csv", response_class=StreamingResponse)
-def export_regions_csv(db: Session = Depends(get_db)):
+async def export_regions_csv(db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Region).filter(Region.active == True, Region.deleted == False)
-        result = db.execute(stmt)
-        regions = result.scalars().all()
+        result = await db.execute(stmt.limit(1))
 
-        if not regions:
+        if result.first() is None:
             return error_response(status_code=404, error_message="No regions found to export.")
 
-        # CSV headers
+        # Define CSV headers
         csv_headers = ["No", "Name", "Slug", "Longitude", "Latitude"]
 
-        csv_data = StringIO()
-        csv_writer = csv.writer(csv_data)
-        csv_writer.writerow(csv_headers)
-
-        for idx, region in enumerate(regions, start=1): 
-            csv_writer.writerow([
-                idx, 
+        # Rows are fetched in batches and written out while the response is being sent
+        return stream_csv(
+            stmt.order_by(Region.id),
+            csv_headers,
+            lambda idx, region: [
+                idx,
                 region.name,
                 region.slug,
                 region.lon,
                 region.lat,
-            ])
-
-        csv_data.seek(0)
-
-        return StreamingResponse(
-            iter([csv_data.getvalue()]),
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": "attachment; filename=regions.csv",
-                "Content-Length": str(len(csv_data.getvalue())),
-            }
+            ],
+            filename="regions.csv",
         )
 
     except Exception as e:
@@ -219,15 +186,15 @@ def export_regions_csv(db: Session = Depends(get_db)):
 
 # UPDATE
 @router.put("/super/regions/{id}", response_model=RegionRead)
-def update_region(
+async def update_region(
     id: int, 
     region_data: RegionUpdate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_user_from_token)
     ):
     try:
         stmt = select(Region).filter(Region.id == id)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         region = result.scalars().first()
         
         if not region:
@@ -239,24 +206,24 @@ def update_region(
             region.updated_at = datetime.utcnow()
             region.updated_by = current_user.email
 
-        db.commit()
-        db.refresh(region)
+        await db.commit()
+        await db.refresh(region)
         
-        return success_response(data=jsonable_encoder(RegionRead.from_orm(region)))
+        return success_response(data=json_row(RegionRead, region))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 # SOFT DELETE
 @router.delete("/super/regions/{id}")
-def soft_delete_region(
+async def soft_delete_region(
     id: int, 
     delete_data: RegionSoftDelete, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_user_from_token)
     ):
     try:
         stmt = select(Region).filter(Region.id == id, Region.deleted == False)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         region = result.scalars().first()
 
         if not region:
@@ -267,7 +234,7 @@ def soft_delete_region(
         region.deleted_by = current_user.email
         region.deleted_reason = delete_data.deleted_reason
 
-        db.commit()
+        await db.commit()
         return success_response(message="Region successfully deleted")
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
@@ -2,30 +2,30 @@ from datetime import datetime
 from typing import List
 from typing import List, Optional
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from domain.models.user_model import User
 from utils.security import get_user_from_token
 from sqlalchemy.future import select 
 from utils.consts import SUPER
-from utils.database import get_db
+from utils.database import get_async_db
 from domain.models.role_model import Role 
 from domain.schema.role_schema import RoleCreate, RoleRead, RoleSoftDelete, RoleUpdate
 from utils.functions import has_role
-from utils.http_response import success_response, error_response
-from fastapi.encoders import jsonable_encoder
+from utils.http_response import success_response, error_response, json_row, json_rows
 
-from utils.pagination_sorting import PaginationParams, paginate_and_sort
+from utils.pagination_sorting import PaginationError, PaginationParams, paginate_and_sort
 
 router = APIRouter(tags=["Super Roles"], dependencies=[Depends(has_role(SUPER))])
 
 # FETCH ALL
 @router.get("/super/roles", response_model=List[RoleRead])
-def get_roles(
-    db: Session = Depends(get_db),
+async def get_roles(
+    db: AsyncSession = Depends(get_async_db),
     skip: int = Query(0, ge=0),  
     limit: int = Query(10, ge=1, le=100),  
     sort_field: Optional[str] = Query(None),
     sort_order: Optional[str] = Query("asc"),
+    cursor: Optional[str] = Query(None),
     id: Optional[int] = Query(None),
     name: Optional[str] = Query(None),
     slug: Optional[str] = Query(None),
@@ -54,29 +54,32 @@ def get_roles(
             stmt = stmt.filter(Role.updatedBy.ilike(f"%{updated_by}%"))
 
         # Pagination and sorting
-        pagination_params = PaginationParams(skip=skip, limit=limit, sort_field=sort_field, sort_order=sort_order)
+        pagination_params = PaginationParams(skip=skip, limit=limit, sort_field=sort_field, sort_order=sort_order, cursor=cursor, model=Role)
         paginated_query = paginate_and_sort(stmt, pagination_params)
 
-        result = db.execute(paginated_query)
+        result = await db.execute(paginated_query)
         roles = result.scalars().all()
+        roles, next_cursor = pagination_params.paginate(roles)
 
         # Serialized Response
-        return success_response(data=[jsonable_encoder(RoleRead.from_orm(role)) for role in roles])
+        return success_response(data=json_rows(RoleRead, roles), next_cursor=next_cursor)
 
+    except PaginationError as e:
+        return error_response(status_code=400, error_message=str(e))
     except Exception as e:
         print("Error fetching roles:", e)
         return error_response(status_code=500, error_message=str(e))
 
 # CREATE
 @router.post("/super/roles", response_model=RoleRead) 
-def create_role(
+async def create_role(
     role: RoleCreate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_user_from_token)
     ):
     try:
         query = select(Role).filter(Role.name == role.name)
-        result = db.execute(query)
+        result = await db.execute(query)
         existing_role = result.scalars().first()
 
         if existing_role:
@@ -85,25 +88,25 @@ def create_role(
         # Create a new role
         new_role = Role(name=role.name)
         db.add(new_role)
-        db.commit()  
-        db.refresh(new_role)
+        await db.commit()  
+        await db.refresh(new_role)
         
-        return success_response(data=jsonable_encoder(RoleRead.from_orm(new_role)))
+        return success_response(data=json_row(RoleRead, new_role))
     except Exception as e:
         print(f"Error creating role: {e}")
         return error_response(status_code=500, error_message=str(e))
 
 # UPDATE
 @router.put("/super/roles/{id}", response_model=RoleRead)
-def update_role(
+async def update_role(
     id: int, 
     role_data: RoleUpdate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_user_from_token)
     ):
     try:
         query = select(Role).filter(Role.id == id)
-        result = db.execute(query)
+        result = await db.execute(query)
         role = result.scalars().first()
 
         if not role:
@@ -117,25 +120,25 @@ def update_role(
         role.updated_at = datetime.utcnow()
         role.updated_by = "System"
 
-        db.commit()
-        db.refresh(role)
+        await db.commit()
+        await db.refresh(role)
 
-        return success_response(data=jsonable_encoder(RoleRead.from_orm(role)))
+        return success_response(data=json_row(RoleRead, role))
     except Exception as e:
         print(f"Error updating role ID {id}: {e}")
         return error_response(status_code=500, error_message=str(e))
 
 # SOFT DELETE
 @router.delete("/super/roles/{id}")
-def soft_delete_role(
+async def soft_delete_role(
     id: int, 
     delete_data: RoleSoftDelete, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_user_from_token)
     ):
     try:
         query = select(Role).filter(Role.id == id, Role.deleted == False)
-        result = db.execute(query)
+        result = await db.execute(query)
         role = result.scalars().first()
 
         if not role:
@@ -147,7 +150,7 @@ def soft_delete_role(
         role.deleted_by = "System"
         role.deleted_reason = delete_data.deleted_reason
 
-        db.commit()
+        await db.commit()
         return success_response(message="role successfully deleted", data=None)  
     except Exception as e:
         print(f"Error soft deleting role ID {id}: {e}")
@@ -1,40 +1,42 @@
 from datetime import datetime
 from typing import List, Optional
 from fastapi import APIRouter, Depends, Query, UploadFile, File
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from domain.models.user_model import User
 from utils.security import get_user_from_token
 from domain.models.constituency_model import Constituency
 from domain.models.district_model import District
 from domain.models.region_model import Region
 from utils.consts import SUPER
-from utils.database import get_db
+from utils.database import get_async_db
 from domain.models.ward_model import Ward
-from domain.schema.ward_schema import WardCreate, WardRead, WardSoftDelete, WardUpdate
+from domain.schema.ward_schema import WardCreate, WardListRead, WardRead, WardSoftDelete, WardUpdate
 from utils.functions import has_role
-from utils.http_response import success_response, error_response
-from fastapi.encoders import jsonable_encoder
-from io import StringIO
+from utils.http_response import success_response, error_response, json_row, json_rows
 from fastapi.responses import StreamingResponse
+from utils.csv_export import stream_csv
+from utils.csv_ingest import CsvFormatError, import_csv_async, parse_name
+from utils.jobs import serialize_job, submit_import_job
 from sqlalchemy.future import select
-import pandas as pd
-import csv
 
-from utils.pagination_sorting import PaginationParams, paginate_and_sort
+from utils.fuzzy import fuzzy_filter
+from utils.pagination_sorting import PaginationError, PaginationParams, paginate_and_sort
 
 router = APIRouter(tags=["Super Wards"], dependencies=[Depends(has_role(SUPER))])
 
 # FETCH ALL
 @router.get("/super/wards", response_model=List[WardRead])
-def get_wards(
-    db: Session = Depends(get_db),
+async def get_wards(
+    db: AsyncSession = Depends(get_async_db),
     skip: int = Query(0, ge=0),  
     limit: int = Query(10, ge=1, le=100),  
     sort_field: Optional[str] = Query(None),
     sort_order: Optional[str] = Query("asc"),
+    cursor: Optional[str] = Query(None),
     id: Optional[int] = Query(None),
     name: Optional[str] = Query(None),
     slug: Optional[str] = Query(None),
+    fuzzy: bool = Query(False),
     lon: Optional[float] = Query(None),
     lat: Optional[float] = Query(None),
     region_id: Optional[int] = Query(None),
@@ -60,7 +62,10 @@ def get_wards(
         if id is not None:
             stmt = stmt.filter(Ward.id == id)
         if name:
-            stmt = stmt.filter(Ward.name.ilike(f"%{name}%"))
+            if fuzzy:
+                stmt = await fuzzy_filter(db, stmt, Ward.name, name)
+            else:
+                stmt = stmt.filter(Ward.name.ilike(f"%{name}%"))
         if slug:
             stmt = stmt.filter(Ward.slug.ilike(f"%{slug}%"))
         if lon is not None and lat is not None:
@@ -85,33 +90,31 @@ def get_wards(
             stmt = stmt.filter(Ward.updatedBy.ilike(f"%{updated_by}%"))
 
         # Pagination and sorting
-        pagination_params = PaginationParams(skip=skip, limit=limit, sort_field=sort_field, sort_order=sort_order)
+        pagination_params = PaginationParams(skip=skip, limit=limit, sort_field=sort_field, sort_order=sort_order, cursor=cursor, model=Ward, ranked=fuzzy and bool(name))
         paginated_query = paginate_and_sort(stmt, pagination_params)
 
-        result = db.execute(paginated_query)
+        result = await db.execute(paginated_query)
         wards = result.all()  
+        wards, next_cursor = pagination_params.paginate(wards)
 
-        return success_response(data=[{
-            **jsonable_encoder(WardRead.from_orm(ward[0])),
-            "region_name": ward[1],
-            "district_name": ward[2], 
-            "constituency_name": ward[3], 
-        } for ward in wards])
+        return success_response(data=json_rows(WardListRead, wards), next_cursor=next_cursor)
 
+    except PaginationError as e:
+        return error_response(status_code=400, error_message=str(e))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 
 # CREATE
 @router.post("/super/wards", response_model=WardCreate)
-def create_ward(
+async def create_ward(
     ward: WardCreate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_user_from_token)
     ):
     try:
         stmt = select(Ward).filter(Ward.name == ward.name)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         existing_ward = result.scalar_one_or_none()
 
         if existing_ward:
@@ -119,24 +122,24 @@ def create_ward(
         
         new_data = Ward(name=ward.name, lon=ward.lon, lat=ward.lat, region_id=ward.region_id, district_id=ward.district_id, constituency_id=ward.constituency_id)
         db.add(new_data)
-        db.commit()
-        db.refresh(new_data)
+        await db.commit()
+        await db.refresh(new_data)
 
-        return success_response(data=jsonable_encoder(WardRead.from_orm(new_data)))
+        return success_response(data=json_row(WardRead, new_data))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 # UPDATE
 @router.put("/super/wards/{id}", response_model=WardRead)
-def update_ward(
+async def update_ward(
     id: int, 
     ward_data: WardUpdate, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_user_from_token)
     ):
     try:
         stmt = select(Ward).filter(Ward.id == id)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         ward = result.scalar_one_or_none()
 
         if not ward:
@@ -149,110 +152,73 @@ def update_ward(
         ward.updated_at = datetime.utcnow()
         ward.updated_by = "System"
 
-        db.commit()
-        db.refresh(ward)
+        await db.commit()
+        await db.refresh(ward)
 
-        return success_response(data=jsonable_encoder(WardRead.from_orm(ward)))
+        return success_response(data=json_row(WardRead, ward))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
   
 # UPLOAD
 @router.post("/super/wards/upload")
-def upload_wards_csv(
+async def upload_wards_csv(
     file: UploadFile = File(...), 
-    db: Session = Depends(get_db),
+    background: bool = Query(False),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_user_from_token)
     ):
     try:
-        df = pd.read_csv(file.file)
-
-        if "name" not in df.columns:
-            return error_response(status_code=400, error_message="csv must contain a 'name' column.")
-
-        processed_wards = []
-
-        for _, row in df.iterrows():
-            name = row["name"].strip()
-
-            stmt = select(Ward).filter(Ward.name == name)
-            result = db.execute(stmt)
-            existing_wards = result.scalars().first()
+        options = dict(
+            columns={"name": parse_name},
+            required={"name"},
+            update_columns=(),
+            audit_user="System",
+        )
 
-            if existing_wards:
-                if existing_wards.active is False and existing_wards.deleted is True:
-                    continue
-                existing_wards.updated_at = datetime.utcnow()
-                existing_wards.updated_by = "System"
-            else:
-                new_wards = Ward(
-                    name=name,
-                    created_at=datetime.utcnow(),
-                    created_by="System",
-                    updated_at=datetime.utcnow(),
-                    updated_by="System",
-                    active=True,
-                    deleted=False,
-                )
-                db.add(new_wards)
-            
-            processed_wards.append(name)
+        # Large files can be queued instead, progress is polled at /super/jobs/{id}
+        if background:
+            job = await submit_import_job(db, file, Ward, created_by=current_user.email, **options)
+            return success_response(status_code=202, message="CSV queued for processing", data=serialize_job(job))
 
-        db.commit()
+        # Parsed and upserted batch by batch, each batch commits on its own so memory stays flat
+        report = await import_csv_async(db, file.file, Ward, **options)
         return success_response(
-            message=f"csv processed successfully. Ward updated/added: {len(processed_wards)}",
-            data=processed_wards,
+            message=f"csv processed successfully. Ward updated/added: {report.processed}",
+            data=report.to_dict(),
         )
-
-    except pd.errors.EmptyDataError:
-        return error_response(status_code=400, error_message="csv file is empty.")
+    except CsvFormatError as e:
+        return error_response(status_code=400, error_message=str(e))
     except Exception as e:
         return error_response(status_code=500, error_message=f"Error processing CSV: {str(e)}")
 
 # EXPORT
 @router.post("/super/wards/export-csv", response_class=StreamingResponse)
-def export_wards_csv(db: Session = Depends(get_db)):
+async def export_wards_csv(db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Ward).filter(Ward.active == True, Ward.deleted == False)
-        result = db.execute(stmt)
-        wards = result.scalars().all()
+        result = await db.execute(stmt.limit(1))
 
-        if not wards:
+        if result.first() is None:
             return error_response(status_code=404, error_message="No ward found to export.")
 
         # Define CSV headers
         csv_headers = ["No", "Name", "Slug", "Longitude", "Latitude", "RegionId", "DistrictId", "ConstituencyId"]
 
-        # Create a StringIO object to hold the CSV data
-        csv_data = StringIO()
-        csv_writer = csv.writer(csv_data)
-
-        # Write the headers to the CSV
-        csv_writer.writerow(csv_headers)
-
-        # Add the row number (No) and data for each ward
-        for idx, ward in enumerate(wards, start=1):  
-            csv_writer.writerow([
-                idx, 
+        # Rows are fetched in batches and written out while the response is being sent
+        return stream_csv(
+            stmt.order_by(Ward.id),
+            csv_headers,
+            lambda idx, ward: [
+                idx,
                 ward.name,
                 ward.slug,
                 ward.lon,
                 ward.lat,
                 ward.region_id,
                 ward.district_id,
-                ward.constituency_id
-            ])
-
-        # Rewind the StringIO object to the beginning for streaming
-        csv_data.seek(0)
-
-        # Return the CSV data as a streaming response
-        return StreamingResponse(
-            iter([csv_data.getvalue()]),
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": "attachment; filename=constituencies.csv",
-                "Content-Length": str(len(csv_data.getvalue())),
-            }
+                ward.constituency_id,
+            ],
+            filename="wards.csv",
         )
 
     except Exception as e:
@@ -261,15 +227,15 @@ def export_wards_csv(db: Session = Depends(get_db)):
 
 # SOFT DELETE
 @router.delete("/super/wards/{id}")
-def soft_delete_ward(
+async def soft_delete_ward(
     id: int, 
     delete_data: WardSoftDelete, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_user_from_token)
     ):
     try:
         stmt = select(Ward).filter(Ward.id == id, Ward.deleted == False)
-        result = db.execute(stmt)
+        result = await db.execute(stmt)
         ward = result.scalar_one_or_none()
 
         if not ward:
@@ -280,7 +246,7 @@ def soft_delete_ward(
         ward.deleted_by = "System"
         ward.deleted_reason = delete_data.deleted_reason
 
-        db.commit()
+        await db.commit()
 
         return success_response(message="ward successfully deleted")
     except Exception as e:
@@ -1,37 +1,42 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from domain.models.chiefdom_model import Chiefdom
 from domain.models.district_model import District
 from domain.models.region_model import Region
-from domain.schema.chiefdom_schema import ChiefdomRead
+from domain.schema.chiefdom_schema import ChiefdomRead, ChiefdomListRead
 from utils.consts import SUPER
-from utils.database import get_db
+from utils.database import get_async_db
 from utils.functions import has_role
-from utils.http_response import success_response, error_response
-from fastapi.encoders import jsonable_encoder
-from io import StringIO
-from utils.pagination_sorting import PaginationParams, paginate_and_sort
+from utils.conditional import CONDITIONAL_MAX_AGE, conditional_get
+from utils.cache import CHIEFDOM_TABLES, location_cache
+from utils.http_response import success_response, error_response, json_rows
+from utils.fuzzy import fuzzy_filter
+from utils.pagination_sorting import PaginationError, PaginationParams, paginate_and_sort
 from fastapi.responses import StreamingResponse
+from utils.csv_export import stream_csv
 from sqlalchemy.future import select
-import pandas as pd
-import csv
 
 
 #router =  APIRouter(tags=["Chiefdoms"], dependencies=[Depends(has_role(SUPER))] )
 router =  APIRouter(tags=["Chiefdoms"])
 
+# Conditional GET (ETag / Last-Modified) for the reads below
+cacheable = Depends(conditional_get(CHIEFDOM_TABLES, max_age=CONDITIONAL_MAX_AGE))
+
 # FETCH ALL
-@router.get("/chiefdoms", response_model=List[ChiefdomRead])
-def get_chiefdoms(
-    db: Session = Depends(get_db),
+@router.get("/chiefdoms", response_model=List[ChiefdomRead], dependencies=[cacheable])
+async def get_chiefdoms(
+    db: AsyncSession = Depends(get_async_db),
     skip: int = Query(0, ge=0),  
     limit: int = Query(10, ge=1, le=100),  
     sort_field: Optional[str] = Query(None),
     sort_order: Optional[str] = Query("asc"),
+    cursor: Optional[str] = Query(None),
     id: Optional[int] = Query(None),
     name: Optional[str] = Query(None),
     slug: Optional[str] = Query(None),
+    fuzzy: bool = Query(False),
     lon: Optional[float] = Query(None),
     lat: Optional[float] = Query(None),
     region_id: Optional[int] = Query(None),
@@ -42,6 +47,11 @@ def get_chiefdoms(
     updated_by: Optional[str] = Query(None)
 ):
     try:
+        cache_key = location_cache.make_key(CHIEFDOM_TABLES, skip=skip, limit=limit, sort_field=sort_field, sort_order=sort_order, cursor=cursor, id=id, name=name, fuzzy=fuzzy, slug=slug, lon=lon, lat=lat, region_id=region_id, district_id=district_id, created_at=created_at, created_by=created_by, updated_at=updated_at, updated_by=updated_by)
+        cached = location_cache.get(cache_key)
+        if cached is not None:
+            return success_response(data=cached[0], next_cursor=cached[1])
+
         stmt = select(
             Chiefdom,
             Region.name.label("region_name"),
@@ -54,7 +64,10 @@ def get_chiefdoms(
         if id is not None:
             stmt = stmt.filter(Chiefdom.id == id)
         if name:
-            stmt = stmt.filter(Chiefdom.name.ilike(f"%{name}%"))
+            if fuzzy:
+                stmt = await fuzzy_filter(db, stmt, Chiefdom.name, name)
+            else:
+                stmt = stmt.filter(Chiefdom.name.ilike(f"%{name}%"))
         if slug:
             stmt = stmt.filter(Chiefdom.slug.ilike(f"%{slug}%"))
         if lon is not None and lat is not None:
@@ -77,42 +90,41 @@ def get_chiefdoms(
             stmt = stmt.filter(Chiefdom.updatedBy.ilike(f"%{updated_by}%"))
 
         # Pagination and sorting
-        pagination_params = PaginationParams(skip=skip, limit=limit, sort_field=sort_field, sort_order=sort_order)
+        pagination_params = PaginationParams(skip=skip, limit=limit, sort_field=sort_field, sort_order=sort_order, cursor=cursor, model=Chiefdom, ranked=fuzzy and bool(name))
         paginated_query = paginate_and_sort(stmt, pagination_params)
 
-        result = db.execute(paginated_query)
+        result = await db.execute(paginated_query)
         chiefdoms = result.all()  
+        chiefdoms, next_cursor = pagination_params.paginate(chiefdoms)
+
+        chiefdoms_data = json_rows(ChiefdomListRead, chiefdoms)
+        location_cache.set(cache_key, (chiefdoms_data, next_cursor))
 
-        return success_response(data=[{
-            **jsonable_encoder(ChiefdomRead.from_orm(chiefdom[0])),
-            "region_name": chiefdom[1],
-            "district_name": chiefdom[2], 
-        } for chiefdom in chiefdoms])
+        return success_response(data=chiefdoms_data, next_cursor=next_cursor)
 
+    except PaginationError as e:
+        return error_response(status_code=400, error_message=str(e))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 # EXPORT
 @router.post("/chiefdoms/export-csv", response_class=StreamingResponse)
-def export_chiefdoms_csv(db: Session = Depends(get_db)):
+async def export_chiefdoms_csv(db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Chiefdom).filter(Chiefdom.active == True, Chiefdom.deleted == False)
-        result =  db.execute(stmt)
-        chiefdoms = result.scalars().all()
+        result = await db.execute(stmt.limit(1))
 
-        if not chiefdoms:
+        if result.first() is None:
             return error_response(status_code=404, error_message="No chiefdom found to export.")
 
-        #define CSV headers
+        # Define CSV headers
         csv_headers = ["No", "Name", "Slug", "Longitude", "Latitude", "RegionId", "DistrictId"]
 
-        csv_data = StringIO()
-        csv_writer = csv.writer(csv_data)
-
-        csv_writer.writerow(csv_headers)
-
-        for idx, chiefdom in enumerate(chiefdoms, start=1):  
-            csv_writer.writerow([
+        # Rows are fetched in batches and written out while the response is being sent
+        return stream_csv(
+            stmt.order_by(Chiefdom.id),
+            csv_headers,
+            lambda idx, chiefdom: [
                 idx,
                 chiefdom.name,
                 chiefdom.slug,
@@ -120,20 +132,9 @@ def export_chiefdoms_csv(db: Session = Depends(get_db)):
                 chiefdom.lat,
                 chiefdom.region_id,
                 chiefdom.district_id,
-            ])
-
-        csv_data.seek(0)
-
-        return StreamingResponse(
-            iter([csv_data.getvalue()]),
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": "attachment; filename=chiefdoms.csv",
-                "Content-Length": str(len(csv_data.getvalue())),
-            }
+            ],
+            filename="chiefdoms.csv",
         )
 
     except Exception as e:
         return error_response(status_code=500, error_message=f"Error generating CSV: {str(e)}")
-
-
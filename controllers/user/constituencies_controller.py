@@ -1,40 +1,51 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from domain.models.district_model import District
 from domain.models.region_model import Region
 from utils.consts import USER
-from utils.database import get_db
+from utils.database import get_async_db
 from domain.models.constituency_model import Constituency 
-from domain.schema.constituency_schema import ConstituencyRead
+from domain.schema.constituency_schema import ConstituencyRead, ConstituencyListRead
 from utils.functions import has_role
-from utils.http_response import success_response, error_response
-from fastapi.encoders import jsonable_encoder
-from io import StringIO
+from utils.conditional import CONDITIONAL_MAX_AGE, conditional_get
+from utils.cache import CONSTITUENCY_TABLES, location_cache
+from utils.http_response import success_response, error_response, json_rows
 from fastapi.responses import StreamingResponse
-from utils.pagination_sorting import PaginationParams, paginate_and_sort
+from utils.csv_export import stream_csv
+from utils.fuzzy import fuzzy_filter
+from utils.pagination_sorting import PaginationError, PaginationParams, paginate_and_sort
 from sqlalchemy.future import select
-import csv
 
 router =  APIRouter(tags=["Constituencies"], dependencies=[Depends(has_role(USER))] )
 
+# Conditional GET (ETag / Last-Modified) for the reads below
+cacheable = Depends(conditional_get(CONSTITUENCY_TABLES, max_age=CONDITIONAL_MAX_AGE))
+
 # FETCH ALL
-@router.get("/constituencies", response_model=List[ConstituencyRead])
-def get_constituencies(
-    db: Session = Depends(get_db),
+@router.get("/constituencies", response_model=List[ConstituencyRead], dependencies=[cacheable])
+async def get_constituencies(
+    db: AsyncSession = Depends(get_async_db),
     skip: int = Query(0, ge=0),  
     limit: int = Query(10, ge=1, le=100),  
     sort_field: Optional[str] = Query(None),
     sort_order: Optional[str] = Query("asc"),
+    cursor: Optional[str] = Query(None),
     id: Optional[int] = Query(None),
     name: Optional[str] = Query(None),
     slug: Optional[str] = Query(None),
+    fuzzy: bool = Query(False),
     lon: Optional[float] = Query(None),
     lat: Optional[float] = Query(None),
     region_id: Optional[int] = Query(None),
     district_id: Optional[int] = Query(None)
 ):
     try:
+        cache_key = location_cache.make_key(CONSTITUENCY_TABLES, skip=skip, limit=limit, sort_field=sort_field, sort_order=sort_order, cursor=cursor, id=id, name=name, fuzzy=fuzzy, slug=slug, lon=lon, lat=lat, region_id=region_id, district_id=district_id)
+        cached = location_cache.get(cache_key)
+        if cached is not None:
+            return success_response(data=cached[0], next_cursor=cached[1])
+
         stmt = select(
             Constituency,
             Region.name.label("region_name"),
@@ -47,7 +58,10 @@ def get_constituencies(
         if id is not None:
             stmt = stmt.filter(Constituency.id == id)
         if name:
-            stmt = stmt.filter(Constituency.name.ilike(f"%{name}%"))
+            if fuzzy:
+                stmt = await fuzzy_filter(db, stmt, Constituency.name, name)
+            else:
+                stmt = stmt.filter(Constituency.name.ilike(f"%{name}%"))
         if slug:
             stmt = stmt.filter(Constituency.slug.ilike(f"%{slug}%"))
         if lon is not None and lat is not None:
@@ -62,42 +76,41 @@ def get_constituencies(
             stmt = stmt.filter(Constituency.district_id == district_id)
 
         # Pagination and sorting
-        pagination_params = PaginationParams(skip=skip, limit=limit, sort_field=sort_field, sort_order=sort_order)
+        pagination_params = PaginationParams(skip=skip, limit=limit, sort_field=sort_field, sort_order=sort_order, cursor=cursor, model=Constituency, ranked=fuzzy and bool(name))
         paginated_query = paginate_and_sort(stmt, pagination_params)
 
-        result = db.execute(paginated_query)
+        result = await db.execute(paginated_query)
         constituencies = result.all()  
+        constituencies, next_cursor = pagination_params.paginate(constituencies)
+
+        constituencies_data = json_rows(ConstituencyListRead, constituencies)
+        location_cache.set(cache_key, (constituencies_data, next_cursor))
 
-        return success_response(data=[{
-            **jsonable_encoder(ConstituencyRead.from_orm(constituency[0])),
-            "region_name": constituency[1],
-            "district_name": constituency[2], 
-        } for constituency in constituencies])
+        return success_response(data=constituencies_data, next_cursor=next_cursor)
 
+    except PaginationError as e:
+        return error_response(status_code=400, error_message=str(e))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 # EXPORT
 @router.post("/constituencies/export-csv", response_class=StreamingResponse)
-def export_constituencies_csv(db: Session = Depends(get_db)):
+async def export_constituencies_csv(db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Constituency).filter(Constituency.active == True, Constituency.deleted == False)
-        result = db.execute(stmt)
-        constituencies = result.scalars().all()
+        result = await db.execute(stmt.limit(1))
 
-        if not constituencies:
+        if result.first() is None:
             return error_response(status_code=404, error_message="No constituencies found to export.")
 
         # Define CSV headers
         csv_headers = ["No", "Name", "Slug", "Longitude", "Latitude", "RegionId", "DistrictId"]
 
-        csv_data = StringIO()
-        csv_writer = csv.writer(csv_data)
-
-        csv_writer.writerow(csv_headers)
-
-        for idx, constituency in enumerate(constituencies, start=1):  
-            csv_writer.writerow([
+        # Rows are fetched in batches and written out while the response is being sent
+        return stream_csv(
+            stmt.order_by(Constituency.id),
+            csv_headers,
+            lambda idx, constituency: [
                 idx,
                 constituency.name,
                 constituency.slug,
@@ -105,20 +118,9 @@ def export_constituencies_csv(db: Session = Depends(get_db)):
                 constituency.lat,
                 constituency.region_id,
                 constituency.district_id,
-            ])
-
-        csv_data.seek(0)
-
-        return StreamingResponse(
-            iter([csv_data.getvalue()]),
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": "attachment; filename=constituencies.csv",
-                "Content-Length": str(len(csv_data.getvalue())),
-            }
+            ],
+            filename="constituencies.csv",
         )
 
     except Exception as e:
         return error_response(status_code=500, error_message=f"Error generating CSV: {str(e)}")
-
-
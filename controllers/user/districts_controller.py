@@ -1,46 +1,60 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from domain.models.region_model import Region
 from utils.consts import USER
-from utils.database import get_db
+from utils.database import get_async_db
 from domain.models.district_model import District  
-from domain.schema.district_schema import DistrictRead
+from domain.schema.district_schema import DistrictRead, DistrictListRead
 from utils.functions import has_role
-from utils.http_response import success_response, error_response
-from fastapi.encoders import jsonable_encoder
-from io import StringIO
+from utils.conditional import CONDITIONAL_MAX_AGE, conditional_get
+from utils.cache import DISTRICT_TABLES, location_cache
+from utils.http_response import success_response, error_response, json_rows
 from fastapi.responses import StreamingResponse
+from utils.csv_export import stream_csv
 from sqlalchemy.future import select
-from utils.pagination_sorting import PaginationParams, paginate_and_sort
-import csv
+from utils.fuzzy import fuzzy_filter
+from utils.pagination_sorting import PaginationError, PaginationParams, paginate_and_sort
 
 
 router = APIRouter(tags=["Districts"], dependencies=[Depends(has_role(USER))] )
 
+# Conditional GET (ETag / Last-Modified) for the reads below
+cacheable = Depends(conditional_get(DISTRICT_TABLES, max_age=CONDITIONAL_MAX_AGE))
+
 # FETCH ALL
-@router.get("/districts", response_model=List[DistrictRead])
-def get_districts(
-    db: Session = Depends(get_db),
+@router.get("/districts", response_model=List[DistrictRead], dependencies=[cacheable])
+async def get_districts(
+    db: AsyncSession = Depends(get_async_db),
     skip: int = Query(0, ge=0),  
     limit: int = Query(10, ge=1, le=100),  
     sort_field: Optional[str] = Query(None),
     sort_order: Optional[str] = Query("asc"),
+    cursor: Optional[str] = Query(None),
     id: Optional[int] = Query(None),
     name: Optional[str] = Query(None),
     slug: Optional[str] = Query(None),
+    fuzzy: bool = Query(False),
     lon: Optional[float] = Query(None),
     lat: Optional[float] = Query(None),
     region_id: Optional[int] = Query(None)
 ):
     try:
+        cache_key = location_cache.make_key(DISTRICT_TABLES, skip=skip, limit=limit, sort_field=sort_field, sort_order=sort_order, cursor=cursor, id=id, name=name, fuzzy=fuzzy, slug=slug, lon=lon, lat=lat, region_id=region_id)
+        cached = location_cache.get(cache_key)
+        if cached is not None:
+            return success_response(data=cached[0], next_cursor=cached[1])
+
         stmt = select(District, Region.name.label("region_name")).join(Region, District.region_id == Region.id).filter(District.active == True, District.deleted == False)
 
         # Filters
         if id is not None:
             stmt = stmt.filter(District.id == id)
         if name:
-            stmt = stmt.filter(District.name.ilike(f"%{name}%"))
+            if fuzzy:
+                stmt = await fuzzy_filter(db, stmt, District.name, name)
+            else:
+                stmt = stmt.filter(District.name.ilike(f"%{name}%"))
         if slug:
             stmt = stmt.filter(District.slug.ilike(f"%{slug}%"))
         if lon is not None and lat is not None:
@@ -53,60 +67,50 @@ def get_districts(
             stmt = stmt.filter(District.region_id == region_id)
 
         # Pagination and sorting
-        pagination_params = PaginationParams(skip=skip, limit=limit, sort_field=sort_field, sort_order=sort_order)
+        pagination_params = PaginationParams(skip=skip, limit=limit, sort_field=sort_field, sort_order=sort_order, cursor=cursor, model=District, ranked=fuzzy and bool(name))
         paginated_query = paginate_and_sort(stmt, pagination_params)
 
-        result = db.execute(paginated_query)
+        result = await db.execute(paginated_query)
         districts = result.all()  
+        districts, next_cursor = pagination_params.paginate(districts)
 
-        return success_response(data=[{
-            **jsonable_encoder(DistrictRead.from_orm(district[0])),
-            "region_name": district[1]  
-        } for district in districts])
+        districts_data = json_rows(DistrictListRead, districts)
+        location_cache.set(cache_key, (districts_data, next_cursor))
 
+        return success_response(data=districts_data, next_cursor=next_cursor)
+
+    except PaginationError as e:
+        return error_response(status_code=400, error_message=str(e))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 
 # EXPORT
 @router.post("/districts/export-csv", response_class=StreamingResponse)
-def export_districts_csv(db: Session = Depends(get_db)):
+async def export_districts_csv(db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(District).filter(District.active == True, District.deleted == False)
-        result = db.execute(stmt)
-        districts = result.scalars().all()
+        result = await db.execute(stmt.limit(1))
 
-        if not districts:
+        if result.first() is None:
             return error_response(status_code=404, error_message="No districts found to export.")
 
         # Define CSV headers
         csv_headers = ["No", "Name", "Slug", "Longitude", "Latitude", "RegionId"]
 
-        csv_data = StringIO()
-        csv_writer = csv.writer(csv_data)
-
-        # Write the headers to the CSV
-        csv_writer.writerow(csv_headers)
-
-        for idx, district in enumerate(districts, start=1):
-            csv_writer.writerow([
-                idx,  
+        # Rows are fetched in batches and written out while the response is being sent
+        return stream_csv(
+            stmt.order_by(District.id),
+            csv_headers,
+            lambda idx, district: [
+                idx,
                 district.name,
                 district.slug,
                 district.lon,
                 district.lat,
                 district.region_id,
-            ])
-
-        csv_data.seek(0)
-
-        return StreamingResponse(
-            iter([csv_data.getvalue()]),
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": "attachment; filename=districts.csv",
-                "Content-Length": str(len(csv_data.getvalue())),
-            }
+            ],
+            filename="districts.csv",
         )
 
     except Exception as e:
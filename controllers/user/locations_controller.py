@@ -0,0 +1,106 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, UploadFile, File
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from utils.autocomplete import autocomplete
+from utils.batch_geocoder import get_batch_geocoder
+from utils.csv_ingest import CsvFormatError
+from utils.consts import USER
+from utils.functions import has_role
+from utils.http_response import success_response, error_response
+from utils.location_store import LEVELS, location_store
+from utils.reverse_geocoder import get_reverse_geocoder
+from utils.search_index import search_locations
+
+
+router = APIRouter(tags=["Locations"], dependencies=[Depends(has_role(USER))])
+
+# NEAREST
+@router.get("/nearest")
+async def get_nearest(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    level: str = Query("ward"),
+    k: int = Query(5, ge=1, le=100),
+):
+    try:
+        if level not in LEVELS:
+            return error_response(status_code=400, error_message=f"level must be one of: {', '.join(LEVELS)}")
+
+        # Served from the in-memory KD-tree, the database is only read when the level changed
+        index = await location_store.get(level)
+        nearest_data = [{**entry, "distance_km": round(distance, 4)} for entry, distance in index.nearest(lat, lon, k)]
+        return success_response(data=nearest_data)
+    except Exception as e:
+        return error_response(status_code=500, error_message=str(e))
+
+# REVERSE GEOCODE
+@router.get("/reverse")
+async def reverse_geocode(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+):
+    try:
+        # Nearest ward and its precomputed path, no database access once the levels are loaded
+        geocoder = await get_reverse_geocoder()
+        path = geocoder.reverse(lat, lon)
+        if path is None:
+            return error_response(status_code=404, error_message="no locations to resolve against")
+
+        return success_response(data={"lat": lat, "lon": lon, **path})
+    except Exception as e:
+        return error_response(status_code=500, error_message=str(e))
+
+# BATCH REVERSE GEOCODE
+@router.post("/reverse/batch", response_class=StreamingResponse)
+async def reverse_geocode_csv(file: UploadFile = File(...)):
+    try:
+        geocoder = get_batch_geocoder(await get_reverse_geocoder())
+        if not len(geocoder.targets):
+            return error_response(status_code=404, error_message="no locations to resolve against")
+
+        # Rows are matched chunk by chunk with NumPy and streamed back with the ward path appended
+        content = await run_in_threadpool(geocoder.open, file.file)
+        return StreamingResponse(
+            content,
+            media_type="text/csv",
+            headers={"Content-Disposition": f"attachment; filename=geocoded_{file.filename or 'points.csv'}"},
+        )
+    except CsvFormatError as e:
+        return error_response(status_code=400, error_message=str(e))
+    except Exception as e:
+        return error_response(status_code=500, error_message=str(e))
+
+# SEARCH
+@router.get("/search")
+async def search(
+    q: str = Query(..., min_length=1),
+    level: Optional[str] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+):
+    try:
+        if level is not None and level not in LEVELS:
+            return error_response(status_code=400, error_message=f"level must be one of: {', '.join(LEVELS)}")
+
+        # One in-memory inverted index per level instead of a scan per list endpoint
+        results = await search_locations(q, [level] if level else list(LEVELS), limit)
+        return success_response(data=results)
+    except Exception as e:
+        return error_response(status_code=500, error_message=str(e))
+
+# AUTOCOMPLETE
+@router.get("/autocomplete")
+async def get_autocomplete(
+    q: str = Query(..., min_length=1),
+    level: Optional[str] = Query(None),
+    limit: int = Query(10, ge=1, le=50),
+):
+    try:
+        if level is not None and level not in LEVELS:
+            return error_response(status_code=400, error_message=f"level must be one of: {', '.join(LEVELS)}")
+
+        # Sorted prefix arrays kept in memory, no database access per keystroke
+        suggestions = await autocomplete(q, [level] if level else list(LEVELS), limit)
+        return success_response(data=suggestions)
+    except Exception as e:
+        return error_response(status_code=500, error_message=str(e))
@@ -1,44 +1,58 @@
 from typing import List, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import APIRouter, Depends, Query
 from utils.consts import USER
-from utils.database import get_db
+from utils.database import get_async_db
 from domain.models.region_model import Region  
 from domain.schema.region_schema import RegionRead
 from utils.functions import has_role
-from utils.http_response import success_response, error_response
-from fastapi.encoders import jsonable_encoder
-from io import StringIO
+from utils.conditional import CONDITIONAL_MAX_AGE, conditional_get
+from utils.cache import REGION_TABLES, location_cache
+from utils.http_response import success_response, error_response, json_rows
 from fastapi.responses import StreamingResponse
+from utils.csv_export import stream_csv
 from sqlalchemy.future import select
-from utils.pagination_sorting import PaginationParams, paginate_and_sort
-import csv
+from utils.fuzzy import fuzzy_filter
+from utils.pagination_sorting import PaginationError, PaginationParams, paginate_and_sort
 
 
 router = APIRouter(tags=["Regions"], dependencies=[Depends(has_role(USER))] )
 
+# Conditional GET (ETag / Last-Modified) for the reads below
+cacheable = Depends(conditional_get(REGION_TABLES, max_age=CONDITIONAL_MAX_AGE))
+
 # FETCH ALL
-@router.get("/regions", response_model=List[RegionRead])
-def get_regions(
-    db: Session = Depends(get_db),
+@router.get("/regions", response_model=List[RegionRead], dependencies=[cacheable])
+async def get_regions(
+    db: AsyncSession = Depends(get_async_db),
     skip: int = Query(0, ge=0),  
     limit: int = Query(10, ge=1, le=100),  
     sort_field: Optional[str] = Query(None),
     sort_order: Optional[str] = Query("asc"),
+    cursor: Optional[str] = Query(None),
     id: Optional[int] = Query(None),
     name: Optional[str] = Query(None),
     slug: Optional[str] = Query(None),
+    fuzzy: bool = Query(False),
     lon: Optional[float] = Query(None),
     lat: Optional[float] = Query(None)
 ):
     try:
+        cache_key = location_cache.make_key(REGION_TABLES, skip=skip, limit=limit, sort_field=sort_field, sort_order=sort_order, cursor=cursor, id=id, name=name, fuzzy=fuzzy, slug=slug, lon=lon, lat=lat)
+        cached = location_cache.get(cache_key)
+        if cached is not None:
+            return success_response(data=cached[0], next_cursor=cached[1])
+
         stmt = select(Region).filter(Region.active == True, Region.deleted == False)
 
         # Filters
         if id is not None:
             stmt = stmt.filter(Region.id == id)
         if name:
-            stmt = stmt.filter(Region.name.ilike(f"%{name}%"))
+            if fuzzy:
+                stmt = await fuzzy_filter(db, stmt, Region.name, name)
+            else:
+                stmt = stmt.filter(Region.name.ilike(f"%{name}%"))
         if slug:
             stmt = stmt.filter(Region.slug.ilike(f"%{slug}%"))
         if lon is not None and lat is not None:
@@ -49,59 +63,52 @@ def get_regions(
             )
 
         # Pagination and sorting
-        pagination_params = PaginationParams(skip=skip, limit=limit, sort_field=sort_field, sort_order=sort_order)
+        pagination_params = PaginationParams(skip=skip, limit=limit, sort_field=sort_field, sort_order=sort_order, cursor=cursor, model=Region, ranked=fuzzy and bool(name))
         paginated_query = paginate_and_sort(stmt, pagination_params)
 
-        result = db.execute(paginated_query)
+        result = await db.execute(paginated_query)
         regions = result.scalars().all()
+        regions, next_cursor = pagination_params.paginate(regions)
 
         # Serialized Response
-        return success_response(data=[jsonable_encoder(RegionRead.from_orm(region)) for region in regions])
+        regions_data = json_rows(RegionRead, regions)
+        location_cache.set(cache_key, (regions_data, next_cursor))
+
+        return success_response(data=regions_data, next_cursor=next_cursor)
 
+    except PaginationError as e:
+        return error_response(status_code=400, error_message=str(e))
     except Exception as e:
         print("Error fetching regions:", e)
         return error_response(status_code=500, error_message=str(e))
   
 # EXPORT
 @router.post("/regions/export-csv", response_class=StreamingResponse)
-def export_regions_csv(db: Session = Depends(get_db)):
+async def export_regions_csv(db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Region).filter(Region.active == True, Region.deleted == False)
-        result = db.execute(stmt)
-        regions = result.scalars().all()
+        result = await db.execute(stmt.limit(1))
 
-        if not regions:
+        if result.first() is None:
             return error_response(status_code=404, error_message="No regions found to export.")
 
         # Define CSV headers
         csv_headers = ["No", "Name", "Slug", "Longitude", "Latitude"]
 
-        csv_data = StringIO()
-        csv_writer = csv.writer(csv_data)
-
-        csv_writer.writerow(csv_headers)
-
-        for idx, region in enumerate(regions, start=1):  
-            csv_writer.writerow([
+        # Rows are fetched in batches and written out while the response is being sent
+        return stream_csv(
+            stmt.order_by(Region.id),
+            csv_headers,
+            lambda idx, region: [
                 idx,
                 region.name,
                 region.slug,
                 region.lon,
                 region.lat,
-            ])
-
-        csv_data.seek(0)
-
-        return StreamingResponse(
-            iter([csv_data.getvalue()]),
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": "attachment; filename=regions.csv",
-                "Content-Length": str(len(csv_data.getvalue())),
-            }
+            ],
+            filename="regions.csv",
         )
 
     except Exception as e:
         # Handle errors and return an appropriate response
         return error_response(status_code=500, error_message=f"Error generating CSV: {str(e)}")
-
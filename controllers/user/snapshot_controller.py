@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import Response
+from utils.consts import USER
+from utils.functions import has_role
+from utils.http_response import error_response, etag_matches, not_modified_response
+from utils.snapshot import FORMATS, negotiate_encoding, snapshot_store
+
+
+router = APIRouter(tags=["Snapshot"], dependencies=[Depends(has_role(USER))])
+
+# FULL HIERARCHY
+@router.get("/snapshot")
+async def get_snapshot(
+    request: Request,
+    format: str = Query("json"),
+):
+    try:
+        if format not in FORMATS:
+            return error_response(status_code=400, error_message=f"format must be one of: {', '.join(FORMATS)}")
+
+        # Built and compressed once per data change, each request only picks the bytes for its encoding
+        snapshot = await snapshot_store.get()
+        representation = snapshot.representations[format]
+        encoding = negotiate_encoding(request.headers.get("Accept-Encoding", ""))
+        headers = {
+            "ETag": representation.etags[encoding],
+            "Cache-Control": "private, no-cache",
+            "Vary": "Accept-Encoding, Authorization",
+        }
+
+        if etag_matches(request.headers.get("If-None-Match"), *representation.etags.values()):
+            return not_modified_response(headers)
+
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(content=representation.bodies[encoding], media_type=representation.media_type, headers=headers)
+    except Exception as e:
+        return error_response(status_code=500, error_message=str(e))
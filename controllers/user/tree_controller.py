@@ -0,0 +1,35 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from utils.cache import LOCATION_TABLES, location_cache
+from utils.conditional import CONDITIONAL_MAX_AGE, conditional_get
+from utils.consts import USER
+from utils.functions import has_role
+from utils.http_response import JsonBytes, encode_json, success_response, error_response
+from utils.location_tree import MAX_DEPTH, TreeRootNotFound, build_tree
+
+
+router = APIRouter(tags=["Tree"], dependencies=[Depends(has_role(USER))])
+
+# NESTED HIERARCHY
+@router.get("/tree", dependencies=[Depends(conditional_get(LOCATION_TABLES, max_age=CONDITIONAL_MAX_AGE))])
+async def get_tree(
+    region_id: Optional[int] = Query(None),
+    district_id: Optional[int] = Query(None),
+    depth: int = Query(MAX_DEPTH, ge=1, le=MAX_DEPTH),
+):
+    try:
+        if region_id is not None and district_id is not None:
+            return error_response(status_code=400, error_message="pass either region_id or district_id, not both")
+
+        # The encoded tree is cached as one entry until one of the location tables is written
+        cache_key = location_cache.make_key(LOCATION_TABLES, region_id=region_id, district_id=district_id, depth=depth)
+        tree_data = location_cache.get(cache_key)
+        if tree_data is None:
+            tree_data = JsonBytes(encode_json(await build_tree(region_id=region_id, district_id=district_id, depth=depth)))
+            location_cache.set(cache_key, tree_data)
+
+        return success_response(data=tree_data)
+    except TreeRootNotFound as e:
+        return error_response(status_code=404, error_message=str(e))
+    except Exception as e:
+        return error_response(status_code=500, error_message=str(e))
@@ -1,35 +1,41 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from domain.models.constituency_model import Constituency
 from domain.models.district_model import District
 from domain.models.region_model import Region
 from utils.consts import USER
-from utils.database import get_db
+from utils.database import get_async_db
 from domain.models.ward_model import Ward
-from domain.schema.ward_schema import WardRead
+from domain.schema.ward_schema import WardRead, WardListRead
 from utils.functions import has_role
-from utils.http_response import success_response, error_response
-from fastapi.encoders import jsonable_encoder
-from io import StringIO
+from utils.conditional import CONDITIONAL_MAX_AGE, conditional_get
+from utils.cache import WARD_TABLES, location_cache
+from utils.http_response import success_response, error_response, json_rows
 from fastapi.responses import StreamingResponse
-from utils.pagination_sorting import PaginationParams, paginate_and_sort
+from utils.csv_export import stream_csv
+from utils.fuzzy import fuzzy_filter
+from utils.pagination_sorting import PaginationError, PaginationParams, paginate_and_sort
 from sqlalchemy.future import select
-import csv
 
 router = APIRouter(tags=["Wards"], dependencies=[Depends(has_role(USER))])
 
+# Conditional GET (ETag / Last-Modified) for the reads below
+cacheable = Depends(conditional_get(WARD_TABLES, max_age=CONDITIONAL_MAX_AGE))
+
 # FETCH ALL
-@router.get("/wards", response_model=List[WardRead])
-def get_wards(
-    db: Session = Depends(get_db),
+@router.get("/wards", response_model=List[WardRead], dependencies=[cacheable])
+async def get_wards(
+    db: AsyncSession = Depends(get_async_db),
     skip: int = Query(0, ge=0),  
     limit: int = Query(10, ge=1, le=100),  
     sort_field: Optional[str] = Query(None),
     sort_order: Optional[str] = Query("asc"),
+    cursor: Optional[str] = Query(None),
     id: Optional[int] = Query(None),
     name: Optional[str] = Query(None),
     slug: Optional[str] = Query(None),
+    fuzzy: bool = Query(False),
     lon: Optional[float] = Query(None),
     lat: Optional[float] = Query(None),
     region_id: Optional[int] = Query(None),
@@ -37,6 +43,11 @@ def get_wards(
     constituency_id: Optional[int] = Query(None)
 ):
     try:
+        cache_key = location_cache.make_key(WARD_TABLES, skip=skip, limit=limit, sort_field=sort_field, sort_order=sort_order, cursor=cursor, id=id, name=name, fuzzy=fuzzy, slug=slug, lon=lon, lat=lat, region_id=region_id, district_id=district_id, constituency_id=constituency_id)
+        cached = location_cache.get(cache_key)
+        if cached is not None:
+            return success_response(data=cached[0], next_cursor=cached[1])
+
         stmt = select(
             Ward,
             Region.name.label("region_name"),
@@ -51,7 +62,10 @@ def get_wards(
         if id is not None:
             stmt = stmt.filter(Ward.id == id)
         if name:
-            stmt = stmt.filter(Ward.name.ilike(f"%{name}%"))
+            if fuzzy:
+                stmt = await fuzzy_filter(db, stmt, Ward.name, name)
+            else:
+                stmt = stmt.filter(Ward.name.ilike(f"%{name}%"))
         if slug:
             stmt = stmt.filter(Ward.slug.ilike(f"%{slug}%"))
         if lon is not None and lat is not None:
@@ -68,64 +82,52 @@ def get_wards(
             stmt = stmt.filter(Ward.district_id == district_id)
 
         # Pagination and sorting
-        pagination_params = PaginationParams(skip=skip, limit=limit, sort_field=sort_field, sort_order=sort_order)
+        pagination_params = PaginationParams(skip=skip, limit=limit, sort_field=sort_field, sort_order=sort_order, cursor=cursor, model=Ward, ranked=fuzzy and bool(name))
         paginated_query = paginate_and_sort(stmt, pagination_params)
 
-        result = db.execute(paginated_query)
+        result = await db.execute(paginated_query)
         wards = result.all()  
+        wards, next_cursor = pagination_params.paginate(wards)
+
+        wards_data = json_rows(WardListRead, wards)
+        location_cache.set(cache_key, (wards_data, next_cursor))
 
-        return success_response(data=[{
-            **jsonable_encoder(WardRead.from_orm(ward[0])),
-            "region_name": ward[1],
-            "district_name": ward[2], 
-            "constituency_name": ward[3], 
-        } for ward in wards])
+        return success_response(data=wards_data, next_cursor=next_cursor)
 
+    except PaginationError as e:
+        return error_response(status_code=400, error_message=str(e))
     except Exception as e:
         return error_response(status_code=500, error_message=str(e))
 
 
 # EXPORT
 @router.post("/wards/export-csv", response_class=StreamingResponse)
-def export_wards_csv(db: Session = Depends(get_db)):
+async def export_wards_csv(db: AsyncSession = Depends(get_async_db)):
     try:
         stmt = select(Ward).filter(Ward.active == True, Ward.deleted == False)
-        result = db.execute(stmt)
-        wards = result.scalars().all()
+        result = await db.execute(stmt.limit(1))
 
-        if not wards:
+        if result.first() is None:
             return error_response(status_code=404, error_message="No ward found to export.")
 
         # Define CSV headers
         csv_headers = ["No", "Name", "Slug", "Longitude", "Latitude", "RegionId", "DistrictId", "ConstituencyId"]
 
-        csv_data = StringIO()
-        csv_writer = csv.writer(csv_data)
-
-        # Write the headers to the CSV
-        csv_writer.writerow(csv_headers)
-
-        for idx, ward in enumerate(wards, start=1):  
-            csv_writer.writerow([
-                idx, 
+        # Rows are fetched in batches and written out while the response is being sent
+        return stream_csv(
+            stmt.order_by(Ward.id),
+            csv_headers,
+            lambda idx, ward: [
+                idx,
                 ward.name,
                 ward.slug,
                 ward.lon,
                 ward.lat,
                 ward.region_id,
                 ward.district_id,
-                ward.constituency_id
-            ])
-
-        csv_data.seek(0)
-
-        return StreamingResponse(
-            iter([csv_data.getvalue()]),
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": "attachment; filename=constituencies.csv",
-                "Content-Length": str(len(csv_data.getvalue())),
-            }
+                ward.constituency_id,
+            ],
+            filename="wards.csv",
         )
 
     except Exception as e:
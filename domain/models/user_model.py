@@ -12,4 +12,6 @@ class User(Spine):
     organization: Mapped[str | None] = mapped_column(String, index=True, nullable=True)
     password: Mapped[str | None] = mapped_column(String, index=True)
     role_id: Mapped[int | None] = mapped_column(Integer, ForeignKey("roles.id", ondelete="SET NULL"), nullable=True, default=3)
+    # Revocation epoch carried in access tokens, bumped whenever the user's access changes
+    token_epoch: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
     role = relationship("Role", back_populates="users")
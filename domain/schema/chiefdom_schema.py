@@ -28,6 +28,11 @@ class ChiefdomRead(ChiefdomBase):
             datetime: lambda v: v.isoformat()  
         }
 
+# List rows carry the names of their parents
+class ChiefdomListRead(ChiefdomRead):
+    region_name: Optional[str] = None
+    district_name: Optional[str] = None
+
 class ChiefdomUpdate(BaseModel):
     name: Optional[str] = None
     lon: Optional[float] = None
@@ -28,6 +28,11 @@ class ConstituencyRead(ConstituencyBase):
             datetime: lambda v: v.isoformat()  
         }
 
+# List rows carry the names of their parents
+class ConstituencyListRead(ConstituencyRead):
+    region_name: Optional[str] = None
+    district_name: Optional[str] = None
+
 class ConstituencyUpdate(BaseModel):
     name: Optional[str] = None
     lon: Optional[float] = None
@@ -27,6 +27,10 @@ class DistrictRead(DistrictBase):
             datetime: lambda v: v.isoformat()  
         }
 
+# List rows carry the names of their parents
+class DistrictListRead(DistrictRead):
+    region_name: Optional[str] = None
+
 class DistrictUpdate(BaseModel):
     name: Optional[str] = None
     lon: Optional[float] = None
@@ -0,0 +1,30 @@
+from datetime import datetime
+from typing import Optional
+from pydantic import BaseModel
+
+
+class ImportJobRead(BaseModel):
+    id: str
+    table: str
+    filename: Optional[str] = None
+    status: str
+    size: int
+    progress: float
+    rows: int
+    inserted: int
+    updated: int
+    skipped: int
+    errors: int
+    issues: Optional[list] = None
+    error_message: Optional[str] = None
+    created_by: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    duration_seconds: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+        json_encoders = {
+            datetime: lambda v: v.isoformat()  
+        }
@@ -29,6 +29,12 @@ class WardRead(WardBase):
             datetime: lambda v: v.isoformat()  
         }
 
+# List rows carry the names of their parents
+class WardListRead(WardRead):
+    region_name: Optional[str] = None
+    district_name: Optional[str] = None
+    constituency_name: Optional[str] = None
+
 class WardUpdate(BaseModel):
     name: Optional[str] = None
     lon: Optional[float] = None
@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from controllers.auth_controller import router as auth_router  
 # Super Routes
@@ -8,15 +9,52 @@ from controllers.super.districts_controller import router as super_district_rout
 from controllers.super.constituencies_controller import router as super_constituency_router  
 from controllers.super.chiefdoms_controller import router as super_chiefdom_router
 from controllers.super.wards_controller import router as super_ward_router  
+from controllers.super.metrics_controller import router as super_metrics_router
+from controllers.super.jobs_controller import router as super_jobs_router
 # User Routes
 from controllers.user.regions_controller import router as user_region_router  
 from controllers.user.districts_controller import router as user_district_router  
 from controllers.user.constituencies_controller import router as user_constituency_router 
 from controllers.user.chiefdoms_controller import router as user_chiefdom_router  
 from controllers.user.wards_controller import router as user_ward_router  
+from controllers.user.locations_controller import router as user_location_router
+from controllers.user.snapshot_controller import router as user_snapshot_router
+from controllers.user.tree_controller import router as user_tree_router
 # Middlewares
 from middlewares.exception_handling_middleware import register_exception_handlers
 from middlewares.rate_limiter_middleware import rate_limit_middleware
+from middlewares.conditional_get_middleware import conditional_get_middleware
+# In-memory location indexes and the snapshot built from them
+from utils.location_store import location_store
+from utils.snapshot import snapshot_store
+# Password hashing processes
+from utils.passwords import password_pool
+# Idle rate limit keys
+from utils.rate_limit import rate_limiter, sweep_periodically
+# Import job heartbeats
+from utils.jobs import watch_jobs
+import asyncio
+import logging
+
+logger = logging.getLogger("uvicorn.error")
+
+
+# Load the location store (spatial, search and autocomplete indexes) and the snapshot, start the password workers, the rate limit sweeper and the import job heartbeat before serving traffic
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        await location_store.warm()
+        await snapshot_store.get()
+    except Exception as e:
+        logger.warning("location store not warmed, levels load on first use: %s", e)
+    password_pool.start()
+    sweeper = asyncio.create_task(sweep_periodically(rate_limiter))
+    job_watcher = asyncio.create_task(watch_jobs())
+    yield
+    job_watcher.cancel()
+    sweeper.cancel()
+    password_pool.shutdown()
+    await rate_limiter.close()
 
 # Initialization
 app = FastAPI(
@@ -25,9 +63,11 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",  
     redoc_url="/redoc",  
+    lifespan=lifespan,
 )
 
 # Middlewares
+app.middleware("http")(conditional_get_middleware)
 app.middleware("http")(rate_limit_middleware)
 
 register_exception_handlers(app)
@@ -42,6 +82,8 @@ app.include_router(super_district_router, prefix="/api")
 app.include_router(super_constituency_router, prefix="/api")
 app.include_router(super_chiefdom_router, prefix="/api")
 app.include_router(super_ward_router, prefix="/api")
+app.include_router(super_metrics_router, prefix="/api")
+app.include_router(super_jobs_router, prefix="/api")
 
 # Routes for Users
 app.include_router(user_region_router, prefix="/api")
@@ -49,3 +91,6 @@ app.include_router(user_district_router, prefix="/api")
 app.include_router(user_constituency_router, prefix="/api")
 app.include_router(user_chiefdom_router, prefix="/api")
 app.include_router(user_ward_router, prefix="/api")
+app.include_router(user_location_router, prefix="/api")
+app.include_router(user_snapshot_router, prefix="/api")
+app.include_router(user_tree_router, prefix="/api")
@@ -0,0 +1,11 @@
+from fastapi import Request
+
+
+async def conditional_get_middleware(request: Request, call_next):
+    response = await call_next(request)
+
+    # Validators computed by the conditional_get dependency, only successful reads carry them
+    headers = getattr(request.state, "conditional_headers", None)
+    if headers and response.status_code == 200:
+        response.headers.update(headers)
+    return response
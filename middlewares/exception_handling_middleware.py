@@ -2,7 +2,8 @@ from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from sqlalchemy.exc import IntegrityError
-from utils.http_response import error_response 
+from utils.conditional import NotModified
+from utils.http_response import error_response, not_modified_response
 import traceback
 
 
@@ -27,6 +28,11 @@ def register_exception_handlers(app: FastAPI):
     def integrity_error_handler(request: Request, exc: IntegrityError):
         return error_response(status_code=400, error_message="Database Integrity Error")
 
+    # Conditional GET whose validators still match
+    @app.exception_handler(NotModified)
+    def not_modified_handler(request: Request, exc: NotModified):
+        return not_modified_response(exc.headers)
+
     # Catch all general errors
     @app.exception_handler(Exception)
     def general_exception_handler(request: Request, exc: Exception):
@@ -1,36 +1,24 @@
-from fastapi import Request, HTTPException
+from fastapi import Request
 from fastapi.responses import JSONResponse
-from datetime import datetime, timedelta
+from utils.rate_limit import rate_limiter
+from utils.rate_limit_policy import rate_limit_policies
+import math
 
-rate_limit_store = {}
 
 async def rate_limit_middleware(request: Request, call_next):
-    ip = request.client.host  # Client IP
-    route = request.url.path  # Requested route
+    # Caller (user id, or client IP) and matched route template, with the rate of the first matching policy
+    key, rate = rate_limit_policies.resolve(request)
 
-    now = datetime.utcnow()
-
-    # Initialize IP and route tracking
-    if ip not in rate_limit_store:
-        rate_limit_store[ip] = {}
-    
-    if route not in rate_limit_store[ip]:
-        rate_limit_store[ip][route] = []
-
-    # Remove expired timestamps (older than 1 minute)
-    rate_limit_store[ip][route] = [t for t in rate_limit_store[ip][route] if now - t < timedelta(minutes=1)]
-
-    # Enforce limit: 5 requests per minute per route
-    if len(rate_limit_store[ip][route]) >= 5:
+    # Enforce limit in the RATE_LIMIT_BACKEND store
+    allowed, retry_after = await rate_limiter.hit(key, rate)
+    if not allowed:
         response_data = {
             "status": "failure",
             "status_code": 429,
             "error_message": "Too many requests for this endpoint. Try again later.",
             "data": []
         }
-        return JSONResponse(content=response_data, status_code=429)
-
-    rate_limit_store[ip][route].append(now)
+        return JSONResponse(content=response_data, status_code=429, headers={"Retry-After": str(math.ceil(retry_after))})
 
     response = await call_next(request)
     return response
@@ -0,0 +1,46 @@
+"""Trigram indexes
+
+Revision ID: 7c4e2b8a9d13
+Revises: 3f2a9c1d7e4b
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c4e2b8a9d13'
+down_revision: Union[str, None] = '3f2a9c1d7e4b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# GIN trigram indexes serve ILIKE '%...%' and the fuzzy (%, similarity()) searches
+TRIGRAM_COLUMNS = {
+    'regions': ['name', 'slug'],
+    'districts': ['name', 'slug'],
+    'constituencies': ['name', 'slug'],
+    'chiefdoms': ['name', 'slug'],
+    'wards': ['name', 'slug'],
+    'users': ['first_name', 'last_name', 'email'],
+}
+
+
+def upgrade() -> None:
+    # pg_trgm is PostgreSQL only, other databases use the in-process n-gram index
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for table, columns in TRIGRAM_COLUMNS.items():
+        for column in columns:
+            op.create_index(f'ix_{table}_{column}_trgm', table, [column], unique=False, postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for table, columns in TRIGRAM_COLUMNS.items():
+        for column in columns:
+            op.drop_index(f'ix_{table}_{column}_trgm', table_name=table)
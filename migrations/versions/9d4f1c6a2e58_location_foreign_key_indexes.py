@@ -0,0 +1,69 @@
+"""Location foreign key indexes
+
+Revision ID: 9d4f1c6a2e58
+Revises: 5a8d3e6f1b27
+Create Date: 2026-10-16 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d4f1c6a2e58'
+down_revision: Union[str, None] = '5a8d3e6f1b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Every read filters on active AND NOT deleted, so only live rows are indexed
+LIVE_ROWS = 'active AND NOT deleted'
+
+# (parent_id, id) serves the /.../region/{id} style filters and the joins, ordered by id for keyset pagination
+FOREIGN_KEY_COLUMNS = {
+    'districts': ['region_id'],
+    'constituencies': ['region_id', 'district_id'],
+    'chiefdoms': ['region_id', 'district_id'],
+    'wards': ['region_id', 'district_id', 'constituency_id'],
+}
+# (id) of the live rows serves the unfiltered lists and their keyset pages
+LIVE_TABLES = ['regions', 'districts', 'constituencies', 'chiefdoms', 'wards']
+
+
+def index_columns():
+    for table, columns in FOREIGN_KEY_COLUMNS.items():
+        for column in columns:
+            yield f'ix_{table}_{column}_live', table, [column, 'id']
+    for table in LIVE_TABLES:
+        yield f'ix_{table}_id_live', table, ['id']
+
+
+# An interrupted CREATE INDEX CONCURRENTLY leaves an INVALID index behind under the same name, the planner never uses it
+def is_invalid(name: str) -> bool:
+    if op.get_context().as_sql:
+        return False
+    return bool(op.get_bind().execute(
+        sa.text('SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)'),
+        {'name': name},
+    ).scalar())
+
+
+def upgrade() -> None:
+    # Partial indexes built CONCURRENTLY are PostgreSQL only, and CONCURRENTLY cannot run inside a transaction
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    with op.get_context().autocommit_block():
+        for name, table, columns in index_columns():
+            # Left invalid by an earlier interrupted run, IF NOT EXISTS would skip it
+            if is_invalid(name):
+                op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+            op.create_index(name, table, columns, unique=False, postgresql_where=sa.text(LIVE_ROWS), postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    with op.get_context().autocommit_block():
+        for name, table, _ in index_columns():
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
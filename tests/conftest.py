@@ -0,0 +1,68 @@
+import os
+import sys
+import tempfile
+
+# Settings the app reads at import time, a throwaway SQLite database and limits that stay out of the way
+DATABASE_FILE = os.path.join(tempfile.mkdtemp(prefix="locations_tests_"), "test.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{DATABASE_FILE}")
+os.environ.setdefault("SECRET_KEY", "test-secret-key-with-at-least-32-bytes")
+os.environ.setdefault("HASHING_ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRY_MINUTES", "60")
+os.environ.setdefault("ENCRYPTION", "sha256_crypt")
+os.environ.setdefault("PASSWORD_WORKERS", "0")
+os.environ.setdefault("RATE_LIMIT_CONFIG", os.path.join(os.path.dirname(DATABASE_FILE), "no_policies.json"))
+os.environ.setdefault("RATE_LIMIT_REQUESTS", "1000000")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from domain.models.spine_model import Base
+from domain.models import region_model, district_model, constituency_model, chiefdom_model, ward_model, user_model, role_model, import_job_model
+from domain.models.chiefdom_model import Chiefdom
+from domain.models.district_model import District
+from domain.models.region_model import Region
+from domain.models.role_model import Role
+from domain.models.user_model import User
+from utils.consts import ADMIN, SUPER, USER
+from utils.database import SessionLocal, engine
+from utils.security import create_access_token
+
+
+def seed():
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    with SessionLocal() as session:
+        session.add_all([Role(id=SUPER, name="super"), Role(id=ADMIN, name="admin"), Role(id=USER, name="user")])
+        session.add_all([
+            User(first_name="Super", last_name="User", email="super@example.com", role_id=SUPER, password="x"),
+            User(first_name="Admin", last_name="One", email="admin@example.com", role_id=ADMIN, password="x"),
+            User(first_name="Admin", last_name="Two", email="admin2@example.com", role_id=ADMIN, password="x"),
+            User(first_name="Plain", last_name="User", email="user@example.com", role_id=USER, password="x"),
+        ])
+        session.add_all([Region(id=1, name="Southern Province", lon=-11.7, lat=7.9), Region(id=2, name="Northern Province", lon=-12.0, lat=9.0)])
+        session.add_all([District(id=1, name="Bo District", lon=-11.74, lat=7.96, region_id=1), District(id=2, name="Bombali District", lon=-12.16, lat=9.2, region_id=2)])
+        session.add_all([
+            Chiefdom(id=1, name="Bo Town", lon=-11.73, lat=7.95, region_id=1, district_id=1),
+            Chiefdom(id=2, name="Bombali", lon=-12.16, lat=9.19, region_id=2, district_id=2),
+        ])
+        session.commit()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    seed()
+    yield
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def client(database):
+    from fastapi.testclient import TestClient
+    import main
+
+    with TestClient(main.app) as client:
+        yield client
+
+
+def auth(email: str) -> dict:
+    return {"Authorization": "Bearer " + create_access_token({"sub": email})[0]}
@@ -0,0 +1,24 @@
+from tests.conftest import auth
+
+
+def test_matching_etag_answers_304(client):
+    first = client.get("/api/chiefdoms")
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"].startswith("private")
+
+    again = client.get("/api/chiefdoms", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["ETag"] == first.headers["ETag"]
+
+
+def test_export_is_never_answered_with_304(client):
+    etag = client.get("/api/chiefdoms").headers["ETag"]
+
+    export = client.post("/api/chiefdoms/export-csv", headers={"If-None-Match": etag})
+    assert export.status_code == 200
+    assert "ETag" not in export.headers
+    assert export.text.startswith("No,Name")
+
+    export = client.post("/api/regions/export-csv", headers={**auth("user@example.com"), "If-None-Match": "*"})
+    assert export.status_code == 200
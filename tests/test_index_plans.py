@@ -0,0 +1,83 @@
+import importlib.util
+import os
+import uuid
+import pytest
+from alembic.operations import Operations
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.dialects import postgresql
+from domain.models.spine_model import Base
+from domain.models.ward_model import Ward
+from utils.pagination_sorting import PaginationParams, encode_cursor, paginate_and_sort
+
+# Query plans only mean something on PostgreSQL, e.g. TEST_POSTGRES_URL=postgresql+psycopg2://postgres@localhost/postgres
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+MIGRATION = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations", "versions", "9d4f1c6a2e58_location_foreign_key_indexes.py")
+
+pytestmark = pytest.mark.skipif(not TEST_POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+
+
+def run_migration(connection, step: str):
+    spec = importlib.util.spec_from_file_location("location_foreign_key_indexes", MIGRATION)
+    migration = importlib.util.module_from_spec(spec)
+    with Operations.context(MigrationContext.configure(connection)):
+        spec.loader.exec_module(migration)
+        getattr(migration, step)()
+
+
+# Location tables in a schema of their own, filled enough for the planner to prefer an index over a scan
+@pytest.fixture(scope="module")
+def connection():
+    schema = f"plans_{uuid.uuid4().hex[:8]}"
+    admin = create_engine(TEST_POSTGRES_URL, isolation_level="AUTOCOMMIT")
+    with admin.connect() as conn:
+        conn.execute(text(f"CREATE SCHEMA {schema}"))
+    engine = create_engine(TEST_POSTGRES_URL, connect_args={"options": f"-csearch_path={schema}"})
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO regions (id, name, created_at, active, deleted) SELECT i, 'Region ' || i, now(), true, false FROM generate_series(1, 4) i"))
+        conn.execute(text("INSERT INTO districts (id, name, region_id, created_at, active, deleted) SELECT i, 'District ' || i, 1 + i % 4, now(), true, false FROM generate_series(1, 40) i"))
+        conn.execute(text("INSERT INTO constituencies (id, name, region_id, district_id, created_at, active, deleted) SELECT i, 'Constituency ' || i, 1 + i % 4, 1 + i % 40, now(), true, false FROM generate_series(1, 400) i"))
+        conn.execute(text(
+            "INSERT INTO wards (id, name, region_id, district_id, constituency_id, created_at, active, deleted) "
+            "SELECT i, 'Ward ' || i, 1 + i % 4, 1 + i % 40, 1 + i % 400, now(), i % 10 <> 0, i % 7 = 0 FROM generate_series(1, 40000) i"
+        ))
+    with engine.connect() as conn:
+        run_migration(conn, "upgrade")
+        conn.execute(text("ANALYZE"))
+        yield conn
+    engine.dispose()
+    with admin.connect() as conn:
+        conn.execute(text(f"DROP SCHEMA {schema} CASCADE"))
+    admin.dispose()
+
+
+def plan(connection, stmt) -> str:
+    sql = str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    return "\n".join(row[0] for row in connection.execute(text(f"EXPLAIN {sql}")))
+
+
+def test_filter_by_parent_uses_partial_index(connection):
+    # /admin/wards/district/{district_id}
+    stmt = select(Ward).filter(Ward.district_id == 3, Ward.active == True, Ward.deleted == False)
+    assert "ix_wards_district_id_live" in plan(connection, stmt)
+
+    stmt = select(Ward).filter(Ward.constituency_id == 17, Ward.active == True, Ward.deleted == False)
+    assert "ix_wards_constituency_id_live" in plan(connection, stmt)
+
+
+def test_live_list_keyset_page_uses_partial_index(connection):
+    # /wards?cursor=... past the middle of the table
+    params = PaginationParams(limit=10, cursor=encode_cursor("id", "asc", 20000, 20000), model=Ward)
+    stmt = paginate_and_sort(select(Ward).filter(Ward.active == True, Ward.deleted == False), params)
+    assert "ix_wards_id_live" in plan(connection, stmt)
+
+
+def test_rerun_replaces_invalid_index(connection):
+    connection.execute(text("UPDATE pg_index SET indisvalid = false WHERE indexrelid = to_regclass('ix_wards_district_id_live')"))
+    connection.commit()
+
+    run_migration(connection, "upgrade")
+
+    valid = connection.execute(text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass('ix_wards_district_id_live')")).scalar()
+    assert valid is True
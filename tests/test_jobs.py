@@ -0,0 +1,97 @@
+import time
+from datetime import datetime, timedelta
+import pytest
+from controllers.admin.jobs_controller import router as admin_jobs_router
+from controllers.admin.regions_controller import router as admin_region_router
+from domain.models.import_job_model import ImportJob
+from utils.database import SessionLocal
+from utils.jobs import COMPLETED, FAILED, QUEUED, RUNNING, beat_jobs, fail_abandoned_jobs, set_job
+from tests.conftest import auth
+
+
+# The admin routers are not mounted by main, the tests mount the ones they call
+@pytest.fixture(scope="module")
+def admin_client(client):
+    client.app.include_router(admin_region_router, prefix="/api")
+    client.app.include_router(admin_jobs_router, prefix="/api")
+    return client
+
+
+def wait_for(client, job_id: str, headers: dict) -> dict:
+    for _ in range(100):
+        job = client.get(f"/api/admin/jobs/{job_id}", headers=headers).json()["data"]
+        if job["status"] in (COMPLETED, FAILED):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} still {job['status']}")
+
+
+def test_admin_only_sees_own_jobs(admin_client):
+    owner = auth("admin@example.com")
+    upload = admin_client.post(
+        "/api/admin/regions/upload",
+        params={"background": True},
+        files={"file": ("regions.csv", b"name\nEastern Province\n", "text/csv")},
+        headers=owner,
+    )
+    assert upload.status_code == 202
+    job_id = upload.json()["data"]["id"]
+
+    job = wait_for(admin_client, job_id, owner)
+    assert job["created_by"] == "admin@example.com"
+    assert job["status"] == COMPLETED and job["rows"] == 1
+
+    assert admin_client.get(f"/api/admin/jobs/{job_id}", headers=auth("admin2@example.com")).status_code == 404
+    assert admin_client.get(f"/api/super/jobs/{job_id}", headers=auth("super@example.com")).status_code == 200
+
+
+def add_job(job_id: str, worker: str, status: str = RUNNING, heartbeat_at=None, path=None):
+    with SessionLocal() as session:
+        session.add(ImportJob(id=job_id, table="regions", path=path, status=status, created_by="admin@example.com", worker=worker, heartbeat_at=heartbeat_at or datetime.utcnow()))
+        session.commit()
+
+
+def job_status(job_id: str) -> str:
+    with SessionLocal() as session:
+        return session.get(ImportJob, job_id).status
+
+
+def test_starting_worker_leaves_running_jobs_of_live_workers(tmp_path):
+    upload = tmp_path / "worker-a.csv"
+    upload.write_text("name\n")
+    add_job("live-a", "worker-a", path=str(upload))
+
+    # worker-b starts up while worker-a is still importing
+    assert fail_abandoned_jobs(worker="worker-b") == 0
+    assert beat_jobs(worker="worker-a") == 1
+    assert fail_abandoned_jobs(worker="worker-b") == 0
+
+    assert job_status("live-a") == RUNNING
+    assert upload.exists()
+
+
+def test_jobs_without_heartbeat_fail(tmp_path):
+    upload = tmp_path / "worker-c.csv"
+    upload.write_text("name\n")
+    stale = datetime.utcnow() - timedelta(seconds=600)
+    add_job("gone-c", "worker-c", status=QUEUED, heartbeat_at=stale, path=str(upload))
+    add_job("done-c", "worker-c", status=COMPLETED, heartbeat_at=stale)
+    add_job("own-d", "worker-d", heartbeat_at=stale)
+
+    # A worker never fails its own jobs, only the ones of workers that stopped beating
+    assert fail_abandoned_jobs(worker="worker-d") == 1
+
+    assert job_status("gone-c") == FAILED
+    assert job_status("done-c") == COMPLETED
+    assert job_status("own-d") == RUNNING
+    assert not upload.exists()
+
+
+def test_abandoned_job_is_not_overwritten_by_its_thread():
+    add_job("late-e", "worker-e", heartbeat_at=datetime.utcnow() - timedelta(seconds=600))
+    fail_abandoned_jobs(worker="worker-f")
+    assert job_status("late-e") == FAILED
+
+    with SessionLocal() as session:
+        set_job(session, "late-e", status=COMPLETED, progress=1.0)
+    assert job_status("late-e") == FAILED
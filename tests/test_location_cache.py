@@ -0,0 +1,18 @@
+from utils.cache import CHIEFDOM_TABLES, location_cache
+
+
+def test_key_keeps_params_as_queried():
+    assert location_cache.make_key(CHIEFDOM_TABLES, name="bo ") != location_cache.make_key(CHIEFDOM_TABLES, name="bo")
+    assert location_cache.make_key(CHIEFDOM_TABLES, name="bo", skip=0) == location_cache.make_key(CHIEFDOM_TABLES, skip=0, name="bo", slug=None)
+
+
+def test_padded_name_does_not_answer_for_the_plain_name(client):
+    location_cache.clear()
+
+    padded = client.get("/api/chiefdoms", params={"name": "bo "})
+    assert padded.status_code == 200
+    assert [chiefdom["name"] for chiefdom in padded.json()["data"]] == ["Bo Town"]
+
+    plain = client.get("/api/chiefdoms", params={"name": "bo"})
+    assert plain.status_code == 200
+    assert sorted(chiefdom["name"] for chiefdom in plain.json()["data"]) == ["Bo Town", "Bombali"]
@@ -0,0 +1,32 @@
+import pytest
+from domain.models.user_model import User
+from domain.models.ward_model import Ward
+from utils.pagination_sorting import PaginationError, PaginationParams, SORT_FIELDS, decode_cursor
+from tests.conftest import auth
+
+USER_COLUMNS = {"id", "email", "first_name", "last_name", "organization"}
+
+
+def test_sort_field_outside_allow_list_is_rejected():
+    with pytest.raises(PaginationError):
+        PaginationParams(sort_field="password", model=User)
+    with pytest.raises(PaginationError):
+        PaginationParams(sort_field="region_id", model=Ward)
+
+
+def test_users_cannot_be_sorted_by_password(client):
+    response = client.get("/api/super/users", params={"sort_field": "password", "limit": 1}, headers=auth("super@example.com"))
+    assert response.status_code == 400
+    assert response.json()["error_message"] == "sort_field must be one of: id, email, first_name, last_name, organization"
+
+
+def test_user_cursors_only_carry_public_columns(client):
+    assert set(SORT_FIELDS["users"]) == USER_COLUMNS
+    for sort_field in SORT_FIELDS["users"]:
+        response = client.get("/api/super/users", params={"sort_field": sort_field, "limit": 1}, headers=auth("super@example.com"))
+        assert response.status_code == 200
+        body = response.json()
+        field, _, value, _ = decode_cursor(body["next_cursor"])
+        # The cursor holds the same value the page already shows
+        assert field == sort_field
+        assert value == body["data"][-1][field]
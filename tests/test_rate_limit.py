@@ -0,0 +1,102 @@
+import asyncio
+import time
+from utils.rate_limit import MemoryBackend, Rate, sweep_periodically
+
+SHORT = Rate(1, 0.001)
+LONG = Rate(5, 60)
+
+
+def test_memory_sweep_stops_at_first_key_in_use():
+    backend = MemoryBackend()
+    for i in range(5):
+        backend.check(f"idle:{i}", SHORT)
+    backend.check("busy", LONG)
+    backend.check("idle:late", SHORT)
+    time.sleep(0.01)
+
+    # The idle key behind the busy one is left for later
+    assert backend.sweep() == 5
+    assert list(backend.store) == ["busy", "idle:late"]
+
+
+def test_memory_sweep_is_bounded_per_step():
+    backend = MemoryBackend()
+    for i in range(25):
+        backend.check(f"idle:{i}", SHORT)
+    time.sleep(0.01)
+
+    assert backend.sweep(10) == 10
+    assert len(backend.store) == 15
+
+
+def test_sweep_periodically_yields_between_steps():
+    backend = MemoryBackend()
+    for i in range(25):
+        backend.check(f"idle:{i}", SHORT)
+    time.sleep(0.01)
+
+    async def run():
+        sweeper = asyncio.create_task(sweep_periodically(backend, interval=0, batch=10))
+        steps = 0
+        while backend.store and steps < 100:
+            await asyncio.sleep(0)
+            steps += 1
+        sweeper.cancel()
+        return steps
+
+    assert asyncio.run(run()) > 1
+    assert backend.swept == 25
+
+
+def redis_backend():
+    import fakeredis
+    from utils.rate_limit import RedisBackend
+
+    backend = RedisBackend(url="redis://localhost:6379/0")
+    backend.client = fakeredis.FakeAsyncRedis()
+    return backend
+
+
+def test_redis_burst_cut_off_and_retry_after():
+    async def run():
+        backend = redis_backend()
+        results = [await backend.hit("user:1 GET /api/regions", Rate(3, 60)) for _ in range(4)]
+        await backend.close()
+        return results
+
+    results = asyncio.run(run())
+    assert [allowed for allowed, _ in results] == [True, True, True, False]
+    # One interval (60 / 3 seconds) until the next request fits
+    assert 19 < results[-1][1] <= 20
+
+
+def test_redis_concurrent_hits_share_one_round_trip():
+    async def run():
+        backend = redis_backend()
+        results = await asyncio.gather(*(backend.hit(f"user:{i} GET /api/wards", LONG) for i in range(20)))
+        await backend.close()
+        return backend, results
+
+    backend, results = asyncio.run(run())
+    assert all(allowed for allowed, _ in results)
+    assert backend.round_trips == 1
+    assert not backend.tasks
+
+
+def test_redis_script_is_loaded_again_after_flush():
+    async def run():
+        backend = redis_backend()
+        await backend.hit("user:1 POST /api/login", Rate(2, 60))
+        first_sha = backend.sha
+        await backend.client.script_flush()
+        second = await backend.hit("user:1 POST /api/login", Rate(2, 60))
+        third = await backend.hit("user:1 POST /api/login", Rate(2, 60))
+        await backend.close()
+        return backend, first_sha, second, third
+
+    backend, first_sha, second, third = asyncio.run(run())
+    assert second[0] is True and third[0] is False
+    assert backend.sha == first_sha
+    assert backend.errors == 0
+    # The NoScriptError batch is sent once more after SCRIPT LOAD
+    assert backend.round_trips == 4
@@ -0,0 +1,93 @@
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from domain.models.user_model import User
+from utils.consts import ADMIN, SUPER
+from utils.database import SessionLocal, engine
+from utils.principal import REVOCATION_SYNC_SKEW, RevocationList, revocations
+from utils.security import create_access_token
+
+
+def add_super_user() -> int:
+    with SessionLocal() as session:
+        user = User(first_name="Token", last_name="Holder", email=f"{uuid.uuid4().hex[:8]}@example.com", role_id=SUPER, password="x")
+        session.add(user)
+        session.commit()
+        return user.id
+
+
+# Same claims as /login hands out
+def login_headers(uid: int) -> dict:
+    with SessionLocal() as session:
+        user = session.get(User, uid)
+        token, _ = create_access_token({"sub": user.email, "uid": user.id, "role_id": user.role_id, "epoch": user.token_epoch or 0})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def change_user(uid: int, **values):
+    with SessionLocal() as session:
+        user = session.get(User, uid)
+        for name, value in values.items():
+            setattr(user, name, value)
+        session.commit()
+
+
+# Another process commits straight to the table, this process only learns about it on the next sync
+def bump_elsewhere(uid: int, updated_at: datetime):
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE users SET token_epoch = token_epoch + 1, updated_at = :updated_at WHERE id = :id"), {"updated_at": updated_at, "id": uid})
+
+
+def test_role_change_revokes_tokens(client):
+    uid = add_super_user()
+    headers = login_headers(uid)
+    assert client.get("/api/super/users", headers=headers).status_code == 200
+
+    change_user(uid, role_id=ADMIN)
+    response = client.get("/api/super/users", headers=headers)
+    assert response.status_code == 401
+    assert response.json()["error_message"] == "token has been revoked"
+
+
+def test_deactivation_revokes_tokens(client):
+    uid = add_super_user()
+    headers = login_headers(uid)
+    assert client.get("/api/super/users", headers=headers).status_code == 200
+
+    change_user(uid, active=False)
+    assert client.get("/api/super/users", headers=headers).status_code == 401
+
+
+def test_password_change_revokes_older_tokens_only(client):
+    uid = add_super_user()
+    headers = login_headers(uid)
+
+    change_user(uid, password="changed")
+    assert client.get("/api/super/users", headers=headers).status_code == 401
+    # A token issued after the change carries the new epoch
+    assert client.get("/api/super/users", headers=login_headers(uid)).status_code == 200
+
+
+def test_revocation_from_another_process_is_picked_up_on_next_sync(client):
+    uid = add_super_user()
+    headers = login_headers(uid)
+    assert client.get("/api/super/users", headers=headers).status_code == 200
+
+    bump_elsewhere(uid, datetime.utcnow())
+    assert client.get("/api/super/users", headers=headers).status_code == 200
+
+    revocations.expire()
+    assert client.get("/api/super/users", headers=headers).status_code == 401
+
+
+def test_sync_picks_up_commits_stamped_inside_the_skew_window():
+    uid = add_super_user()
+    revocation_list = RevocationList(interval=0)
+    revocation_list.sync()
+    assert not revocation_list.is_revoked(uid, 0)
+
+    # Written by a process whose clock runs behind, stamped before this process's last sync
+    bump_elsewhere(uid, revocation_list.synced_at - timedelta(seconds=REVOCATION_SYNC_SKEW / 2))
+    revocation_list.sync()
+    assert revocation_list.is_revoked(uid, 0)
+    assert not revocation_list.is_revoked(uid, 1)
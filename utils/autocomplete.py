@@ -0,0 +1,67 @@
+from bisect import bisect_left
+from utils.location_store import LEVELS, location_store, parent_path, register_derived
+from utils.search_index import tokenize
+
+
+def normalize(text: str) -> str:
+    return " ".join(tokenize(text))
+
+
+# Two sorted arrays per level: whole names, and every name from each of its words on ("bo town", "town").
+# A prefix is a bisect plus a walk over at most limit matches.
+class PrefixIndex:
+    def __init__(self, entries: list):
+        self.entries = entries
+        names, words = [], []
+        for position, entry in enumerate(entries):
+            name = normalize(entry["name"])
+            if not name:
+                continue
+            names.append((name, position))
+            split = name.split(" ")
+            words += [(" ".join(split[start:]), position) for start in range(1, len(split))]
+        names.sort()
+        words.sort()
+        self.name_keys = [key for key, _ in names]
+        self.name_positions = [position for _, position in names]
+        self.word_keys = [key for key, _ in words]
+        self.word_positions = [position for _, position in words]
+
+    @staticmethod
+    def walk(keys: list, positions: list, prefix: str, limit: int, seen: set) -> list:
+        matches = []
+        index = bisect_left(keys, prefix)
+        while index < len(keys) and len(matches) < limit and keys[index].startswith(prefix):
+            if positions[index] not in seen:
+                seen.add(positions[index])
+                matches.append((keys[index], positions[index]))
+            index += 1
+        return matches
+
+    # [(rank, key, entry)], names starting with the prefix come before names with a later word starting with it
+    def complete(self, prefix: str, limit: int) -> list:
+        seen = set()
+        matches = [(0, key, self.entries[position]) for key, position in self.walk(self.name_keys, self.name_positions, prefix, limit, seen)]
+        if len(matches) < limit:
+            matches += [(1, key, self.entries[position]) for key, position in self.walk(self.word_keys, self.word_positions, prefix, limit - len(matches), seen)]
+        return matches
+
+
+register_derived("autocomplete", PrefixIndex)
+
+
+async def autocomplete(q: str, levels: list, limit: int) -> list:
+    prefix = normalize(q)
+    if not prefix:
+        return []
+    level_order = list(LEVELS)
+    matches = []
+    for level in levels:
+        index = await location_store.get(level)
+        matches += index.get_derived("autocomplete").complete(prefix, limit)
+
+    matches.sort(key=lambda match: (match[0], match[1], level_order.index(match[2]["level"])))
+    return [
+        {"level": entry["level"], "id": entry["id"], "name": entry["name"], "path": parent_path(entry)}
+        for _, _, entry in matches[:limit]
+    ]
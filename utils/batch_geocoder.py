@@ -0,0 +1,122 @@
+from io import StringIO
+from utils.csv_ingest import CsvFormatError
+from utils.spatial import EARTH_RADIUS_KM
+from dotenv import load_dotenv
+import numpy as np
+import csv
+import io
+import os
+
+# Environment variables
+load_dotenv()
+
+# Rows parsed and written per streamed chunk, and points compared against every target per matrix product
+GEOCODE_CHUNK_ROWS = int(os.getenv("GEOCODE_CHUNK_ROWS", "20000"))
+GEOCODE_BLOCK_SIZE = int(os.getenv("GEOCODE_BLOCK_SIZE", "4096"))
+
+GEOCODE_COLUMNS = ["ward_id", "ward_name", "constituency_id", "constituency_name", "chiefdom_id", "chiefdom_name", "district_id", "district_name", "region_id", "region_name", "distance_km"]
+
+
+def unit_vectors(lat, lon):
+    lat, lon = np.radians(lat), np.radians(lon)
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+
+# Vectorized nearest neighbour: the closest target has the largest dot product with the point.
+# Works on blocks so the (points x targets) matrix stays small.
+def nearest_targets(points: np.ndarray, targets: np.ndarray, block_size: int = GEOCODE_BLOCK_SIZE):
+    indexes = np.empty(len(points), dtype=np.intp)
+    distances = np.empty(len(points))
+    for start in range(0, len(points), block_size):
+        block = points[start:start + block_size]
+        best = (block @ targets.T).argmax(axis=1)
+        chord = np.linalg.norm(block - targets[best], axis=1)
+        indexes[start:start + block_size] = best
+        distances[start:start + block_size] = 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, chord / 2))
+    return indexes, distances
+
+
+def path_columns(path: dict) -> list:
+    columns = []
+    for level in ("ward", "constituency", "chiefdom", "district", "region"):
+        entry = path[level] or {}
+        columns += [entry.get("id", ""), entry.get("name", "")]
+    return columns
+
+
+def parse_coordinate(value: str):
+    try:
+        return float(value)
+    except ValueError:
+        return np.nan
+
+
+# Assigns the ReverseGeocoder path of the nearest ward to every row, in chunks, as CSV text
+class BatchGeocoder:
+    def __init__(self, geocoder):
+        self.geocoder = geocoder
+        if geocoder.wards.located:
+            located, paths = geocoder.wards.located, geocoder.paths
+        else:
+            located = geocoder.chiefdoms.located
+            paths = [geocoder.path(None, chiefdom) for chiefdom in located]
+        self.targets = unit_vectors(np.array([entry["lat"] for entry in located]), np.array([entry["lon"] for entry in located]))
+        self.tails = [path_columns(path) for path in paths]
+
+    def assign(self, lat: np.ndarray, lon: np.ndarray) -> list:
+        valid = ~(np.isnan(lat) | np.isnan(lon)) & (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+        tails = [[""] * len(GEOCODE_COLUMNS)] * len(lat)
+        if valid.any() and len(self.targets):
+            positions = np.flatnonzero(valid)
+            indexes, distances = nearest_targets(unit_vectors(lat[valid], lon[valid]), self.targets)
+            for position, index, distance in zip(positions.tolist(), indexes.tolist(), distances.tolist()):
+                tails[position] = self.tails[index] + [round(distance, 4)]
+        return tails
+
+    # Reads the header eagerly so a bad file is rejected before the response starts
+    def open(self, fileobj):
+        text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+        reader = csv.reader(text)
+        try:
+            header = next(reader, None)
+        except UnicodeDecodeError:
+            raise CsvFormatError("CSV file must be UTF-8 encoded.")
+        if not header:
+            raise CsvFormatError("CSV file is empty.")
+
+        columns = [column.strip().lower() for column in header]
+        if "lat" not in columns or "lon" not in columns:
+            raise CsvFormatError(f"Invalid CSV content format. Expected: ['lat', 'lon'], but got: {header}.")
+        return self.iter_csv(reader, header, columns.index("lat"), columns.index("lon"))
+
+    def iter_csv(self, reader, header: list, lat_position: int, lon_position: int, chunk_rows: int = GEOCODE_CHUNK_ROWS):
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(header + GEOCODE_COLUMNS)
+
+        while True:
+            records = [record for _, record in zip(range(chunk_rows), reader)]
+            if not records:
+                break
+            lat = np.array([parse_coordinate(record[lat_position]) if len(record) > lat_position else np.nan for record in records])
+            lon = np.array([parse_coordinate(record[lon_position]) if len(record) > lon_position else np.nan for record in records])
+            writer.writerows(record + tail for record, tail in zip(records, self.assign(lat, lon)))
+
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+
+        if buffer.tell():
+            yield buffer.getvalue()
+
+
+batch_geocoder = None
+
+# Target vectors are rebuilt only when the reverse geocoder was rebuilt
+def get_batch_geocoder(geocoder) -> BatchGeocoder:
+    global batch_geocoder
+    current = batch_geocoder
+    if current is None or current.geocoder is not geocoder:
+        current = batch_geocoder = BatchGeocoder(geocoder)
+    return current
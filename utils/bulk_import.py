@@ -0,0 +1,92 @@
+from datetime import datetime
+from sqlalchemy import and_, not_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from slugify import slugify
+from dotenv import load_dotenv
+import os
+
+# Environment variables
+load_dotenv()
+
+BULK_IMPORT_BATCH_SIZE = int(os.getenv("BULK_IMPORT_BATCH_SIZE", "1000"))
+
+# Row outcomes
+INSERTED = "inserted"
+UPDATED = "updated"
+SKIPPED = "skipped"
+ERROR = "error"
+
+
+def dialect_insert(session: Session, table):
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(table)
+    if dialect == "sqlite":
+        return sqlite.insert(table)
+    raise NotImplementedError(f"bulk upsert is not supported on {dialect}")
+
+
+# Set based upsert keyed on the unique name column.
+# rows are (row number, values) pairs, values hold "name" and any of the model's columns,
+# update_columns are overwritten on existing names. Soft deleted names are skipped, like the row by row uploads did.
+# Runs on a sync Session (AsyncSession.run_sync).
+def bulk_upsert(session: Session, model, rows: list, update_columns: tuple = (), audit_user: str = "System", batch_size: int = BULK_IMPORT_BATCH_SIZE) -> list:
+    table = model.__table__
+    outcomes = []
+
+    for offset in range(0, len(rows), batch_size):
+        batch = rows[offset:offset + batch_size]
+        names = {row["name"] for _, row in batch}
+
+        # One query for the state of every name in the batch
+        existing = {
+            name: (active, deleted)
+            for name, active, deleted in session.execute(
+                select(table.c.name, table.c.active, table.c.deleted).where(table.c.name.in_(names))
+            )
+        }
+
+        now = datetime.utcnow()
+        values = {}
+        for index, row in batch:
+            name = row["name"]
+            state = existing.get(name)
+            if state is not None and state[0] is False and state[1] is True:
+                outcomes.append({"row": index, "name": name, "status": SKIPPED, "error": "record is deleted"})
+                continue
+
+            outcomes.append({"row": index, "name": name, "status": UPDATED if state is not None or name in values else INSERTED})
+            # A name repeated in the same batch keeps its last values, ON CONFLICT can't touch a row twice per statement
+            values[name] = {
+                **row,
+                "slug": slugify(name),
+                "created_at": now,
+                "created_by": audit_user,
+                "updated_at": now,
+                "updated_by": audit_user,
+                "active": True,
+                "deleted": False,
+            }
+
+        if not values:
+            continue
+
+        # Every row of a statement needs the same keys
+        columns = set().union(*(value.keys() for value in values.values()))
+        params = [{column: value.get(column) for column in columns} for value in values.values()]
+
+        stmt = dialect_insert(session, table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.name],
+            set_={
+                "updated_at": stmt.excluded.updated_at,
+                "updated_by": stmt.excluded.updated_by,
+                **{column: stmt.excluded[column] for column in update_columns},
+            },
+            where=not_(and_(table.c.active == False, table.c.deleted == True)),
+        )
+        session.execute(stmt, params)
+
+    return outcomes
+
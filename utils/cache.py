@@ -0,0 +1,118 @@
+from collections import OrderedDict, defaultdict
+from threading import Lock
+from time import monotonic
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+import os
+
+# Environment variables
+load_dotenv()
+
+LOCATION_CACHE_TTL = float(os.getenv("LOCATION_CACHE_TTL", "300"))
+LOCATION_CACHE_SIZE = int(os.getenv("LOCATION_CACHE_SIZE", "1024"))
+
+# Location tables and the tables their reads join against
+REGION_TABLES = ("regions",)
+DISTRICT_TABLES = ("districts", "regions")
+CONSTITUENCY_TABLES = ("constituencies", "regions", "districts")
+CHIEFDOM_TABLES = ("chiefdoms", "regions", "districts")
+WARD_TABLES = ("wards", "regions", "districts", "constituencies")
+LOCATION_TABLES = ("regions", "districts", "constituencies", "chiefdoms", "wards")
+
+
+# Per table write generation, bumped after every commit that touched the table
+table_generations = defaultdict(int)
+generation_lock = Lock()
+
+def get_generation(*tables: str) -> tuple:
+    with generation_lock:
+        return tuple(table_generations[table] for table in tables)
+
+def bump_generation(*tables: str):
+    with generation_lock:
+        for table in tables:
+            table_generations[table] += 1
+
+
+# TTL + LRU cache
+class TTLCache:
+    def __init__(self, maxsize: int = LOCATION_CACHE_SIZE, ttl: float = LOCATION_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < monotonic():
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            return {"size": len(self.entries), "maxsize": self.maxsize, "ttl": self.ttl, "hits": self.hits, "misses": self.misses}
+
+
+# Keys carry the generations of the tables they were read from. Params are kept exactly as the query uses them,
+# "bo " and "bo" filter differently and must not share an entry.
+class LocationCache(TTLCache):
+    def make_key(self, tables: tuple, **params):
+        params = tuple(sorted((name, value) for name, value in params.items() if value is not None))
+        return (tables, get_generation(*tables), params)
+
+
+location_cache = LocationCache()
+
+
+# Session events, collect written tables while flushing and bump their generation once committed
+def changed_tables(session: Session) -> set:
+    return session.info.setdefault("changed_tables", set())
+
+@event.listens_for(Session, "after_flush")
+def collect_flushed_tables(session, flush_context):
+    tables = changed_tables(session)
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(instance, "__tablename__", None)
+        if table:
+            tables.add(table)
+
+@event.listens_for(Session, "do_orm_execute")
+def collect_executed_tables(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            changed_tables(orm_execute_state.session).add(table.name)
+
+@event.listens_for(Session, "after_commit")
+def bump_committed_tables(session):
+    tables = session.info.pop("changed_tables", None)
+    if tables:
+        bump_generation(*tables)
+
+@event.listens_for(Session, "after_rollback")
+def discard_rolled_back_tables(session):
+    session.info.pop("changed_tables", None)
@@ -0,0 +1,136 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from hashlib import blake2b
+from threading import Lock
+from time import monotonic
+from typing import Optional
+from fastapi import Request
+from sqlalchemy import DateTime, column, func, literal, select, table, union_all
+from starlette.concurrency import run_in_threadpool
+from utils.cache import bump_generation, get_generation
+from utils.database import SessionLocal
+from utils.http_response import etag_matches
+from dotenv import load_dotenv
+import os
+
+# Environment variables
+load_dotenv()
+
+# Seconds a table's validator is trusted before it is read again, writes made by this process refresh it right away
+CONDITIONAL_VALIDATOR_TTL = float(os.getenv("CONDITIONAL_VALIDATOR_TTL", "5"))
+# Seconds clients may reuse a public (user) read without revalidating
+CONDITIONAL_MAX_AGE = int(os.getenv("CONDITIONAL_MAX_AGE", "60"))
+
+
+# Raised by the conditional_get dependency, answered with an empty 304 by the exception handler
+class NotModified(Exception):
+    def __init__(self, headers: dict):
+        self.headers = headers
+
+
+# Row count and latest created/updated/deleted time per table. A soft delete sets deleted_at, an update
+# (ORM or bulk upsert) sets updated_at and an insert or hard delete changes the count.
+def read_validators(tables: list) -> dict:
+    stmt = union_all(*(
+        select(
+            literal(name).label("name"),
+            func.count().label("rows"),
+            func.max(column("created_at", DateTime)).label("created_at"),
+            func.max(column("updated_at", DateTime)).label("updated_at"),
+            func.max(column("deleted_at", DateTime)).label("deleted_at"),
+        ).select_from(table(name, column("created_at"), column("updated_at"), column("deleted_at")))
+        for name in tables
+    ))
+    with SessionLocal() as session:
+        return {row.name: (row.rows, row.created_at, row.updated_at, row.deleted_at) for row in session.execute(stmt)}
+
+
+# Per table validators, cached against the table's write generation and a short TTL
+class TableValidators:
+    def __init__(self, ttl: float = CONDITIONAL_VALIDATOR_TTL):
+        self.ttl = ttl
+        self.entries = {}
+        self.lock = Lock()
+        self.reads = 0
+
+    def stale(self, tables: tuple) -> list:
+        now = monotonic()
+        stale = []
+        for name in tables:
+            entry = self.entries.get(name)
+            if entry is None or entry[0] != get_generation(name) or now - entry[1] >= self.ttl:
+                stale.append(name)
+        return stale
+
+    def refresh(self, tables: list):
+        with self.lock:
+            tables = self.stale(tables)
+            if not tables:
+                return
+            generations = {name: get_generation(name) for name in tables}
+            values = read_validators(tables)
+            self.reads += 1
+            for name in tables:
+                previous = self.entries.get(name)
+                generation = generations[name]
+                # Changed by another worker, bump the generation here too so cached reads of the table are dropped
+                if previous is not None and previous[0] == generation and previous[2] != values[name]:
+                    bump_generation(name)
+                    generation = get_generation(name)
+                self.entries[name] = (generation, monotonic(), values[name])
+
+    async def get(self, tables: tuple) -> list:
+        if self.stale(tables):
+            await run_in_threadpool(self.refresh, tables)
+        return [self.entries[name][2] for name in tables]
+
+    def stats(self):
+        return {"ttl": self.ttl, "tables": len(self.entries), "reads": self.reads}
+
+
+table_validators = TableValidators()
+
+
+def as_http_date(value: datetime) -> str:
+    return format_datetime(value.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+def modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return True
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified.replace(tzinfo=timezone.utc, microsecond=0) > since
+
+
+# Dependency for reads of the given tables: the ETag covers the URL and the tables' validators, so the
+# If-None-Match / If-Modified-Since check runs before the handler queries anything. Only GET and HEAD are
+# answered with 304 (RFC 9110 13.1.2), other methods pass through untouched.
+# The headers are put on request.state and added to the 200 response by conditional_get_middleware.
+def conditional_get(tables: tuple, max_age: Optional[int] = None):
+    cache_control = f"private, max-age={max_age}" if max_age else "private, no-cache"
+
+    async def check_conditional(request: Request):
+        if request.method not in ("GET", "HEAD"):
+            return
+        validators = await table_validators.get(tables)
+        digest = blake2b(repr((request.url.path, request.url.query, validators)).encode(), digest_size=16).hexdigest()
+        headers = {"ETag": f'W/"{digest}"', "Cache-Control": cache_control}
+        timestamps = [value for validator in validators for value in validator[1:] if value is not None]
+        last_modified = max(timestamps) if timestamps else None
+        if last_modified is not None:
+            headers["Last-Modified"] = as_http_date(last_modified)
+
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match is not None:
+            if etag_matches(if_none_match, headers["ETag"]):
+                raise NotModified(headers)
+        elif last_modified is not None and request.headers.get("If-Modified-Since"):
+            if not modified_since(request.headers["If-Modified-Since"], last_modified):
+                raise NotModified(headers)
+
+        request.state.conditional_headers = headers
+
+    return check_conditional
+
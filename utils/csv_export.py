@@ -0,0 +1,65 @@
+from io import StringIO
+from fastapi.responses import StreamingResponse
+from utils.database import DATABASE_ASYNC, AsyncSessionLocal, SessionLocal
+import csv
+import os
+
+# Bytes buffered before a chunk is sent, and rows fetched per server side cursor round trip
+CSV_CHUNK_SIZE = int(os.getenv("CSV_CHUNK_SIZE", str(64 * 1024)))
+CSV_YIELD_PER = int(os.getenv("CSV_YIELD_PER", "1000"))
+
+
+# Accumulates CSV rows and hands them out in chunks of roughly chunk_size characters
+class CsvChunker:
+    def __init__(self, headers: list, chunk_size: int = CSV_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.buffer = StringIO()
+        self.writer = csv.writer(self.buffer)
+        self.writer.writerow(headers)
+
+    def add(self, row: list):
+        self.writer.writerow(row)
+        if self.buffer.tell() >= self.chunk_size:
+            return self.flush()
+        return None
+
+    def flush(self) -> str:
+        chunk = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate(0)
+        return chunk
+
+
+# The export owns its session, the request session is closed before the body is streamed
+async def iter_csv_async(stmt, headers: list, row_fn):
+    chunker = CsvChunker(headers)
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(stmt.execution_options(yield_per=CSV_YIELD_PER))
+        idx = 0
+        async for entity in result.scalars():
+            idx += 1
+            chunk = chunker.add(row_fn(idx, entity))
+            if chunk:
+                yield chunk
+    yield chunker.flush()
+
+
+def iter_csv_sync(stmt, headers: list, row_fn):
+    chunker = CsvChunker(headers)
+    with SessionLocal() as db:
+        result = db.execute(stmt.execution_options(yield_per=CSV_YIELD_PER))
+        for idx, entity in enumerate(result.scalars(), start=1):
+            chunk = chunker.add(row_fn(idx, entity))
+            if chunk:
+                yield chunk
+    yield chunker.flush()
+
+
+# Streams the query as CSV with chunked transfer encoding, memory stays bounded by yield_per and the chunk size
+def stream_csv(stmt, headers: list, row_fn, filename: str) -> StreamingResponse:
+    content = iter_csv_async(stmt, headers, row_fn) if DATABASE_ASYNC else iter_csv_sync(stmt, headers, row_fn)
+    return StreamingResponse(
+        content,
+        media_type="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
@@ -0,0 +1,144 @@
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from utils.bulk_import import ERROR, INSERTED, SKIPPED, UPDATED, bulk_upsert
+from dotenv import load_dotenv
+import csv
+import io
+import os
+
+# Environment variables
+load_dotenv()
+
+CSV_INGEST_BATCH_SIZE = int(os.getenv("CSV_INGEST_BATCH_SIZE", "1000"))
+CSV_INGEST_MAX_ISSUES = int(os.getenv("CSV_INGEST_MAX_ISSUES", "1000"))
+
+
+# Raised when the file as a whole can't be ingested (empty, missing columns, bad encoding)
+class CsvFormatError(ValueError):
+    pass
+
+
+# Column parsers
+def parse_name(value: str) -> str:
+    value = value.strip()
+    if not value:
+        raise ValueError("name is required")
+    return value
+
+
+# Streams (row number, values) batches out of a binary CSV file, rows that fail to parse are reported, not raised.
+# columns maps a header to its parser, headers missing from the file are left out of the values.
+def iter_csv_batches(fileobj, columns: dict, required: set, batch_size: int = CSV_INGEST_BATCH_SIZE):
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.reader(text)
+        header = next(reader, None)
+        if not header:
+            raise CsvFormatError("CSV file is empty.")
+
+        header = [column.strip() for column in header]
+        if not required.issubset(header):
+            raise CsvFormatError(f"Invalid CSV content format. Expected: {sorted(required)}, but got: {header}.")
+
+        positions = {column: header.index(column) for column in columns if column in header}
+        rows, errors = [], []
+
+        for row_number, record in enumerate(reader, start=1):
+            if not any(field.strip() for field in record):
+                continue
+            try:
+                values = {column: parse(record[positions[column]]) for column, parse in columns.items() if column in positions}
+                rows.append((row_number, values))
+            except IndexError:
+                errors.append({"row": row_number, "name": None, "status": ERROR, "error": "missing columns"})
+            except ValueError as e:
+                name = record[positions["name"]].strip() if "name" in positions else None
+                errors.append({"row": row_number, "name": name or None, "status": ERROR, "error": str(e)})
+
+            if len(rows) + len(errors) >= batch_size:
+                yield rows, errors
+                rows, errors = [], []
+
+        if rows or errors:
+            yield rows, errors
+    except UnicodeDecodeError:
+        raise CsvFormatError("CSV file must be UTF-8 encoded.")
+    finally:
+        text.detach()
+
+
+# Parsing is blocking work, every batch is read in the threadpool
+async def aiter_csv_batches(fileobj, columns: dict, required: set, batch_size: int = CSV_INGEST_BATCH_SIZE):
+    batches = iter_csv_batches(fileobj, columns, required, batch_size)
+    while True:
+        batch = await run_in_threadpool(next, batches, None)
+        if batch is None:
+            return
+        yield batch
+
+
+# Counts every outcome but only keeps the rows that were not written, so memory doesn't grow with the file
+class ImportReport:
+    def __init__(self, max_issues: int = CSV_INGEST_MAX_ISSUES):
+        self.max_issues = max_issues
+        self.counts = {INSERTED: 0, UPDATED: 0, SKIPPED: 0, ERROR: 0}
+        self.issues = []
+        self.truncated = False
+
+    def add(self, outcomes: list):
+        for outcome in outcomes:
+            self.counts[outcome["status"]] += 1
+            if outcome["status"] in (SKIPPED, ERROR):
+                if len(self.issues) < self.max_issues:
+                    self.issues.append(outcome)
+                else:
+                    self.truncated = True
+
+    @property
+    def rows(self) -> int:
+        return sum(self.counts.values())
+
+    @property
+    def processed(self) -> int:
+        return self.counts[INSERTED] + self.counts[UPDATED]
+
+    def to_dict(self):
+        return {
+            "rows": self.rows,
+            **self.counts,
+            "issues": sorted(self.issues, key=lambda issue: issue["row"]),
+            "issues_truncated": self.truncated,
+        }
+
+
+# Upserts and commits one batch, a batch the database rejects is reported row by row and the upload carries on
+def write_batch(session: Session, model, rows: list, update_columns: tuple, audit_user: str) -> list:
+    try:
+        outcomes = bulk_upsert(session, model, rows, update_columns, audit_user)
+        session.commit()
+        return outcomes
+    except SQLAlchemyError as e:
+        session.rollback()
+        reason = str(getattr(e, "orig", e)).splitlines()[0]
+        return [{"row": row_number, "name": values["name"], "status": ERROR, "error": reason} for row_number, values in rows]
+
+
+def import_csv(session: Session, fileobj, model, columns: dict, required: set, update_columns: tuple = (), audit_user: str = "System", on_batch=None) -> ImportReport:
+    report = ImportReport()
+    for rows, errors in iter_csv_batches(fileobj, columns, required):
+        report.add(errors)
+        if rows:
+            report.add(write_batch(session, model, rows, update_columns, audit_user))
+        if on_batch:
+            on_batch(report)
+    return report
+
+
+async def import_csv_async(db, fileobj, model, columns: dict, required: set, update_columns: tuple = (), audit_user: str = "System") -> ImportReport:
+    report = ImportReport()
+    async for rows, errors in aiter_csv_batches(fileobj, columns, required):
+        report.add(errors)
+        if rows:
+            report.add(await db.run_sync(write_batch, model, rows, update_columns, audit_user))
+    return report
@@ -0,0 +1,155 @@
+from bisect import bisect_left
+from threading import Lock
+from time import perf_counter
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+import logging
+import random
+
+logger = logging.getLogger("sql.statements")
+
+# Histogram upper bounds in milliseconds
+LATENCY_BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+# Fixed bucket latency histogram
+class Histogram:
+    def __init__(self, bounds=LATENCY_BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms: float):
+        self.counts[bisect_left(self.bounds, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        if value_ms > self.max:
+            self.max = value_ms
+
+    def to_dict(self):
+        labels = [f"<={bound}" for bound in self.bounds] + [f">{self.bounds[-1]}"]
+        return {
+            "count": self.count,
+            "sum_ms": round(self.total, 3),
+            "avg_ms": round(self.total / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max, 3),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+# Counters for a single connection pool
+class PoolStats:
+    def __init__(self):
+        self.lock = Lock()
+        self.pool = None
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time_ms = 0.0
+        self.checkout_latency = Histogram()
+        self.hold_time = Histogram()
+
+    def record_wait(self, elapsed_ms: float, timed_out: bool = False):
+        with self.lock:
+            self.wait_time_ms += elapsed_ms
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+                self.checkout_latency.observe(elapsed_ms)
+
+    def record_hold(self, elapsed_ms: float):
+        with self.lock:
+            self.hold_time.observe(elapsed_ms)
+
+    def to_dict(self):
+        pool = self.pool
+        with self.lock:
+            return {
+                "pool_size": pool.size() if pool else None,
+                "checked_out": pool.checkedout() if pool else 0,
+                "checked_in": pool.checkedin() if pool else 0,
+                "overflow": max(pool.overflow(), 0) if pool else 0,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_time_ms": round(self.wait_time_ms, 3),
+                "checkout_latency": self.checkout_latency.to_dict(),
+                "hold_time": self.hold_time.to_dict(),
+            }
+
+
+pool_stats = {"sync": PoolStats(), "async": PoolStats()}
+
+
+# Times every connection acquisition, including the time spent queued behind other checkouts and the pre-ping
+def timed_connect(pool):
+    stats = pool_stats[pool.stats_key]
+    start = perf_counter()
+    try:
+        connection = super(pool.__class__, pool).connect()
+    except TimeoutError:
+        stats.record_wait((perf_counter() - start) * 1000, timed_out=True)
+        raise
+    stats.record_wait((perf_counter() - start) * 1000)
+    return connection
+
+
+class InstrumentedQueuePool(QueuePool):
+    stats_key = "sync"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        pool_stats[self.stats_key].pool = self
+
+    connect = timed_connect
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    stats_key = "async"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        pool_stats[self.stats_key].pool = self
+
+    connect = timed_connect
+
+
+# Track how long each connection stays checked out
+def instrument_engine(engine, stats_key: str):
+    stats = pool_stats[stats_key]
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checked_out_at"] = perf_counter()
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        if checked_out_at is not None:
+            stats.record_hold((perf_counter() - checked_out_at) * 1000)
+
+
+# Opt-in statement logging, only a sample of statements are timed and logged
+def enable_statement_logging(engine, sample_rate: float):
+    if sample_rate <= 0:
+        return
+    if not logger.handlers:
+        logger.addHandler(logging.StreamHandler())
+    logger.setLevel(logging.INFO)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None and random.random() < sample_rate:
+            context.sampled_at = perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        sampled_at = getattr(context, "sampled_at", None)
+        if sampled_at is not None:
+            logger.info("%.2f ms %s", (perf_counter() - sampled_at) * 1000, statement)
+
+
+def get_pool_stats():
+    return {key: stats.to_dict() for key, stats in pool_stats.items() if stats.pool is not None}
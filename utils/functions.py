@@ -30,7 +30,7 @@ def create_user(db: Session, user: UserCreate):
 
 # Check User Role
 def has_role(role_id: int):
-    def role_checker(user: User = Depends(get_user_from_token)):
+    async def role_checker(user: User = Depends(get_user_from_token)):
         if user.role_id != role_id:
             raise HTTPException(status_code=403, detail="Forbidden")
         return user
@@ -0,0 +1,94 @@
+from collections import defaultdict
+from threading import Lock
+from time import monotonic
+from sqlalchemy import case, false, func, select, text as sql_text
+from utils.cache import get_generation
+from dotenv import load_dotenv
+import os
+import re
+
+# Environment variables
+load_dotenv()
+
+# Minimum similarity, set as pg_trgm.similarity_threshold for PostgreSQL's % operator and used by the in-process fallback
+FUZZY_THRESHOLD = float(os.getenv("FUZZY_THRESHOLD", "0.3"))
+FUZZY_MAX_CANDIDATES = int(os.getenv("FUZZY_MAX_CANDIDATES", "1000"))
+FUZZY_INDEX_TTL = float(os.getenv("FUZZY_INDEX_TTL", "300"))
+
+WORD = re.compile(r"[^\W_]+")
+
+
+# Same trigrams as pg_trgm: lower cased words padded with two spaces in front and one behind
+def trigrams(text: str) -> set:
+    grams = set()
+    for word in WORD.findall((text or "").lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+# Inverted trigram index over (id, text) pairs, scores are pg_trgm's similarity()
+class NgramIndex:
+    def __init__(self, items):
+        self.grams = {}
+        self.postings = defaultdict(list)
+        for id, text in items:
+            grams = trigrams(text)
+            if grams:
+                self.grams[id] = len(grams)
+                for gram in grams:
+                    self.postings[gram].append(id)
+
+    def search(self, text: str, threshold: float = FUZZY_THRESHOLD, limit: int = FUZZY_MAX_CANDIDATES) -> list:
+        query = trigrams(text)
+        shared = defaultdict(int)
+        for gram in query:
+            for id in self.postings.get(gram, ()):
+                shared[id] += 1
+
+        scored = []
+        for id, count in shared.items():
+            score = count / (len(query) + self.grams[id] - count)
+            if score >= threshold:
+                scored.append((score, id))
+        scored.sort(key=lambda match: (-match[0], match[1]))
+        return scored[:limit]
+
+
+# Fallback indexes per column, rebuilt after a write to their table (or after the TTL, for other workers' writes)
+ngram_indexes = {}
+ngram_lock = Lock()
+
+def get_ngram_index(session, column) -> NgramIndex:
+    model = column.class_
+    key = (model.__tablename__, column.key)
+    generation = get_generation(model.__tablename__)
+    entry = ngram_indexes.get(key)
+    if entry is None or entry[0] != generation or entry[1] < monotonic():
+        with ngram_lock:
+            entry = ngram_indexes.get(key)
+            if entry is None or entry[0] != generation or entry[1] < monotonic():
+                index = NgramIndex(session.execute(select(model.id, column)))
+                entry = ngram_indexes[key] = (generation, monotonic() + FUZZY_INDEX_TTL, index)
+    return entry[2]
+
+
+def fuzzy_clauses(session, column, text: str) -> tuple:
+    if session.get_bind().dialect.name == "postgresql":
+        # % is served by the gin_trgm_ops indexes, its threshold is set for this transaction only
+        session.execute(sql_text("SELECT set_config('pg_trgm.similarity_threshold', :threshold, true)"), {"threshold": str(FUZZY_THRESHOLD)})
+        return column.op("%")(text), func.similarity(column, text).desc()
+
+    matches = get_ngram_index(session, column).search(text)
+    if not matches:
+        return false(), None
+    id_column = column.class_.id
+    ranks = {id: rank for rank, (_, id) in enumerate(matches)}
+    return id_column.in_(ranks), case(ranks, value=id_column)
+
+
+# Filters on trigram similarity to text and orders the best matches first
+async def fuzzy_filter(db, stmt, column, text: str):
+    condition, order = await db.run_sync(fuzzy_clauses, column, text)
+    stmt = stmt.filter(condition)
+    return stmt.order_by(order) if order is not None else stmt
@@ -1,30 +1,87 @@
 # core/utils.py
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
-from typing import Any, List, Union
-
-def success_response(data: Union[BaseModel, List[BaseModel], dict, List[dict], None] = None, status_code: int = 200, message: str = "success"):
-    if isinstance(data, list):
-        # Ensure all items are dictionaries
-        data = [item.model_dump() if isinstance(item, BaseModel) else item for item in data]
-    elif isinstance(data, BaseModel):
-        data = data.model_dump()
-    elif isinstance(data, dict):
-        pass
-    else:
+from functools import lru_cache
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy.engine import Row
+from typing import Any, List, Optional, Union
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Already serialized JSON, spliced into the envelope as is
+class JsonBytes(bytes):
+    pass
+
+
+@lru_cache(maxsize=None)
+def list_adapter(schema) -> TypeAdapter:
+    return TypeAdapter(List[schema])
+
+# select(Model, Parent.name.label(...)) rows, the entity's loaded columns plus the labelled values
+def row_values(row):
+    if isinstance(row, Row):
+        return {**vars(row[0]), **row._mapping}
+    return row
+
+# ORM rows validated and encoded by pydantic-core in one pass, without building dicts in between
+def json_rows(schema, rows) -> JsonBytes:
+    adapter = list_adapter(schema)
+    if rows and isinstance(rows[0], Row):
+        rows = [row_values(row) for row in rows]
+    return JsonBytes(adapter.dump_json(adapter.validate_python(rows, from_attributes=True)))
+
+def json_row(schema, row) -> JsonBytes:
+    return JsonBytes(schema.model_validate(row, from_attributes=True).model_dump_json().encode())
+
+
+def encode_default(value):
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    return jsonable_encoder(value)
+
+def encode_json(value) -> bytes:
+    if isinstance(value, JsonBytes):
+        return value
+    if orjson is not None:
+        return orjson.dumps(value, default=encode_default)
+    return json.dumps(value, default=encode_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def success_response(data: Union[JsonBytes, BaseModel, List[BaseModel], dict, List[dict], None] = None, status_code: int = 200, message: str = "success", next_cursor: Optional[str] = None):
+    if not isinstance(data, (JsonBytes, list, BaseModel, dict)):
         data = []
 
-    return JSONResponse(
-        status_code=200,
-        content={
-            "status": "success",
-            "status_code": status_code,
-            "message": message,
-            "data": data
-        }
+    # The envelope is written around the encoded data, keys in the same order as before
+    body = b'{"status":"success","status_code":%d,"message":%s,"data":%s' % (status_code, encode_json(message), encode_json(data))
+    # Keyset paginated lists, absent on the last page
+    if next_cursor is not None:
+        body += b',"next_cursor":%s' % encode_json(next_cursor)
+
+    return Response(
+        status_code=status_code,
+        content=body + b"}",
+        media_type="application/json",
     )
 
 
+# Conditional GET, True when If-None-Match names one of the representation's ETags (weak comparison, RFC 9110)
+def etag_matches(if_none_match: Optional[str], *etags: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = {etag.removeprefix("W/") for etag in etags}
+    return any(tag.strip().removeprefix("W/") in opaque for tag in if_none_match.split(","))
+
+def not_modified_response(headers: dict):
+    return Response(status_code=304, headers=headers)
+
+
 def error_response(status_code: int, error_message: str,):
     return JSONResponse(
         status_code=status_code,
@@ -35,4 +92,4 @@ def error_response(status_code: int, error_message: str,):
             "data": [],
         }
     )
-    
+
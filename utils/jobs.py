@@ -0,0 +1,159 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import func, select, update
+from starlette.concurrency import run_in_threadpool
+from domain.models.import_job_model import ImportJob
+from domain.schema.import_job_schema import ImportJobRead
+from utils.csv_ingest import CsvFormatError, import_csv
+from utils.database import SessionLocal
+from dotenv import load_dotenv
+import asyncio
+import logging
+import os
+import shutil
+import socket
+import tempfile
+import uuid
+
+# Environment variables
+load_dotenv()
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_UPLOAD_DIR = os.getenv("JOB_UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "location-uploads"))
+# Seconds between heartbeats of a worker's jobs / seconds without one before a job counts as abandoned
+JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "30"))
+JOB_HEARTBEAT_TIMEOUT = float(os.getenv("JOB_HEARTBEAT_TIMEOUT", "120"))
+
+# Job statuses
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+logger = logging.getLogger("jobs")
+
+# This process, the random suffix tells a restarted worker apart from the one that had the same pid
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# Local worker pool, no broker: jobs run in this process and report progress through the import_jobs table
+executor = None
+
+def get_executor() -> ThreadPoolExecutor:
+    global executor
+    if executor is None:
+        executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="import-job")
+    return executor
+
+
+def save_upload(fileobj, job_id: str) -> tuple:
+    os.makedirs(JOB_UPLOAD_DIR, exist_ok=True)
+    path = os.path.join(JOB_UPLOAD_DIR, f"{job_id}.csv")
+    with open(path, "wb") as target:
+        shutil.copyfileobj(fileobj, target, 1024 * 1024)
+    return path, os.path.getsize(path)
+
+
+# Only moves jobs that are still live, a job already failed as abandoned stays failed
+def set_job(session, job_id: str, **values):
+    session.execute(update(ImportJob).where(ImportJob.id == job_id, ImportJob.status.in_((QUEUED, RUNNING))).values(heartbeat_at=datetime.utcnow(), **values))
+    session.commit()
+
+
+def job_counts(report) -> dict:
+    return {
+        "rows": report.rows,
+        "inserted": report.counts["inserted"],
+        "updated": report.counts["updated"],
+        "skipped": report.counts["skipped"],
+        "errors": report.counts["error"],
+    }
+
+
+# Worker body, runs the same batched import as the synchronous upload on its own session
+def run_import_job(job_id: str, path: str, size: int, model, options: dict):
+    with SessionLocal() as session:
+        try:
+            set_job(session, job_id, status=RUNNING, started_at=datetime.utcnow())
+            with open(path, "rb") as fileobj:
+                def on_batch(report):
+                    progress = min(fileobj.tell() / size, 1.0) if size else 1.0
+                    set_job(session, job_id, progress=progress, **job_counts(report))
+
+                report = import_csv(session, fileobj, model, on_batch=on_batch, **options)
+
+            set_job(session, job_id, status=COMPLETED, progress=1.0, issues=report.to_dict()["issues"], finished_at=datetime.utcnow(), **job_counts(report))
+        except CsvFormatError as e:
+            set_job(session, job_id, status=FAILED, error_message=str(e), finished_at=datetime.utcnow())
+        except Exception as e:
+            logger.exception("import job %s failed", job_id)
+            session.rollback()
+            set_job(session, job_id, status=FAILED, error_message=f"Error processing CSV: {str(e)}", finished_at=datetime.utcnow())
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+# Persists the upload, records the job and hands it to the worker pool, returns the queued job
+async def submit_import_job(db, file, model, created_by: str = "System", **options) -> ImportJob:
+    job_id = uuid.uuid4().hex
+    path, size = await run_in_threadpool(save_upload, file.file, job_id)
+
+    job = ImportJob(id=job_id, table=model.__tablename__, filename=file.filename, path=path, status=QUEUED, size=size, progress=0.0, rows=0, inserted=0, updated=0, skipped=0, errors=0, created_by=created_by, worker=WORKER_ID, heartbeat_at=datetime.utcnow())
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+
+    get_executor().submit(run_import_job, job_id, path, size, model, options)
+    return job
+
+
+# Marks the live jobs of a worker as still in hand
+def beat_jobs(worker: str = WORKER_ID) -> int:
+    with SessionLocal() as session:
+        result = session.execute(update(ImportJob).where(ImportJob.worker == worker, ImportJob.status.in_((QUEUED, RUNNING))).values(heartbeat_at=datetime.utcnow()))
+        session.commit()
+        return result.rowcount
+
+
+# Jobs of other workers that stopped beating were cut off by a crash or restart and will never finish
+def fail_abandoned_jobs(worker: str = WORKER_ID, timeout: float = JOB_HEARTBEAT_TIMEOUT) -> int:
+    cutoff = datetime.utcnow() - timedelta(seconds=timeout)
+    with SessionLocal() as session:
+        jobs = session.scalars(select(ImportJob).where(
+            ImportJob.status.in_((QUEUED, RUNNING)),
+            ImportJob.worker.is_distinct_from(worker),
+            func.coalesce(ImportJob.heartbeat_at, ImportJob.created_at) < cutoff,
+        )).all()
+        for job in jobs:
+            job.status = FAILED
+            job.error_message = "Interrupted by a server restart, upload the file again"
+            job.finished_at = datetime.utcnow()
+            if job.path and os.path.exists(job.path):
+                os.remove(job.path)
+        session.commit()
+        return len(jobs)
+
+
+# Runs in every worker: keeps its own jobs alive and fails the ones whose worker is gone
+async def watch_jobs(interval: float = JOB_HEARTBEAT_INTERVAL):
+    while True:
+        try:
+            await run_in_threadpool(beat_jobs)
+            failed = await run_in_threadpool(fail_abandoned_jobs)
+            if failed:
+                logger.warning("%s abandoned import jobs marked failed", failed)
+        except Exception as e:
+            logger.warning("import job heartbeat failed: %s", e)
+        await asyncio.sleep(interval)
+
+
+def job_duration(job: ImportJob):
+    if job.started_at is None:
+        return None
+    return ((job.finished_at or datetime.utcnow()) - job.started_at).total_seconds()
+
+
+def serialize_job(job: ImportJob) -> dict:
+    data = ImportJobRead.from_orm(job).model_copy(update={"duration_seconds": job_duration(job)})
+    return jsonable_encoder(data)
@@ -0,0 +1,140 @@
+from threading import Lock
+from time import monotonic
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+from starlette.concurrency import run_in_threadpool
+from domain.models.region_model import Region
+from domain.models.district_model import District
+from domain.models.constituency_model import Constituency
+from domain.models.chiefdom_model import Chiefdom
+from domain.models.ward_model import Ward
+from utils.cache import CHIEFDOM_TABLES, CONSTITUENCY_TABLES, DISTRICT_TABLES, REGION_TABLES, WARD_TABLES, get_generation
+from utils.database import SessionLocal
+from utils.spatial import KDTree
+from dotenv import load_dotenv
+import os
+
+# Environment variables
+load_dotenv()
+
+# Writes made by this process reload a level right away, the TTL picks up writes made by other workers
+LOCATION_STORE_TTL = float(os.getenv("LOCATION_STORE_TTL", "300"))
+
+# Level -> (model, tables it is read from, parent levels denormalized onto every entry)
+LEVELS = {
+    "region": (Region, REGION_TABLES, ()),
+    "district": (District, DISTRICT_TABLES, (("region", Region),)),
+    "constituency": (Constituency, CONSTITUENCY_TABLES, (("region", Region), ("district", District))),
+    "chiefdom": (Chiefdom, CHIEFDOM_TABLES, (("region", Region), ("district", District))),
+    "ward": (Ward, WARD_TABLES, (("region", Region), ("district", District), ("constituency", Constituency))),
+}
+
+
+# Structures built from a level's entries (search, autocomplete...), rebuilt with the level
+DERIVED = {}
+
+def register_derived(name: str, build):
+    DERIVED[name] = build
+
+
+def parent_path(entry: dict) -> list:
+    _, _, parents = LEVELS[entry["level"]]
+    return [
+        {"level": parent, "id": entry[f"{parent}_id"], "name": entry[f"{parent}_name"]}
+        for parent, _ in parents if entry.get(f"{parent}_id") is not None
+    ]
+
+
+# Active entities of a level as plain dicts, parents joined once instead of per lookup
+def load_level(session, level: str) -> list:
+    model, _, parents = LEVELS[level]
+    stmt = select(model.id, model.name, model.slug, model.lon, model.lat)
+    for parent, parent_model in parents:
+        parent_alias = aliased(parent_model)
+        parent_id = getattr(model, f"{parent}_id")
+        stmt = stmt.add_columns(parent_id.label(f"{parent}_id"), parent_alias.name.label(f"{parent}_name"))
+        stmt = stmt.outerjoin(parent_alias, parent_alias.id == parent_id)
+    stmt = stmt.filter(model.active == True, model.deleted == False).order_by(model.id)
+    return [{"level": level, **row._asdict()} for row in session.execute(stmt)]
+
+
+# Immutable view of one level, replaced as a whole on reload so readers never see a half built index
+class LevelIndex:
+    def __init__(self, level: str, entries: list, generation: tuple):
+        self.level = level
+        self.entries = entries
+        self.generation = generation
+        self.loaded_at = monotonic()
+        self.by_id = {entry["id"]: entry for entry in entries}
+        self.derived = {}
+        self.lock = Lock()
+
+        located = [entry for entry in entries if entry["lon"] is not None and entry["lat"] is not None]
+        self.located = located
+        self.spatial = KDTree([(entry["lat"], entry["lon"]) for entry in located])
+
+    # [(entry, distance_km)] nearest first
+    def nearest(self, lat: float, lon: float, k: int = 1) -> list:
+        return [(self.located[position], distance) for position, distance in self.spatial.query(lat, lon, k)]
+
+    # Derived structures live and die with this level's data
+    def get_derived(self, name: str):
+        value = self.derived.get(name)
+        if value is None:
+            with self.lock:
+                value = self.derived.get(name)
+                if value is None:
+                    value = self.derived[name] = DERIVED[name](self.entries)
+        return value
+
+
+# In-memory copy of the location tables, each level reloads on its own when one of its tables was written
+class LocationStore:
+    def __init__(self, ttl: float = LOCATION_STORE_TTL):
+        self.ttl = ttl
+        self.levels = {}
+        self.lock = Lock()
+        self.reloads = 0
+
+    def is_fresh(self, level: str) -> bool:
+        index = self.levels.get(level)
+        return (
+            index is not None
+            and index.generation == get_generation(*LEVELS[level][1])
+            and monotonic() - index.loaded_at < self.ttl
+        )
+
+    def refresh(self, level: str) -> LevelIndex:
+        with self.lock:
+            if not self.is_fresh(level):
+                # Read the generation first, a write that lands while loading leaves the level stale
+                generation = get_generation(*LEVELS[level][1])
+                with SessionLocal() as session:
+                    entries = load_level(session, level)
+                index = LevelIndex(level, entries, generation)
+                # Built before the level is published so the first reader after a write doesn't pay for it
+                for name in DERIVED:
+                    index.get_derived(name)
+                self.levels[level] = index
+                self.reloads += 1
+            return self.levels[level]
+
+    async def get(self, level: str) -> LevelIndex:
+        if self.is_fresh(level):
+            return self.levels[level]
+        return await run_in_threadpool(self.refresh, level)
+
+    # Loads every level at startup
+    async def warm(self):
+        for level in LEVELS:
+            await self.get(level)
+
+    def stats(self):
+        return {
+            "ttl": self.ttl,
+            "reloads": self.reloads,
+            "levels": {level: len(index.entries) for level, index in self.levels.items()},
+        }
+
+
+location_store = LocationStore()
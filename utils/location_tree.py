@@ -0,0 +1,82 @@
+from collections import defaultdict
+from typing import Optional
+from utils.location_store import location_store
+
+# Levels below each level of the tree, chiefdoms and constituencies both sit under a district
+CHILDREN = {
+    "region": ("district",),
+    "district": ("constituency", "chiefdom"),
+    "constituency": ("ward",),
+    "chiefdom": (),
+    "ward": (),
+}
+# Parent column a level is grouped by in the tree
+PARENT = {"district": "region", "constituency": "district", "chiefdom": "district", "ward": "constituency"}
+KEYS = {"district": "districts", "constituency": "constituencies", "chiefdom": "chiefdoms", "ward": "wards"}
+MAX_DEPTH = 4
+
+
+class TreeRootNotFound(Exception):
+    pass
+
+
+def node(entry: dict) -> dict:
+    return {"id": entry["id"], "name": entry["name"], "slug": entry["slug"], "lon": entry["lon"], "lat": entry["lat"]}
+
+
+# Levels reachable from the root within depth levels (the root counts as one)
+def tree_levels(root: str, depth: int) -> list:
+    levels, frontier = [root], [root]
+    for _ in range(depth - 1):
+        frontier = [child for level in frontier for child in CHILDREN[level]]
+        levels.extend(frontier)
+    return levels
+
+
+# Entries of each level grouped by parent id, one pass per level over the in-memory store
+def group_children(indexes: dict) -> dict:
+    grouped = {}
+    for level, index in indexes.items():
+        if level not in PARENT:
+            continue
+        by_parent = defaultdict(list)
+        parent_column = f"{PARENT[level]}_id"
+        for entry in index.entries:
+            by_parent[entry[parent_column]].append(entry)
+            # Wards without a constituency hang off their district instead of being dropped
+            if level == "ward" and entry[parent_column] is None:
+                by_parent[("district", entry["district_id"])].append(entry)
+        grouped[level] = by_parent
+    return grouped
+
+
+def build_node(level: str, entry: dict, grouped: dict, depth: int) -> dict:
+    result = node(entry)
+    if depth <= 1:
+        return result
+    for child in CHILDREN[level]:
+        if child in grouped:
+            result[KEYS[child]] = [build_node(child, child_entry, grouped, depth - 1) for child_entry in grouped[child].get(entry["id"], [])]
+    if level == "district" and "ward" in grouped and depth > 2:
+        unassigned = grouped["ward"].get(("district", entry["id"]))
+        if unassigned:
+            result["wards"] = [node(ward) for ward in unassigned]
+    return result
+
+
+# Whole hierarchy (a list of regions), or the subtree of one region or district. Each level comes from the
+# location store, which reads it with one query when it reloads, and is attached to its parents in memory.
+async def build_tree(region_id: Optional[int] = None, district_id: Optional[int] = None, depth: int = MAX_DEPTH):
+    root = "district" if district_id is not None else "region"
+    levels = tree_levels(root, depth)
+    indexes = {level: await location_store.get(level) for level in levels}
+    grouped = group_children(indexes)
+
+    root_id = district_id if district_id is not None else region_id
+    if root_id is None:
+        return [build_node(root, entry, grouped, depth) for entry in indexes[root].entries]
+
+    entry = indexes[root].by_id.get(root_id)
+    if entry is None:
+        raise TreeRootNotFound(f"{root} not found")
+    return build_node(root, entry, grouped, depth)
@@ -1,27 +1,120 @@
 from typing import List, Optional
 from fastapi import Request
-from sqlalchemy import desc, asc
+from sqlalchemy import desc, asc, and_, or_
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Query
+import base64
+import json
+
+
+# Raised for unknown sort fields or cursors that don't belong to the requested ordering
+class PaginationError(ValueError):
+    pass
+
+
+# Public, indexed columns a list can be sorted on, the value of the last row goes into next_cursor
+LOCATION_SORT_FIELDS = ["id", "name", "slug"]
+SORT_FIELDS = {
+    "regions": LOCATION_SORT_FIELDS,
+    "districts": LOCATION_SORT_FIELDS,
+    "constituencies": LOCATION_SORT_FIELDS,
+    "chiefdoms": LOCATION_SORT_FIELDS,
+    "wards": LOCATION_SORT_FIELDS,
+    "roles": ["id", "name", "slug"],
+    "users": ["id", "email", "first_name", "last_name", "organization"],
+}
+
+
+# Any other table only pages by id
+def sort_fields(model) -> List[str]:
+    return SORT_FIELDS.get(model.__tablename__, ["id"])
+
+
+def encode_cursor(sort_field: str, sort_order: str, value, id: int) -> str:
+    raw = json.dumps([sort_field, sort_order, value, id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_field, sort_order, value, id = json.loads(raw)
+        return sort_field, sort_order, value, int(id)
+    except (ValueError, TypeError):
+        raise PaginationError("invalid cursor")
+
 
 # Pagination Model
 class PaginationParams:
-    def __init__(self, skip: int = 0, limit: int = 10, sort_field: Optional[str] = None, sort_order: Optional[str] = "asc"):
+    def __init__(self, skip: int = 0, limit: int = 10, sort_field: Optional[str] = None, sort_order: Optional[str] = "asc", cursor: Optional[str] = None, model=None, ranked: bool = False):
         self.skip = skip
         self.limit = limit
         self.sort_field = sort_field
-        self.sort_order = sort_order
+        self.sort_order = "desc" if sort_order == "desc" else "asc"
+        self.cursor = cursor
+        self.model = model
+        # Ranked queries are already ordered by relevance, the sort only breaks ties and pages are offset based
+        self.ranked = ranked
+
+        if self.sort_field and self.model is not None and self.sort_field not in sort_fields(self.model):
+            raise PaginationError(f"sort_field must be one of: {', '.join(sort_fields(self.model))}")
 
     def get_query(self, query: Query):
-        # Apply sorting if sort_field is specified
-        if self.sort_field:
-            if self.sort_order == "desc":
-                query = query.order_by(desc(self.sort_field))
+        # Without a model only the legacy offset pagination is available
+        if self.model is None:
+            if self.sort_field:
+                if self.sort_order == "desc":
+                    query = query.order_by(desc(self.sort_field))
+                else:
+                    query = query.order_by(asc(self.sort_field))
+            return query.offset(self.skip).limit(self.limit)
+
+        # Keyset ordering on (sort_field, id), id breaks ties so every row has a unique position
+        id_column = self.model.id
+        sort_column = getattr(self.model, self.sort_field or "id")
+        nullable = sort_column is not id_column and self.model.__table__.columns[sort_column.key].nullable
+        direction = desc if self.sort_order == "desc" else asc
+        if sort_column is id_column:
+            query = query.order_by(direction(id_column))
+        elif nullable:
+            # NULLs always sort last, whatever the dialect's default
+            query = query.order_by(sort_column.is_(None), direction(sort_column), direction(id_column))
+        else:
+            query = query.order_by(direction(sort_column), direction(id_column))
+
+        if self.ranked:
+            if self.cursor:
+                raise PaginationError("cursor is not supported on ranked results, use skip")
+            query = query.offset(self.skip)
+        elif self.cursor:
+            sort_field, sort_order, value, last_id = decode_cursor(self.cursor)
+            if sort_field != (self.sort_field or "id") or sort_order != self.sort_order:
+                raise PaginationError("cursor does not match sort_field and sort_order")
+            past_id = id_column < last_id if self.sort_order == "desc" else id_column > last_id
+            if sort_column is id_column:
+                after = past_id
+            elif value is None:
+                after = and_(sort_column.is_(None), past_id)
             else:
-                query = query.order_by(asc(self.sort_field))
-        
-        # Apply pagination (skip and limit)
-        query = query.offset(self.skip).limit(self.limit)
-        return query
+                past_value = sort_column < value if self.sort_order == "desc" else sort_column > value
+                after = or_(past_value, and_(sort_column == value, past_id))
+                if nullable:
+                    after = or_(after, sort_column.is_(None))
+            query = query.filter(after)
+        else:
+            query = query.offset(self.skip)
+
+        # One extra row tells whether there is a next page
+        return query.limit(self.limit + 1)
+
+    # Trim the look-ahead row and build the cursor of the next page
+    def paginate(self, rows: list):
+        if self.model is None or self.ranked or len(rows) <= self.limit:
+            return rows[:self.limit], None
+        rows = rows[:self.limit]
+        last = rows[-1][0] if isinstance(rows[-1], Row) else rows[-1]
+        sort_field = self.sort_field or "id"
+        return rows, encode_cursor(sort_field, self.sort_order, getattr(last, sort_field), last.id)
 
 
 # Pagination & Sorting Helper Function
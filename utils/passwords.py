@@ -0,0 +1,149 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+from time import perf_counter
+from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+from dotenv import load_dotenv
+import asyncio
+import multiprocessing
+import os
+
+# Environment variables
+load_dotenv()
+
+ENCRYPTION = os.getenv("ENCRYPTION")
+# Cost factor for new hashes, stored hashes with other rounds are rehashed on login (unset keeps the scheme default)
+PASSWORD_ROUNDS = os.getenv("PASSWORD_ROUNDS")
+# Worker processes for hashing (0 runs it in the threadpool), and hashes queued or running before new ones are turned away
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_MAX_PENDING = int(os.getenv("PASSWORD_MAX_PENDING", "64"))
+
+
+def rounds_settings(scheme: str, rounds) -> dict:
+    if not scheme or not rounds:
+        return {}
+    rounds = int(rounds)
+    return {f"{scheme}__default_rounds": rounds, f"{scheme}__min_rounds": rounds, f"{scheme}__max_rounds": rounds}
+
+pwd_context = CryptContext(schemes=[ENCRYPTION], deprecated="auto", **rounds_settings(ENCRYPTION, PASSWORD_ROUNDS))
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+# (valid, new hash), the new hash is set when the stored one uses other rounds or a deprecated scheme
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+# Runs in the worker process, the time spent there is reported back for the metrics
+def timed_call(function, *args):
+    started = perf_counter()
+    result = function(*args)
+    return result, perf_counter() - started
+
+
+class PasswordPoolBusy(Exception):
+    pass
+
+
+# Password hashing is pure CPU work, a burst of logins in the threadpool holds the GIL and stalls every
+# other request of the worker. Hashes run in separate processes instead, with a cap on how many may wait.
+class PasswordPool:
+    def __init__(self, workers: int = PASSWORD_WORKERS, max_pending: int = PASSWORD_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.executor = None
+        self.lock = Lock()
+        self.pending = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.run_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def get_executor(self) -> ProcessPoolExecutor:
+        with self.lock:
+            if self.executor is None:
+                # spawn, so workers do not inherit the event loop, threads and database connections of the server
+                self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self.executor
+
+    def start(self):
+        if self.workers:
+            executor = self.get_executor()
+            for _ in range(self.workers):
+                executor.submit(perf_counter)
+
+    def shutdown(self):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, function, *args):
+        with self.lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordPoolBusy("too many password checks in progress, try again shortly")
+            self.pending += 1
+            self.peak_pending = max(self.peak_pending, self.pending)
+
+        started = perf_counter()
+        run_seconds = 0.0
+        try:
+            if self.workers:
+                try:
+                    result, run_seconds = await asyncio.wrap_future(self.get_executor().submit(timed_call, function, *args))
+                except BrokenProcessPool:
+                    # A worker died, start a fresh pool for the next call
+                    self.shutdown()
+                    raise
+            else:
+                result, run_seconds = await run_in_threadpool(timed_call, function, *args)
+        except Exception:
+            with self.lock:
+                self.failed += 1
+            raise
+        finally:
+            with self.lock:
+                self.pending -= 1
+
+        elapsed = perf_counter() - started
+        with self.lock:
+            self.completed += 1
+            self.run_seconds += run_seconds
+            self.wait_seconds += max(0.0, elapsed - run_seconds)
+            self.max_seconds = max(self.max_seconds, elapsed)
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self.run(hash_password, password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> tuple:
+        return await self.run(verify_and_update_password, plain_password, hashed_password)
+
+    def stats(self):
+        with self.lock:
+            completed = self.completed or 1
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "peak_pending": self.peak_pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "failed": self.failed,
+                "avg_run_ms": round(self.run_seconds / completed * 1000, 2),
+                "avg_wait_ms": round(self.wait_seconds / completed * 1000, 2),
+                "max_ms": round(self.max_seconds * 1000, 2),
+            }
+
+
+password_pool = PasswordPool()
@@ -0,0 +1,186 @@
+from datetime import datetime, timedelta
+from threading import Lock
+from time import monotonic
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from domain.models.user_model import User
+from utils.cache import TTLCache
+from utils.database import SessionLocal
+from dotenv import load_dotenv
+import logging
+import os
+
+# Environment variables
+load_dotenv()
+
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+# How often each process picks up token epochs bumped by other processes, and the clock skew allowed between them
+REVOCATION_SYNC_INTERVAL = float(os.getenv("REVOCATION_SYNC_INTERVAL", "30"))
+REVOCATION_SYNC_SKEW = float(os.getenv("REVOCATION_SYNC_SKEW", "60"))
+
+# Columns that decide who a token belongs to and what it may do
+PRINCIPAL_COLUMNS = ("email", "role_id", "active", "deleted")
+# Changing any of these revokes the user's outstanding tokens
+REVOKING_COLUMNS = (*PRINCIPAL_COLUMNS, "password")
+
+logger = logging.getLogger("security")
+
+
+# Read-only snapshot of the authenticated user, safe to share between requests unlike a session bound User
+class Principal:
+    __slots__ = ("id", "email", "role_id", "first_name", "last_name", "organization", "active", "deleted")
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            setattr(self, name, values.get(name))
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(**{name: getattr(user, name) for name in cls.__slots__})
+
+    # Tokens are only issued to active users and revoked when that changes
+    @classmethod
+    def from_claims(cls, claims: dict) -> "Principal":
+        return cls(
+            id=claims["uid"],
+            email=claims.get("sub"),
+            role_id=claims["role_id"],
+            first_name=claims.get("first_name"),
+            last_name=claims.get("last_name"),
+            organization=claims.get("organization"),
+            active=True,
+            deleted=False,
+        )
+
+
+# Principals keyed by token subject. The epoch moves on every invalidation so a load
+# that raced with a committed change is not cached.
+principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL)
+principal_epoch = 0
+epoch_lock = Lock()
+
+def get_principal_epoch() -> int:
+    return principal_epoch
+
+def invalidate_principals(subjects=None):
+    global principal_epoch
+    with epoch_lock:
+        principal_epoch += 1
+    if subjects is None:
+        principal_cache.clear()
+    else:
+        for subject in subjects:
+            principal_cache.delete(subject)
+
+
+# Latest token epoch per user id, a token signed with an older epoch is revoked.
+# Commits made in this process apply right away, other processes' are pulled every REVOCATION_SYNC_INTERVAL.
+class RevocationList:
+    def __init__(self, interval: float = REVOCATION_SYNC_INTERVAL):
+        self.interval = interval
+        self.epochs = {}
+        self.lock = Lock()
+        self.synced_at = None
+        self.next_sync = 0.0
+        self.syncs = 0
+
+    def is_revoked(self, uid: int, epoch: int) -> bool:
+        return self.epochs.get(uid, 0) > epoch
+
+    def bump(self, uid: int, epoch: int):
+        with self.lock:
+            if epoch > self.epochs.get(uid, 0):
+                self.epochs[uid] = epoch
+
+    def expire(self):
+        self.next_sync = 0.0
+
+    def sync(self):
+        with self.lock:
+            if monotonic() < self.next_sync:
+                return
+            now = datetime.utcnow()
+            stmt = select(User.id, User.token_epoch).filter(User.token_epoch > 0)
+            if self.synced_at is not None:
+                stmt = stmt.filter(User.updated_at >= self.synced_at - timedelta(seconds=REVOCATION_SYNC_SKEW))
+            try:
+                with SessionLocal() as session:
+                    for uid, epoch in session.execute(stmt):
+                        if epoch > self.epochs.get(uid, 0):
+                            self.epochs[uid] = epoch
+                self.synced_at = now
+                self.syncs += 1
+            except Exception as e:
+                logger.warning("revocation sync failed: %s", e)
+            self.next_sync = monotonic() + self.interval
+
+    async def sync_if_due(self):
+        if monotonic() >= self.next_sync:
+            await run_in_threadpool(self.sync)
+
+    def stats(self):
+        return {"users": len(self.epochs), "syncs": self.syncs, "interval": self.interval}
+
+
+revocations = RevocationList()
+
+
+@event.listens_for(User, "before_update")
+def bump_token_epoch(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[column].history.has_changes() for column in REVOKING_COLUMNS):
+        target.token_epoch = (target.token_epoch or 0) + 1
+
+
+# Session events, collect users whose email, role or flags changed and drop them once committed
+def changed_principals(session: Session) -> set:
+    return session.info.setdefault("changed_principals", set())
+
+@event.listens_for(Session, "after_flush")
+def collect_changed_users(session, flush_context):
+    for instance in session.dirty:
+        if isinstance(instance, User):
+            state = inspect(instance)
+            if any(state.attrs[column].history.has_changes() for column in PRINCIPAL_COLUMNS):
+                # A changed email also drops the principal cached under the old one
+                changed_principals(session).update([instance.email, *state.attrs["email"].history.deleted])
+            if state.attrs["token_epoch"].history.has_changes():
+                session.info.setdefault("bumped_epochs", {})[instance.id] = instance.token_epoch
+    for instance in session.deleted:
+        if isinstance(instance, User):
+            changed_principals(session).add(instance.email)
+
+@event.listens_for(Session, "do_orm_execute")
+def collect_bulk_user_writes(orm_execute_state):
+    # Rehashing a password on login changes neither the user's access nor their tokens
+    if orm_execute_state.execution_options.get("password_rehash"):
+        return
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None and table.name == User.__tablename__:
+            session = orm_execute_state.session
+            session.info["all_principals_changed"] = True
+            # Bulk updates skip the mapper events, bump the epoch of every matched row
+            statement = orm_execute_state.statement
+            if orm_execute_state.is_update and "token_epoch" not in {getattr(key, "key", key) for key in statement._values or {}}:
+                orm_execute_state.statement = statement.values(token_epoch=User.token_epoch + 1)
+
+@event.listens_for(Session, "after_commit")
+def drop_committed_principals(session):
+    for uid, epoch in session.info.pop("bumped_epochs", {}).items():
+        revocations.bump(uid, epoch)
+    if session.info.get("all_principals_changed"):
+        revocations.expire()
+    subjects = session.info.pop("changed_principals", None)
+    if session.info.pop("all_principals_changed", False):
+        invalidate_principals()
+    elif subjects:
+        invalidate_principals(subjects)
+
+@event.listens_for(Session, "after_rollback")
+def discard_rolled_back_principals(session):
+    session.info.pop("changed_principals", None)
+    session.info.pop("all_principals_changed", None)
+    session.info.pop("bumped_epochs", None)
@@ -0,0 +1,341 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from hashlib import blake2b
+from threading import Lock
+from time import monotonic_ns
+from dotenv import load_dotenv
+import asyncio
+import logging
+import os
+import tempfile
+
+# Environment variables
+load_dotenv()
+
+# Requests allowed per period (seconds) for each client and route
+RATE_LIMIT_REQUESTS = int(os.getenv("RATE_LIMIT_REQUESTS", "5"))
+RATE_LIMIT_PERIOD = float(os.getenv("RATE_LIMIT_PERIOD", "60"))
+# Where the limiter state lives: memory (per process), shared (all workers on this host) or redis (all nodes)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+# Keys tracked before the least recently used is dropped, and seconds between sweeps of idle keys
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+RATE_LIMIT_SWEEP_INTERVAL = float(os.getenv("RATE_LIMIT_SWEEP_INTERVAL", "60"))
+# Most keys looked at per sweep step, the event loop gets control back between steps
+RATE_LIMIT_SWEEP_BATCH = int(os.getenv("RATE_LIMIT_SWEEP_BATCH", "1000"))
+# Shared memory segment name and number of key slots (16 bytes each)
+RATE_LIMIT_SHM_NAME = os.getenv("RATE_LIMIT_SHM_NAME", "locations_rate_limit")
+RATE_LIMIT_SHM_SLOTS = int(os.getenv("RATE_LIMIT_SHM_SLOTS", "65536"))
+# Redis server, key prefix and the most checks sent in one pipeline
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+RATE_LIMIT_REDIS_PREFIX = os.getenv("RATE_LIMIT_REDIS_PREFIX", "ratelimit:")
+RATE_LIMIT_REDIS_BATCH = int(os.getenv("RATE_LIMIT_REDIS_BATCH", "256"))
+
+NS_PER_SECOND = 1_000_000_000
+
+logger = logging.getLogger("uvicorn.error")
+
+
+# limit requests per period seconds, as generic cell rate algorithm intervals in nanoseconds
+class Rate:
+    __slots__ = ("limit", "period", "interval", "tolerance")
+
+    def __init__(self, limit: int, period: float):
+        self.limit = limit
+        self.period = period
+        self.interval = int(period * NS_PER_SECOND) // limit
+        self.tolerance = self.interval * limit
+
+
+DEFAULT_RATE = Rate(RATE_LIMIT_REQUESTS, RATE_LIMIT_PERIOD)
+
+
+# Generic cell rate algorithm: one integer per key, the theoretical arrival time (TAT) of the next request.
+# A request is allowed when it would not push the TAT more than limit intervals past now, so up to
+# limit requests may burst and one more is allowed every period / limit.
+def gcra(tat: int, now: int, rate: Rate) -> tuple:
+    tat = max(tat, now) + rate.interval
+    excess = tat - now - rate.tolerance
+    return (excess <= 0, tat, max(excess, 0))
+
+
+# Backends answer hit(key, rate) with (allowed, seconds until the next request would be allowed)
+class RateLimitBackend:
+    name = None
+
+    def __init__(self):
+        self.allowed = 0
+        self.rejected = 0
+
+    def record(self, allowed: bool):
+        if allowed:
+            self.allowed += 1
+        else:
+            self.rejected += 1
+
+    # Drops up to limit idle keys, returns how many were dropped (limit means there may be more)
+    def sweep(self, limit: int = RATE_LIMIT_SWEEP_BATCH) -> int:
+        return 0
+
+    def clear(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def stats(self):
+        return {"backend": self.name, "allowed": self.allowed, "rejected": self.rejected}
+
+
+# State of this process only, keys in an OrderedDict kept in least recently used order
+class MemoryBackend(RateLimitBackend):
+    name = "memory"
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        super().__init__()
+        self.max_keys = max_keys
+        self.store = OrderedDict()
+        self.lock = Lock()
+        self.evicted = 0
+        self.swept = 0
+
+    def check(self, key: str, rate: Rate) -> tuple:
+        now = monotonic_ns()
+        with self.lock:
+            allowed, tat, excess = gcra(self.store.get(key, now), now, rate)
+            if allowed:
+                self.store[key] = tat
+                if len(self.store) > self.max_keys:
+                    self.store.popitem(last=False)
+                    self.evicted += 1
+            if key in self.store:
+                self.store.move_to_end(key)
+            self.record(allowed)
+        return allowed, excess / NS_PER_SECOND
+
+    async def hit(self, key: str, rate: Rate = DEFAULT_RATE) -> tuple:
+        return self.check(key, rate)
+
+    # A key whose TAT has passed has a full budget again, forgetting it changes nothing. Keys are walked from
+    # the least recently used end and the walk stops at the first one still in use, anything left behind is
+    # either swept later or evicted by the max_keys cap.
+    def sweep(self, limit: int = RATE_LIMIT_SWEEP_BATCH) -> int:
+        now = monotonic_ns()
+        swept = 0
+        with self.lock:
+            while swept < limit and self.store:
+                key, tat = next(iter(self.store.items()))
+                if tat > now:
+                    break
+                del self.store[key]
+                swept += 1
+            self.swept += swept
+        return swept
+
+    def clear(self):
+        with self.lock:
+            self.store.clear()
+
+    def stats(self):
+        return {**super().stats(), "keys": len(self.store), "max_keys": self.max_keys, "evicted": self.evicted, "swept": self.swept}
+
+
+# Open addressed table of (key hash, TAT) int64 pairs in a named shared memory segment, so every worker on
+# the host shares one budget. CLOCK_MONOTONIC is system wide, and an flock serializes the updates.
+# There is no sweep, find_slot reuses slots whose TAT has passed and a full scan would hold the host wide lock.
+class SharedMemoryBackend(RateLimitBackend):
+    name = "shared"
+    PROBES = 8
+
+    def __init__(self, name: str = RATE_LIMIT_SHM_NAME, slots: int = RATE_LIMIT_SHM_SLOTS):
+        import fcntl
+        from multiprocessing import resource_tracker, shared_memory
+
+        super().__init__()
+        self.fcntl = fcntl
+        self.slots = slots
+        self.lock_file = open(os.path.join(tempfile.gettempdir(), f"{name}.lock"), "a+b")
+        with self.locked():
+            try:
+                self.memory = shared_memory.SharedMemory(name=name, create=True, size=slots * 16)
+            except FileExistsError:
+                self.memory = shared_memory.SharedMemory(name=name)
+        # The segment outlives any single worker, keep the resource tracker from unlinking it on exit
+        resource_tracker.unregister(self.memory._name, "shared_memory")
+        self.table = self.memory.buf.cast("q")
+        self.lock = Lock()
+        self.evicted = 0
+
+    @contextmanager
+    def locked(self):
+        self.fcntl.flock(self.lock_file, self.fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            self.fcntl.flock(self.lock_file, self.fcntl.LOCK_UN)
+
+    @staticmethod
+    def key_hash(key: str) -> int:
+        return int.from_bytes(blake2b(key.encode(), digest_size=8).digest(), "little", signed=True) or 1
+
+    # Slot holding the key, else a free or idle slot, else the one with the oldest TAT among the probes
+    def find_slot(self, key_hash: int, now: int) -> tuple:
+        table, start = self.table, key_hash % self.slots
+        free = victim = None
+        for probe in range(self.PROBES):
+            slot = (start + probe) % self.slots
+            slot_hash, tat = table[slot * 2], table[slot * 2 + 1]
+            if slot_hash == key_hash:
+                return slot, tat
+            if free is None and (slot_hash == 0 or tat <= now):
+                free = slot
+            if victim is None or tat < table[victim * 2 + 1]:
+                victim = slot
+        if free is None:
+            free = victim
+            self.evicted += 1
+        return free, now
+
+    def check(self, key: str, rate: Rate) -> tuple:
+        key_hash = self.key_hash(key)
+        with self.lock, self.locked():
+            now = monotonic_ns()
+            slot, tat = self.find_slot(key_hash, now)
+            allowed, tat, excess = gcra(tat, now, rate)
+            if allowed:
+                self.table[slot * 2], self.table[slot * 2 + 1] = key_hash, tat
+        self.record(allowed)
+        return allowed, excess / NS_PER_SECOND
+
+    async def hit(self, key: str, rate: Rate = DEFAULT_RATE) -> tuple:
+        return self.check(key, rate)
+
+    def clear(self):
+        with self.lock, self.locked():
+            self.memory.buf[:] = bytes(len(self.memory.buf))
+
+    # Detaches this worker, the segment stays for the others
+    async def close(self):
+        self.table.release()
+        self.memory.close()
+        self.lock_file.close()
+
+    def stats(self):
+        # Every other int64 is a key hash, counted in C rather than slot by slot
+        keys = self.slots - self.table[::2].tolist().count(0)
+        return {**super().stats(), "keys": keys, "slots": self.slots, "evicted": self.evicted}
+
+
+# GCRA on the Redis server clock in microseconds, returns 0 when allowed or the microseconds to wait
+GCRA_SCRIPT = """
+local time = redis.call("TIME")
+local now = tonumber(time[1]) * 1000000 + tonumber(time[2])
+local tat = tonumber(redis.call("GET", KEYS[1]) or now)
+if tat < now then tat = now end
+tat = tat + tonumber(ARGV[1])
+local excess = tat - now - tonumber(ARGV[2])
+if excess > 0 then return excess end
+redis.call("SET", KEYS[1], tat, "PX", math.ceil((tat - now) / 1000))
+return 0
+"""
+
+
+# Shared by every worker and node. Each check is one EVALSHA, and checks made while a round trip is in
+# flight are sent together in one pipeline. Keys expire once their budget is full again.
+class RedisBackend(RateLimitBackend):
+    name = "redis"
+
+    def __init__(self, url: str = RATE_LIMIT_REDIS_URL, prefix: str = RATE_LIMIT_REDIS_PREFIX, batch: int = RATE_LIMIT_REDIS_BATCH):
+        from redis import asyncio as redis
+        from redis.exceptions import NoScriptError
+
+        super().__init__()
+        self.client = redis.from_url(url)
+        self.no_script = NoScriptError
+        self.sha = None
+        self.prefix = prefix
+        self.batch = batch
+        self.pending = []
+        self.flushing = False
+        # The event loop only keeps weak references to tasks
+        self.tasks = set()
+        self.round_trips = 0
+        self.errors = 0
+
+    async def hit(self, key: str, rate: Rate = DEFAULT_RATE) -> tuple:
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((self.prefix + key, rate, future))
+        if not self.flushing:
+            self.flushing = True
+            task = asyncio.create_task(self.flush())
+            self.tasks.add(task)
+            task.add_done_callback(self.flushed)
+        return await future
+
+    async def evaluate(self, checks: list) -> list:
+        if self.sha is None:
+            self.sha = await self.client.script_load(GCRA_SCRIPT)
+        pipe = self.client.pipeline(transaction=False)
+        for key, rate, _ in checks:
+            pipe.evalsha(self.sha, 1, key, rate.interval // 1000, rate.tolerance // 1000)
+        self.round_trips += 1
+        return await pipe.execute(raise_on_error=False)
+
+    def flushed(self, task: asyncio.Task):
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("rate limit flush failed: %s", task.exception())
+
+    async def flush(self):
+        try:
+            while self.pending:
+                checks, self.pending = self.pending[:self.batch], self.pending[self.batch:]
+                try:
+                    results = await self.evaluate(checks)
+                    # Script cache flushed or a new server, load it again once
+                    if any(isinstance(result, self.no_script) for result in results):
+                        self.sha = None
+                        results = await self.evaluate(checks)
+                except Exception as e:
+                    results = [e] * len(checks)
+
+                for (_, _, future), result in zip(checks, results):
+                    if isinstance(result, Exception):
+                        # Fail open, an unreachable Redis should not take the API down with it
+                        self.errors += 1
+                        logger.warning("rate limit check failed: %s", result)
+                        allowed, retry_after = True, 0.0
+                    else:
+                        allowed, retry_after = result == 0, int(result) / 1_000_000
+                    self.record(allowed)
+                    if not future.done():
+                        future.set_result((allowed, retry_after))
+        finally:
+            self.flushing = False
+
+    async def close(self):
+        await self.client.aclose()
+
+    def stats(self):
+        return {**super().stats(), "round_trips": self.round_trips, "errors": self.errors}
+
+
+BACKENDS = {"memory": MemoryBackend, "shared": SharedMemoryBackend, "redis": RedisBackend}
+
+def create_backend(name: str = RATE_LIMIT_BACKEND) -> RateLimitBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"unknown RATE_LIMIT_BACKEND {name!r}, expected one of {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
+
+
+rate_limiter = create_backend()
+
+
+async def sweep_periodically(limiter: RateLimitBackend, interval: float = RATE_LIMIT_SWEEP_INTERVAL, batch: int = RATE_LIMIT_SWEEP_BATCH):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            # Bounded steps, requests are served in between
+            while limiter.sweep(batch) == batch:
+                await asyncio.sleep(0)
+        except Exception as e:
+            logger.warning("rate limit sweep failed: %s", e)
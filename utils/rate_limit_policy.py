@@ -0,0 +1,138 @@
+from fnmatch import fnmatchcase
+from threading import Lock
+from fastapi import HTTPException, Request
+from utils.consts import ADMIN, SUPER, USER
+from utils.rate_limit import DEFAULT_RATE, Rate
+from utils.security import decode_jwt
+from dotenv import load_dotenv
+import json
+import logging
+import os
+
+# Environment variables
+load_dotenv()
+
+# Policies file, see rate_limits.json
+RATE_LIMIT_CONFIG = os.getenv("RATE_LIMIT_CONFIG", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "rate_limits.json"))
+
+ROLE_NAMES = {SUPER: "super", ADMIN: "admin", USER: "user"}
+ROLES = (*ROLE_NAMES.values(), "anonymous")
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+# Paths matching no route share one budget per caller, so probing random URLs does not create keys
+UNMATCHED = "unmatched"
+
+logger = logging.getLogger("uvicorn.error")
+
+
+# "600/minute" -> Rate(600, 60)
+def parse_rate(text: str) -> Rate:
+    count, _, unit = text.partition("/")
+    if unit not in PERIODS or not count.strip().isdigit() or int(count) < 1:
+        raise ValueError(f"invalid rate limit {text!r}, expected <requests>/<{'|'.join(PERIODS)}>")
+    return Rate(int(count), PERIODS[unit])
+
+
+def load_policies(path: str = RATE_LIMIT_CONFIG) -> list:
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        config = json.load(f)
+    policies = []
+    for policy in config.get("policies", []):
+        method, _, route = policy["route"].partition(" ")
+        if policy.get("role") not in (None, *ROLES):
+            raise ValueError(f"unknown role {policy['role']!r} in rate limit policy {policy['route']!r}")
+        policies.append((method.upper(), route or "*", policy.get("role"), parse_rate(policy["limit"])))
+    return policies
+
+
+# Path segment trie over the app's route templates, static segments are tried before {parameters}
+class RouteTable:
+    def __init__(self, templates):
+        self.root = {}
+        for template in templates:
+            node = self.root
+            for segment in template.strip("/").split("/"):
+                key = "{}" if segment.startswith("{") else segment
+                node = node.setdefault(key, {})
+            node[None] = template
+
+    def match(self, path: str):
+        return self.walk(self.root, path.strip("/").split("/"), 0)
+
+    def walk(self, node: dict, segments: list, position: int):
+        if position == len(segments):
+            return node.get(None)
+        for key in (segments[position], "{}"):
+            child = node.get(key)
+            if child is not None:
+                template = self.walk(child, segments, position + 1)
+                if template is not None:
+                    return template
+        return None
+
+
+# Every (method, route template) is resolved against the policies once, when the first request comes in.
+# Per request that leaves a trie walk over the path segments and two dict lookups.
+class RateLimitPolicies:
+    def __init__(self, policies: list, default: Rate = DEFAULT_RATE):
+        self.policies = policies
+        self.default = default
+        self.routes = None
+        self.rates = {}
+        self.lock = Lock()
+
+    # First policy in file order matching the method, template and role
+    def rate_for(self, method: str, template: str, role: str) -> Rate:
+        for policy_method, route, policy_role, rate in self.policies:
+            if fnmatchcase(method, policy_method) and fnmatchcase(template, route) and policy_role in (None, role):
+                return rate
+        return self.default
+
+    def build(self, app):
+        with self.lock:
+            if self.routes is not None:
+                return
+            try:
+                paths = app.openapi()["paths"]
+            except Exception as e:
+                logger.warning("rate limit policies fall back to the default, routes not resolved: %s", e)
+                paths = {}
+            for template, operations in paths.items():
+                for method in operations:
+                    method = method.upper()
+                    self.rates[(method, template)] = {role: self.rate_for(method, template, role) for role in ROLES}
+            self.routes = RouteTable(paths)
+
+    # Verified token claims (kept on request.state for get_user_from_token), the user id or else the client IP
+    @staticmethod
+    def identify(request: Request) -> tuple:
+        scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() == "bearer" and token:
+            try:
+                claims = decode_jwt(token)
+            except HTTPException:
+                claims = None
+            if claims is not None:
+                request.state.token_claims = (token, claims)
+                user = claims.get("uid", claims.get("sub"))
+                return f"user:{user}", ROLE_NAMES.get(claims.get("role_id"), "user")
+        return f"ip:{request.client.host}", "anonymous"
+
+    # (limiter key, rate) for the request
+    def resolve(self, request: Request) -> tuple:
+        if self.routes is None:
+            self.build(request.app)
+        method = "GET" if request.method == "HEAD" else request.method
+        identity, role = self.identify(request)
+        template = self.routes.match(request.url.path)
+        rates = self.rates.get((method, template))
+        if rates is None:
+            return f"{identity} {UNMATCHED}", self.default
+        return f"{identity} {method} {template}", rates[role]
+
+    def stats(self):
+        return {"policies": len(self.policies), "routes": len(self.rates)}
+
+
+rate_limit_policies = RateLimitPolicies(load_policies())
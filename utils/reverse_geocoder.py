@@ -0,0 +1,82 @@
+from threading import Lock
+from starlette.concurrency import run_in_threadpool
+from utils.location_store import location_store
+from utils.spatial import KDTree
+
+
+def ref(entry: dict, level: str):
+    if entry.get(f"{level}_id") is None:
+        return None
+    return {"id": entry[f"{level}_id"], "name": entry[f"{level}_name"]}
+
+
+# Every ward carries its whole administrative path, precomputed once per reload of the ward or chiefdom level.
+# Wards have no chiefdom column, so a ward gets the chiefdom closest to it within its own district.
+class ReverseGeocoder:
+    def __init__(self, wards, chiefdoms):
+        self.wards = wards
+        self.chiefdoms = chiefdoms
+
+        chiefdoms_by_district = {}
+        for entry in chiefdoms.located:
+            chiefdoms_by_district.setdefault(entry["district_id"], []).append(entry)
+        district_trees = {
+            district_id: (entries, KDTree([(entry["lat"], entry["lon"]) for entry in entries]))
+            for district_id, entries in chiefdoms_by_district.items()
+        }
+
+        self.paths = []
+        for ward in wards.located:
+            entries, tree = district_trees.get(ward["district_id"], (None, None))
+            if tree is not None:
+                chiefdom = entries[tree.query(ward["lat"], ward["lon"], 1)[0][0]]
+            else:
+                nearest = chiefdoms.nearest(ward["lat"], ward["lon"], 1)
+                chiefdom = nearest[0][0] if nearest else None
+            self.paths.append(self.path(ward, chiefdom))
+
+    @staticmethod
+    def path(ward, chiefdom) -> dict:
+        parent = ward or chiefdom
+        return {
+            "ward": {"id": ward["id"], "name": ward["name"]} if ward else None,
+            "constituency": ref(ward, "constituency") if ward else None,
+            "chiefdom": {"id": chiefdom["id"], "name": chiefdom["name"]} if chiefdom else None,
+            "district": ref(parent, "district"),
+            "region": ref(parent, "region"),
+        }
+
+    def reverse(self, lat: float, lon: float):
+        nearest = self.wards.spatial.query(lat, lon, 1)
+        if nearest:
+            position, distance = nearest[0]
+            return {**self.paths[position], "distance_km": round(distance, 4)}
+
+        # No located wards, resolve as far as the chiefdoms go
+        nearest = self.chiefdoms.nearest(lat, lon, 1)
+        if nearest:
+            chiefdom, distance = nearest[0]
+            return {**self.path(None, chiefdom), "distance_km": round(distance, 4)}
+        return None
+
+
+reverse_lock = Lock()
+reverse_geocoder = None
+
+def build_reverse_geocoder(wards, chiefdoms) -> ReverseGeocoder:
+    global reverse_geocoder
+    with reverse_lock:
+        current = reverse_geocoder
+        if current is None or current.wards is not wards or current.chiefdoms is not chiefdoms:
+            current = reverse_geocoder = ReverseGeocoder(wards, chiefdoms)
+        return current
+
+
+# Rebuilt only when the ward or chiefdom level was reloaded
+async def get_reverse_geocoder() -> ReverseGeocoder:
+    wards = await location_store.get("ward")
+    chiefdoms = await location_store.get("chiefdom")
+    current = reverse_geocoder
+    if current is not None and current.wards is wards and current.chiefdoms is chiefdoms:
+        return current
+    return await run_in_threadpool(build_reverse_geocoder, wards, chiefdoms)
@@ -0,0 +1,108 @@
+from bisect import bisect_left
+from collections import defaultdict
+from utils.location_store import LEVELS, location_store, parent_path, register_derived
+import re
+
+WORD = re.compile(r"[^\W_]+")
+
+# Words dropped to form an alias, "Bo District" is also found as "Bo"
+LEVEL_WORDS = {"region", "province", "area", "district", "constituency", "chiefdom", "ward"}
+
+
+def tokenize(text: str) -> list:
+    return WORD.findall((text or "").lower())
+
+
+def aliases(name: str) -> list:
+    words = [word for word in tokenize(name) if word not in LEVEL_WORDS]
+    alias = " ".join(words)
+    return [alias] if alias and alias != " ".join(tokenize(name)) else []
+
+
+# Inverted index over the names, slugs and aliases of one level.
+# Terms are kept sorted so the last query word can also match as a prefix.
+class SearchIndex:
+    def __init__(self, entries: list):
+        self.entries = entries
+        self.names = []
+        self.aliases = []
+        postings = defaultdict(set)
+        for position, entry in enumerate(entries):
+            name = " ".join(tokenize(entry["name"]))
+            entry_aliases = aliases(entry["name"])
+            self.names.append(name)
+            self.aliases.append(entry_aliases)
+            for term in {*name.split(), *tokenize(entry["slug"]), *(word for alias in entry_aliases for word in alias.split())}:
+                postings[term].add(position)
+        self.terms = sorted(postings)
+        self.postings = [postings[term] for term in self.terms]
+
+    def exact(self, word: str) -> set:
+        position = bisect_left(self.terms, word)
+        if position < len(self.terms) and self.terms[position] == word:
+            return self.postings[position]
+        return set()
+
+    def prefixed(self, prefix: str) -> set:
+        matches = set()
+        position = bisect_left(self.terms, prefix)
+        while position < len(self.terms) and self.terms[position].startswith(prefix):
+            matches |= self.postings[position]
+            position += 1
+        return matches
+
+    # [(score, entry)], every query word has to match, the last one may be a prefix
+    def search(self, words: list) -> list:
+        if not words:
+            return []
+        scores = None
+        for index, word in enumerate(words):
+            exact = self.exact(word)
+            matches = exact | self.prefixed(word) if index == len(words) - 1 else exact
+            word_scores = {position: 2 if position in exact else 1 for position in matches}
+            if scores is None:
+                scores = word_scores
+            else:
+                scores = {position: score + word_scores[position] for position, score in scores.items() if position in word_scores}
+            if not scores:
+                return []
+
+        query = " ".join(words)
+        results = []
+        for position, score in scores.items():
+            if self.names[position] == query:
+                score += 10
+            elif query in self.aliases[position]:
+                score += 8
+            elif self.names[position].startswith(query):
+                score += 3
+            results.append((score, self.entries[position]))
+        return results
+
+
+register_derived("search", SearchIndex)
+
+
+# Ranked matches across levels, each level's index is rebuilt only when that level reloads
+async def search_locations(q: str, levels: list, limit: int) -> list:
+    words = tokenize(q)
+    level_order = list(LEVELS)
+    results = []
+    for level in levels:
+        index = await location_store.get(level)
+        results += index.get_derived("search").search(words)
+
+    results.sort(key=lambda result: (-result[0], len(result[1]["name"] or ""), level_order.index(result[1]["level"]), result[1]["id"]))
+    return [
+        {
+            "level": entry["level"],
+            "id": entry["id"],
+            "name": entry["name"],
+            "slug": entry["slug"],
+            "lon": entry["lon"],
+            "lat": entry["lat"],
+            "score": score,
+            "path": parent_path(entry),
+        }
+        for score, entry in results[:limit]
+    ]
@@ -1,12 +1,14 @@
 from typing import Any
-from sqlalchemy.orm import Session
-from passlib.context import CryptContext
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
 from jose import jwt
 from datetime import datetime, timedelta
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Request
 from fastapi.security import OAuth2PasswordBearer
 from domain.models.user_model import User
-from utils.database import get_db
+from utils.database import get_async_db
+from utils.passwords import hash_password, verify_password
+from utils.principal import Principal, get_principal_epoch, principal_cache, revocations
 from dotenv import load_dotenv
 import jwt
 import os
@@ -19,16 +21,8 @@ load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY")
 HASHING_ALGORITHM = os.getenv("HASHING_ALGORITHM")
 ACCESS_TOKEN_EXPIRY_MINUTES = os.getenv("ACCESS_TOKEN_EXPIRY_MINUTES")
-ENCRYPTION = os.getenv("ENCRYPTION")
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-pwd_context = CryptContext(schemes=[ENCRYPTION], deprecated="auto")
-
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
@@ -47,12 +41,38 @@ def decode_jwt(token: str) -> Any:
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="invalid credentials")
 
-def get_user_from_token(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    payload = decode_jwt(token)
+# Resolved at most once per request. Tokens carrying uid, role_id and epoch claims are checked against
+# the revocation list only, older tokens go through the principal cache and the users table.
+async def get_user_from_token(request: Request, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)) -> Principal:
+    principal = getattr(request.state, "principal", None)
+    if principal is not None:
+        return principal
+
+    # Already verified by the rate limiter for this token
+    verified = getattr(request.state, "token_claims", None)
+    payload = verified[1] if verified is not None and verified[0] == token else decode_jwt(token)
+    if "uid" in payload and "role_id" in payload and "epoch" in payload:
+        await revocations.sync_if_due()
+        if revocations.is_revoked(payload["uid"], payload["epoch"]):
+            raise HTTPException(status_code=401, detail="token has been revoked")
+        principal = Principal.from_claims(payload)
+        request.state.principal = principal
+        return principal
+
     email_value = payload.get("sub") 
-    user = db.query(User).filter(User.email == email_value).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="user not found")
-    return user
+    principal = principal_cache.get(email_value)
+    if principal is None:
+        epoch = get_principal_epoch()
+        result = await db.execute(select(User).filter(User.email == email_value))
+        user = result.scalars().first()
+        if not user:
+            raise HTTPException(status_code=404, detail="user not found")
+        principal = Principal.from_user(user)
+        if epoch == get_principal_epoch():
+            principal_cache.set(email_value, principal)
+
+    if not principal.active or principal.deleted:
+        raise HTTPException(status_code=401, detail="user is not active")
 
-from sqlalchemy.event import listens_for
\ No newline at end of file
+    request.state.principal = principal
+    return principal
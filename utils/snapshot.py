@@ -0,0 +1,223 @@
+from array import array
+from hashlib import sha256
+from threading import Lock
+from starlette.concurrency import run_in_threadpool
+from utils.http_response import success_response
+from utils.location_store import LEVELS, location_store
+from dotenv import load_dotenv
+import gzip
+import math
+import os
+import struct
+import sys
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Environment variables
+load_dotenv()
+
+# Compression levels, paid once per data change rather than per request
+SNAPSHOT_GZIP_LEVEL = int(os.getenv("SNAPSHOT_GZIP_LEVEL", "9"))
+SNAPSHOT_BROTLI_QUALITY = int(os.getenv("SNAPSHOT_BROTLI_QUALITY", "11"))
+
+FORMATS = {"json": "application/json", "binary": "application/octet-stream"}
+# Preferred first, brotli only when the module is installed
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+# Binary layout, little endian:
+#   b"SLLS", version (u16), level count (u16), then per level:
+#   name (u8 length + ascii), row count (u32), parent count (u8) and parent names (u8 length + ascii each),
+#   id (i32 x rows), one parent id column per parent (i32 x rows, -1 when missing),
+#   lon and lat (f64 x rows, NaN when missing), name and slug (u32 x rows + 1 offsets, then the UTF-8 bytes)
+BINARY_MAGIC = b"SLLS"
+BINARY_VERSION = 1
+
+
+def plural(level: str) -> str:
+    return "constituencies" if level == "constituency" else f"{level}s"
+
+
+def parent_levels(level: str) -> list:
+    return [parent for parent, _ in LEVELS[level][2]]
+
+
+# Active entities of every level with their parent ids, parent names are left to the parent rows
+def snapshot_data(levels: dict) -> dict:
+    data = {}
+    for level, index in levels.items():
+        columns = ["id", "name", "slug", "lon", "lat", *(f"{parent}_id" for parent in parent_levels(level))]
+        data[plural(level)] = [{column: entry[column] for column in columns} for entry in index.entries]
+    return data
+
+
+def pack_text(text: str) -> bytes:
+    encoded = text.encode("ascii")
+    return struct.pack("<B", len(encoded)) + encoded
+
+def pack_column(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+def pack_strings(values: list) -> bytes:
+    encoded = [(value or "").encode() for value in values]
+    offsets, position = array("I", [0]), 0
+    for value in encoded:
+        position += len(value)
+        offsets.append(position)
+    return pack_column(offsets) + b"".join(encoded)
+
+def encode_binary(levels: dict) -> bytes:
+    parts = [BINARY_MAGIC, struct.pack("<HH", BINARY_VERSION, len(levels))]
+    for level, index in levels.items():
+        entries, parents = index.entries, parent_levels(level)
+        parts.append(pack_text(level) + struct.pack("<IB", len(entries), len(parents)))
+        parts.extend(pack_text(parent) for parent in parents)
+        parts.append(pack_column(array("i", [entry["id"] for entry in entries])))
+        for parent in parents:
+            parts.append(pack_column(array("i", [-1 if entry[f"{parent}_id"] is None else entry[f"{parent}_id"] for entry in entries])))
+        for column in ("lon", "lat"):
+            parts.append(pack_column(array("d", [math.nan if entry[column] is None else entry[column] for entry in entries])))
+        parts.append(pack_strings([entry["name"] for entry in entries]))
+        parts.append(pack_strings([entry["slug"] for entry in entries]))
+    return b"".join(parts)
+
+
+# Reads the binary form back into the JSON data layout, for Python clients
+def decode_binary(payload: bytes) -> dict:
+    view, position = memoryview(payload), 0
+
+    def take(size: int) -> memoryview:
+        nonlocal position
+        position += size
+        return view[position - size:position]
+
+    def unpack(layout: str) -> tuple:
+        return struct.unpack(layout, take(struct.calcsize(layout)))
+
+    def text() -> str:
+        return bytes(take(unpack("<B")[0])).decode("ascii")
+
+    def column(typecode: str, count: int) -> array:
+        values = array(typecode)
+        values.frombytes(take(values.itemsize * count))
+        if sys.byteorder == "big":
+            values.byteswap()
+        return values
+
+    def strings(count: int) -> list:
+        offsets = column("I", count + 1)
+        block = bytes(take(offsets[-1]))
+        return [block[offsets[i]:offsets[i + 1]].decode() or None for i in range(count)]
+
+    if bytes(take(4)) != BINARY_MAGIC:
+        raise ValueError("not a location snapshot")
+    version, level_count = unpack("<HH")
+    if version != BINARY_VERSION:
+        raise ValueError(f"unsupported snapshot version {version}")
+
+    data = {}
+    for _ in range(level_count):
+        level = text()
+        count, parent_count = unpack("<IB")
+        parents = [text() for _ in range(parent_count)]
+        ids = column("i", count)
+        parent_ids = {parent: column("i", count) for parent in parents}
+        lon, lat = column("d", count), column("d", count)
+        names, slugs = strings(count), strings(count)
+        data[plural(level)] = [
+            {
+                "id": ids[i], "name": names[i], "slug": slugs[i],
+                "lon": None if math.isnan(lon[i]) else lon[i], "lat": None if math.isnan(lat[i]) else lat[i],
+                **{f"{parent}_id": None if parent_ids[parent][i] == -1 else parent_ids[parent][i] for parent in parents},
+            }
+            for i in range(count)
+        ]
+    return data
+
+
+# One format of the snapshot, identity bytes plus every supported encoding, built once and served as is
+class Representation:
+    def __init__(self, body: bytes, media_type: str):
+        self.media_type = media_type
+        # Content hash, so every worker holding the same data hands out the same ETag
+        digest = sha256(body).hexdigest()[:32]
+        self.bodies = {None: body, "gzip": gzip.compress(body, compresslevel=SNAPSHOT_GZIP_LEVEL, mtime=0)}
+        if brotli is not None:
+            self.bodies["br"] = brotli.compress(body, quality=SNAPSHOT_BROTLI_QUALITY)
+        # Strong ETags differ per content coding, the bytes on the wire differ
+        self.etags = {encoding: f'"{digest}-{encoding}"' if encoding else f'"{digest}"' for encoding in self.bodies}
+
+    def sizes(self):
+        return {encoding or "identity": len(body) for encoding, body in self.bodies.items()}
+
+
+class Snapshot:
+    def __init__(self, levels: dict):
+        # The LevelIndex objects it was built from, a reload of any level replaces its object
+        self.sources = tuple(levels.values())
+        self.counts = {plural(level): len(index.entries) for level, index in levels.items()}
+        self.representations = {
+            "json": Representation(success_response(data=snapshot_data(levels)).body, FORMATS["json"]),
+            "binary": Representation(encode_binary(levels), FORMATS["binary"]),
+        }
+
+
+# Whole active hierarchy, rebuilt only when the location store reloaded one of the levels
+class SnapshotStore:
+    def __init__(self):
+        self.snapshot = None
+        self.lock = Lock()
+        self.builds = 0
+
+    def is_current(self, levels: dict) -> bool:
+        snapshot = self.snapshot
+        return snapshot is not None and all(a is b for a, b in zip(snapshot.sources, levels.values()))
+
+    def build(self, levels: dict) -> Snapshot:
+        with self.lock:
+            if not self.is_current(levels):
+                self.snapshot = Snapshot(levels)
+                self.builds += 1
+            return self.snapshot
+
+    async def get(self) -> Snapshot:
+        levels = {level: await location_store.get(level) for level in LEVELS}
+        if self.is_current(levels):
+            return self.snapshot
+        return await run_in_threadpool(self.build, levels)
+
+    def stats(self):
+        snapshot = self.snapshot
+        return {
+            "builds": self.builds,
+            "encodings": list(ENCODINGS),
+            "counts": snapshot.counts if snapshot else None,
+            "sizes": {name: representation.sizes() for name, representation in snapshot.representations.items()} if snapshot else None,
+        }
+
+
+snapshot_store = SnapshotStore()
+
+
+# Best content coding the client accepts, None for identity
+def negotiate_encoding(accept_encoding: str):
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    for encoding in ENCODINGS:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
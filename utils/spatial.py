@@ -0,0 +1,66 @@
+from heapq import heappush, heapreplace
+from math import asin, cos, radians, sin, sqrt
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    lat1, lon1, lat2, lon2 = map(radians, (lat1, lon1, lat2, lon2))
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(a)))
+
+
+# Point on the unit sphere, straight line (chord) distance grows with great circle distance
+def to_unit_vector(lat: float, lon: float) -> tuple:
+    lat, lon = radians(lat), radians(lon)
+    return (cos(lat) * cos(lon), cos(lat) * sin(lon), sin(lat))
+
+
+def chord_to_km(chord_squared: float) -> float:
+    return 2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(chord_squared) / 2))
+
+
+# KD-tree over unit vectors, exact k nearest neighbours by great circle distance with no lat/lon distortion.
+# points are (lat, lon) pairs, query results refer to their positions in that list.
+class KDTree:
+    def __init__(self, points: list):
+        self.vectors = [to_unit_vector(lat, lon) for lat, lon in points]
+        self.root = self.build(list(range(len(self.vectors))), 0)
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def build(self, indexes: list, depth: int):
+        if not indexes:
+            return None
+        axis = depth % 3
+        indexes.sort(key=lambda index: self.vectors[index][axis])
+        middle = len(indexes) // 2
+        return (indexes[middle], axis, self.build(indexes[:middle], depth + 1), self.build(indexes[middle + 1:], depth + 1))
+
+    # [(position, distance_km)] nearest first
+    def query(self, lat: float, lon: float, k: int = 1) -> list:
+        if k < 1 or self.root is None:
+            return []
+        target = to_unit_vector(lat, lon)
+        vectors = self.vectors
+        heap = []  # (-chord², -position), the worst match sits on top
+
+        def visit(node):
+            position, axis, left, right = node
+            vector = vectors[position]
+            distance = (target[0] - vector[0]) ** 2 + (target[1] - vector[1]) ** 2 + (target[2] - vector[2]) ** 2
+            if len(heap) < k:
+                heappush(heap, (-distance, -position))
+            elif distance < -heap[0][0]:
+                heapreplace(heap, (-distance, -position))
+
+            delta = target[axis] - vector[axis]
+            near, far = (left, right) if delta < 0 else (right, left)
+            if near is not None:
+                visit(near)
+            if far is not None and (len(heap) < k or delta * delta < -heap[0][0]):
+                visit(far)
+
+        visit(self.root)
+        return [(-position, chord_to_km(-distance)) for distance, position in sorted(heap, reverse=True)]